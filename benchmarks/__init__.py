@@ -0,0 +1,4 @@
+"""Offline benchmarks of the Aula integration, see bench_refresh and bench_calendar."""
+# Home Assistant has to be imported before the integration, or importing
+# custom_components.aula runs into an import cycle in homeassistant.loader
+import homeassistant.core  # noqa: F401
@@ -0,0 +1,370 @@
+"""Micro-benchmarks of the calendar hot paths.
+
+Runs on synthetic school schedules, which are generated like the stub server's
+calendar responses: LESSONS_PER_DAY lessons per child on every weekday, some
+with a substitute teacher and some with a title that has no subject emoji.
+For every household size it measures:
+
+- decode: _calendar_lessons on the calendar response, per lesson, and the
+  memory the decoded lessons take in the CalendarStore and at peak
+- parse: parseCalendarLesson per lesson, and LessonParseCache.parse with an
+  empty and a filled cache, plus the memory every CalendarEvent takes
+- query: CalendarData.async_get_events for a day, a week and a month, with
+  the range index built, after the store changed (cache filled, index
+  rebuilt) and on a new CalendarData (everything parsed)
+- birthdays: BirthdayCalendarDevice._create_events for a month, a year and
+  the two years _find_next_event looks at
+
+and, once, get_subject_emoji for a title matching the first subject, the last
+one and none. Times are the best of --repeat runs, in microseconds; results
+are printed, or written to --output, as JSON so runs can be compared.
+
+    python -m benchmarks.bench_calendar --children 1 2 4 --weeks 40
+    python -m benchmarks.bench_calendar --quick --output calendar.json
+
+Run from the repository root.
+"""
+import argparse
+import asyncio
+import datetime
+import gc
+import json
+import platform
+import sys
+import time
+import timeit
+import tracemalloc
+
+from custom_components.aula.calendar import (
+    BirthdayCalendarDevice,
+    CalendarData,
+    LessonParseCache,
+    parseCalendarLesson,
+)
+from custom_components.aula.calendar_store import weeks_between
+from custom_components.aula.api import AulaResponse
+from custom_components.aula.client import Client, _calendar_lessons
+from custom_components.aula.const import SUBJECT_EMOJIS, get_subject_emoji
+
+from .stub_server import Household
+
+DEFAULT_CHILDREN = (1, 2, 4)
+# A school year, August to June
+DEFAULT_WEEKS = 40
+# The longest query (a month) has to fit in the generated weeks
+MIN_WEEKS = 5
+DEFAULT_CONTACTS = 500
+DEFAULT_REPEAT = 5
+
+# First Monday of the synthetic school year
+SCHOOL_YEAR_START = datetime.date(2025, 8, 11)
+
+# Every SUBSTITUTE_EVERY-th lesson has a substitute teacher, and every
+# UNKNOWN_SUBJECT_EVERY-th one a title without a subject emoji
+SUBSTITUTE_EVERY = 7
+UNKNOWN_SUBJECT_EVERY = 5
+UNKNOWN_SUBJECT = "Klassens tid"
+
+QUERY_RANGES = {
+    "day": datetime.timedelta(days=1),
+    "week": datetime.timedelta(weeks=1),
+    "month": datetime.timedelta(days=31),
+}
+
+BIRTHDAY_RANGES = {
+    "month": datetime.timedelta(days=31),
+    "year": datetime.timedelta(days=365),
+    "two_years": datetime.timedelta(days=730),
+}
+
+
+def school_year(children, weeks=DEFAULT_WEEKS, start=SCHOOL_YEAR_START):
+    """Return (child ids, lessons) of a household's school schedule for weeks weeks."""
+    household = Household(children)
+    child_ids = [child["id"] for child in household.children]
+    lessons = household.calendar_events(
+        child_ids, start, start + datetime.timedelta(weeks=weeks)
+    )["data"]
+    for number, lesson in enumerate(lessons, 1):
+        if number % SUBSTITUTE_EVERY == 0:
+            lesson["lesson"]["participants"].append(
+                {
+                    "teacherId": 3,
+                    "teacherName": "Test Substitute",
+                    "teacherInitials": "TS",
+                    "participantRole": "substituteTeacher",
+                }
+            )
+        if number % UNKNOWN_SUBJECT_EVERY == 0:
+            lesson["title"] = UNKNOWN_SUBJECT
+    return child_ids, lessons
+
+
+def classmates(contacts=DEFAULT_CONTACTS):
+    """Return contacts as async_get_class_birthdays returns them."""
+    first_birthday = datetime.date(2015, 1, 1)
+    return [
+        {
+            "profile_id": 5000 + i,
+            "name": f"Elev{i} Testesen",
+            "birthday": (first_birthday + datetime.timedelta(days=i * 7 % 1461)).isoformat()
+            + "T00:00:00Z",
+        }
+        for i in range(contacts)
+    ]
+
+
+def _best(func, number, repeat):
+    """Return the best time of repeat runs of number calls of func, per call, in µs."""
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number * 1e6
+
+
+def _retained(build):
+    """Return what build returns, and the bytes it allocated that are still in use and at peak."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = build()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, current, peak
+
+
+def bench_decode(client, child_ids, week_list, response, repeat=DEFAULT_REPEAT):
+    """Decode a calendar response into the client's store, as _merge_calendar does.
+
+    Returns the decode time per lesson and the memory per lesson it leaves in
+    the store and needs at peak, next to the response text.
+    """
+    aula_response = AulaResponse(200, response)
+    now = datetime.datetime.now(datetime.timezone.utc)
+    _, store_bytes, peak_bytes = _retained(
+        lambda: client.calendar_store.update_weeks(
+            week_list, _calendar_lessons(aula_response), now
+        )
+    )
+    count = sum(len(client.calendar_store.lessons(childid)) for childid in child_ids)
+    return {
+        "lessons": count,
+        "decode_lesson_us": round(
+            _best(lambda: _calendar_lessons(aula_response), 1, repeat) / count, 3
+        ),
+        "store_bytes_per_lesson": round(store_bytes / count),
+        "peak_bytes_per_lesson": round(peak_bytes / count),
+    }
+
+
+def bench_parse(child_lessons, repeat=DEFAULT_REPEAT):
+    """Return the parse cost of one child's lessons."""
+    count = len(child_lessons)
+    events, event_bytes, _ = _retained(
+        lambda: [parseCalendarLesson(lesson, show_emoji=True) for lesson in child_lessons]
+    )
+    cache = LessonParseCache(show_emoji=True)
+    cache.parse(child_lessons)
+    return {
+        "lessons": count,
+        "parse_lesson_us": round(
+            _best(
+                lambda: [
+                    parseCalendarLesson(lesson, show_emoji=True) for lesson in child_lessons
+                ],
+                1,
+                repeat,
+            )
+            / count,
+            3,
+        ),
+        "parse_cache_miss_us": round(
+            _best(lambda: LessonParseCache(show_emoji=True).parse(child_lessons), 1, repeat)
+            / count,
+            3,
+        ),
+        "parse_cache_hit_us": round(_best(lambda: cache.parse(child_lessons), 1, repeat) / count, 3),
+        "event_bytes": round(event_bytes / len(events)),
+    }
+
+
+async def _query_us(data, start, end, number, before=None):
+    """Return the mean time in µs of number async_get_events calls."""
+    elapsed = 0.0
+    for _ in range(number):
+        if before is not None:
+            before()
+        started = time.perf_counter()
+        await data.async_get_events(None, start, end)
+        elapsed += time.perf_counter() - started
+    return elapsed / number * 1e6
+
+
+def bench_query(client, childid, start, repeat=DEFAULT_REPEAT, number=200):
+    """Return the async_get_events latency of one child for the QUERY_RANGES."""
+    store = client.calendar_store
+
+    def new_data():
+        return CalendarData(None, client, [], childid, show_emoji=True)
+
+    def store_changed():
+        store.version += 1
+
+    async def run():
+        data = new_data()
+        results = {}
+        for name, length in QUERY_RANGES.items():
+            end = start + length
+            events = await data.async_get_events(None, start, end)
+            results[name] = {
+                "events": len(events),
+                "indexed_us": round(
+                    min([await _query_us(data, start, end, number) for _ in range(repeat)]), 3
+                ),
+            }
+        # The range does not matter for these, they are dominated by parsing
+        # and rebuilding the index
+        end = start + QUERY_RANGES["week"]
+        results["rebuilt_us"] = round(
+            min(
+                [
+                    await _query_us(data, start, end, max(number // 20, 1), store_changed)
+                    for _ in range(repeat)
+                ]
+            ),
+            3,
+        )
+        cold = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            await new_data().async_get_events(None, start, end)
+            cold.append((time.perf_counter() - started) * 1e6)
+        results["cold_us"] = round(min(cold), 3)
+        return results
+
+    return asyncio.run(run())
+
+
+def bench_birthdays(contacts=DEFAULT_CONTACTS, repeat=DEFAULT_REPEAT, start=SCHOOL_YEAR_START):
+    """Return the _create_events cost for the BIRTHDAY_RANGES."""
+    device = BirthdayCalendarDevice(None, None, "Barn1 Testesen", 1001, 1)
+    birthdays = classmates(contacts)
+    results = {"contacts": contacts}
+    for name, length in BIRTHDAY_RANGES.items():
+        end = start + length
+        events = device._create_events(birthdays, start, end)
+        results[name] = {
+            "events": len(events),
+            "create_us": round(
+                _best(lambda: device._create_events(birthdays, start, end), 1, repeat), 3
+            ),
+        }
+    return results
+
+
+def bench_subject_emoji(repeat=DEFAULT_REPEAT, number=10000):
+    """Return the get_subject_emoji cost for titles matched early, late and never."""
+    subjects = list(SUBJECT_EMOJIS)
+    titles = {
+        "first_subject": subjects[0].capitalize() + " 4A",
+        "last_subject": subjects[-1].capitalize() + " 4A",
+        "no_subject": UNKNOWN_SUBJECT,
+    }
+    return {
+        name: round(_best(lambda: get_subject_emoji(title), number, repeat), 4)
+        for name, title in titles.items()
+    }
+
+
+def run_household(children, weeks=DEFAULT_WEEKS, contacts=DEFAULT_CONTACTS, repeat=DEFAULT_REPEAT):
+    """Return the calendar costs for a household with a school year of weeks weeks."""
+    child_ids, lessons = school_year(children, weeks)
+    week_list = weeks_between(
+        SCHOOL_YEAR_START, SCHOOL_YEAR_START + datetime.timedelta(weeks=weeks)
+    )
+    # The response as Aula sends it
+    response = json.dumps({"status": {"message": "OK"}, "data": lessons})
+    del lessons
+    client = Client("benchmark")
+    try:
+        childid = child_ids[0]
+        # A query from the middle of the school year, that stays inside the
+        # loaded weeks so nothing is fetched
+        middle = min(
+            SCHOOL_YEAR_START + datetime.timedelta(weeks=weeks // 2),
+            week_list[-1] + datetime.timedelta(weeks=1) - max(QUERY_RANGES.values()),
+        )
+        query_start = datetime.datetime.combine(
+            middle, datetime.time(), datetime.timezone.utc
+        )
+        return {
+            "children": children,
+            "response_bytes": len(response),
+            "decode": bench_decode(client, child_ids, week_list, response, repeat),
+            "parse": bench_parse(client.calendar_store.lessons(childid), repeat),
+            "query": bench_query(client, childid, query_start, repeat),
+            "birthdays": bench_birthdays(contacts, repeat),
+        }
+    finally:
+        client.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--children",
+        type=int,
+        nargs="+",
+        default=DEFAULT_CHILDREN,
+        help="household sizes to benchmark",
+    )
+    parser.add_argument(
+        "--weeks",
+        type=int,
+        default=DEFAULT_WEEKS,
+        help="weeks of school schedule to generate",
+    )
+    parser.add_argument(
+        "--contacts",
+        type=int,
+        default=DEFAULT_CONTACTS,
+        help="classmates in the birthday calendar",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=DEFAULT_REPEAT,
+        help="runs of every measurement, the best is reported",
+    )
+    parser.add_argument(
+        "--quick",
+        action="store_true",
+        help="a single child, 6 weeks and 2 runs, to check the benchmark works",
+    )
+    parser.add_argument("--output", help="write the JSON results to this file")
+    args = parser.parse_args(argv)
+    if args.quick:
+        args.children, args.weeks, args.repeat = [1], MIN_WEEKS + 1, 2
+    if args.weeks < MIN_WEEKS:
+        parser.error(f"--weeks must be at least {MIN_WEEKS}, to fit the longest query")
+
+    results = {
+        "benchmark": "calendar",
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "weeks": args.weeks,
+        "subject_emoji_us": bench_subject_emoji(args.repeat),
+        "results": [
+            run_household(children, args.weeks, args.contacts, args.repeat)
+            for children in args.children
+        ],
+    }
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
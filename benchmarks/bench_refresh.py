@@ -0,0 +1,166 @@
+"""Benchmark full refreshes against the stub server.
+
+For every household size, a client refreshes all sources twice against a
+StubProcess: a cold refresh (nothing cached) and a warm one (unchanged
+responses, cached widget tokens). Each is measured for wall time, the
+requests the upstreams served, the peak memory allocated while refreshing
+(tracemalloc) and the duration of every stage. The results are printed, or
+written to --output, as JSON so runs can be compared.
+
+    python -m benchmarks.bench_refresh --children 1 5 10 20 --latency 0.05
+    python -m benchmarks.bench_refresh --slow meebook=2 --output bench.json
+
+Run from the repository root. Nothing leaves the machine: every request
+goes to the stub server on 127.0.0.1.
+"""
+import argparse
+import base64
+import datetime
+import json
+import logging
+import platform
+import sys
+import time
+import tracemalloc
+from unittest.mock import patch
+
+from custom_components.aula import client as client_module
+from custom_components.aula.client import Client
+from custom_components.aula.const import SOURCES
+from custom_components.aula.rate_limit import DEFAULT_BURST, DEFAULT_RATE
+
+from .stub_server import UPSTREAMS, StubProcess
+
+DEFAULT_CHILDREN = (1, 2, 5, 10, 20)
+DEFAULT_LATENCY = 0.02
+
+# Seconds until the rate limiter's buckets are full again, as they would be
+# by the next scheduled refresh
+REFILL_TIME = DEFAULT_BURST / DEFAULT_RATE
+
+
+def _access_token():
+    # A JWT the client considers valid, so no token renewal is attempted
+    payload = {"exp": int(time.time()) + 24 * 3600}
+    encoded = base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+    return "stub." + encoded.rstrip("=") + ".signature"
+
+
+def _provider_urls(urls):
+    return {
+        "MIN_UDDANNELSE_API": urls["minuddannelse"],
+        "MEEBOOK_API": urls["meebook"],
+        "EASYIQ_API": urls["easyiq"],
+        "SYSTEMATIC_API": urls["systematic"],
+    }
+
+
+def measure_refresh(client, stub):
+    """Refresh every source once and return its cost."""
+    stub.reset()
+    tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        client.update_data()
+        wall = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    counts = stub.counts()
+    stages = client.stage_health.stats()
+    return {
+        "wall_s": round(wall, 4),
+        "requests": sum(counts.values()),
+        "requests_by_upstream": counts,
+        "peak_memory_bytes": peak,
+        "stage_s": {
+            name: None if stage["last_duration"] is None else round(stage["last_duration"], 4)
+            for name, stage in stages.items()
+        },
+        "failed_stages": sorted(
+            name for name, stage in stages.items() if stage["consecutive_failures"]
+        ),
+    }
+
+
+def run_household(children, latency=DEFAULT_LATENCY, slow=None):
+    """Return the cold and warm refresh costs for a household of children."""
+    with StubProcess(children, latency, slow) as stub:
+        with patch.multiple(client_module, **_provider_urls(stub.urls)):
+            client = Client(
+                "benchmark",
+                stored_tokens={"access_token": _access_token(), "refresh_token": "stub"},
+            )
+            client._api.apiurl = stub.urls["aula"]
+            try:
+                cold = measure_refresh(client, stub)
+                time.sleep(REFILL_TIME)
+                warm = measure_refresh(client, stub)
+            finally:
+                if client._api.session is not None:
+                    client._run(client._api.session.close())
+                client.close()
+    return {"children": children, "cold": cold, "warm": warm}
+
+
+def _slow_upstream(value):
+    upstream, _, seconds = value.partition("=")
+    if upstream not in UPSTREAMS or not seconds:
+        raise argparse.ArgumentTypeError(
+            f"expected UPSTREAM=SECONDS with UPSTREAM one of {', '.join(UPSTREAMS)}"
+        )
+    return upstream, float(seconds)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--children",
+        type=int,
+        nargs="+",
+        default=DEFAULT_CHILDREN,
+        help="household sizes to benchmark",
+    )
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=DEFAULT_LATENCY,
+        help="seconds every stub response is delayed",
+    )
+    parser.add_argument(
+        "--slow",
+        type=_slow_upstream,
+        action="append",
+        default=[],
+        metavar="UPSTREAM=SECONDS",
+        help="delay one upstream differently, e.g. meebook=2",
+    )
+    parser.add_argument("--output", help="write the JSON results to this file")
+    args = parser.parse_args(argv)
+
+    # The integration logs a warning for every stage that fails; keep the
+    # output readable while still showing those
+    logging.basicConfig(level=logging.WARNING)
+    slow = dict(args.slow)
+    results = {
+        "benchmark": "refresh",
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "sources": list(SOURCES),
+        "latency_s": args.latency,
+        "slow_s": slow,
+        "results": [
+            run_household(children, args.latency, slow) for children in args.children
+        ],
+    }
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,351 @@
+"""Local stand-in for Aula and the widget providers.
+
+Serves the endpoints a refresh calls - Aula's API, Min Uddannelse (opgaver
+and ugebrev), Meebook, EasyIQ and Systematic (Huskelisten) - from recorded
+responses (fixtures/ and the test fixtures), scaled to a household of a
+given number of children. Every response is sent after a configurable
+latency. Each upstream listens on its own port, so the client's per-host
+rate limiting and connection pools behave as they do with the real hosts.
+
+The server runs in a child process (StubProcess), so it does not show up in
+the memory and CPU measured in the benchmark process.
+"""
+import asyncio
+import copy
+import datetime
+import json
+import multiprocessing
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from aiohttp import web
+import requests
+
+from custom_components.aula.const import (
+    API,
+    API_VERSION,
+    MIN_UDDANNELSE_API,
+    MEEBOOK_API,
+    SYSTEMATIC_API,
+    EASYIQ_API,
+    SUBJECT_EMOJIS,
+)
+
+FIXTURES = Path(__file__).parent / "fixtures"
+TEST_FIXTURES = Path(__file__).parent.parent / "tests" / "fixtures"
+
+# The upstreams and the base URL constant each one stands in for
+UPSTREAMS = {
+    "aula": API + API_VERSION,
+    "minuddannelse": MIN_UDDANNELSE_API,
+    "meebook": MEEBOOK_API,
+    "easyiq": EASYIQ_API,
+    "systematic": SYSTEMATIC_API,
+}
+
+# Widgets the guardian's profile context offers: MU Opgaver, MU ugebrev,
+# EasyIQ, Meebook and Huskelisten, so every provider stage runs
+WIDGETS = {
+    "0030": "MU Opgaver",
+    "0029": "Ugebrev",
+    "0001": "EasyIQ Ugeplan",
+    "0004": "Meebook Ugeplan",
+    "0062": "Huskelisten",
+}
+
+LESSONS_PER_DAY = 6
+SUBJECTS = list(SUBJECT_EMOJIS)
+
+
+def _load(path):
+    with open(path, encoding="utf-8") as fixture:
+        return json.load(fixture)
+
+
+def _parse_day(value):
+    return datetime.date.fromisoformat(value[:10])
+
+
+class Household:
+    """The responses for a guardian with the given number of children."""
+
+    def __init__(self, children):
+        self.children = [
+            {
+                "id": 1000 + i,
+                "profileId": 2000 + i,
+                "userId": f"barn{i}",
+                "name": f"Barn{i} Testesen",
+                "institutionProfile": {
+                    "id": 1000 + i,
+                    "institutionCode": "123",
+                    "institutionName": "Testskolen",
+                    "metadata": "2A",
+                },
+            }
+            for i in range(1, children + 1)
+        ]
+        self._overview = _load(FIXTURES / "aula_daily_overview.json")
+        self._thread = _load(FIXTURES / "aula_thread.json")
+        self._lesson = _load(TEST_FIXTURES / "calendar_lesson_normal.json")
+        self._opgave = _load(TEST_FIXTURES / "mu_opgaveliste.json")["opgaver"][0]
+        self._ugebrev = _load(FIXTURES / "ugebrev_person.json")
+        self._easyiq = _load(FIXTURES / "easyiq_weekplaninfo.json")
+        self._meebook = _load(FIXTURES / "meebook_person.json")
+        self._huskelisten = _load(FIXTURES / "huskelisten_person.json")
+
+    def _named(self, template, field, child):
+        item = copy.deepcopy(template)
+        item[field] = child["name"]
+        return item
+
+    def profiles(self):
+        return {
+            "status": {"message": "OK"},
+            "data": {
+                "profiles": [
+                    {
+                        "children": self.children,
+                        "institutionProfiles": [{"institutionCode": "123"}],
+                    }
+                ]
+            },
+        }
+
+    def profile_context(self):
+        return {
+            "status": {"message": "OK"},
+            "data": {
+                "userId": "guardian1",
+                "institutionProfile": {"relations": []},
+                "pageConfiguration": {
+                    "widgetConfigurations": [
+                        {"widget": {"widgetId": widget_id, "name": name}}
+                        for widget_id, name in WIDGETS.items()
+                    ]
+                },
+            },
+        }
+
+    def daily_overview(self, child_ids):
+        overviews = []
+        for child_id in child_ids:
+            overview = copy.deepcopy(self._overview)
+            overview["institutionProfile"]["id"] = int(child_id)
+            overviews.append(overview)
+        return {"status": {"message": "OK"}, "data": overviews}
+
+    def threads(self):
+        return {
+            "status": {"message": "OK"},
+            "data": {"threads": [{"id": 9, "read": False}, {"id": 8, "read": True}]},
+        }
+
+    def thread(self):
+        return self._thread
+
+    def calendar_events(self, child_ids, start, end):
+        """Return LESSONS_PER_DAY lessons per child on the weekdays in [start, end)."""
+        events = []
+        day = start
+        while day < end:
+            if day.weekday() < 5:
+                for child_id in child_ids:
+                    for slot in range(LESSONS_PER_DAY):
+                        begin = datetime.datetime.combine(
+                            day, datetime.time(7 + slot), datetime.timezone.utc
+                        )
+                        lesson = copy.deepcopy(self._lesson)
+                        lesson["id"] = len(events) + 1
+                        lesson["title"] = SUBJECTS[(slot + day.toordinal()) % len(SUBJECTS)]
+                        lesson["startDateTime"] = begin.isoformat()
+                        lesson["endDateTime"] = (
+                            begin + datetime.timedelta(minutes=45)
+                        ).isoformat()
+                        lesson["belongsToProfiles"] = [int(child_id)]
+                        events.append(lesson)
+            day += datetime.timedelta(days=1)
+        return {"status": {"message": "OK"}, "data": events}
+
+    def aula_token(self, widget_id):
+        return {"status": {"message": "OK"}, "data": f"stub-token-{widget_id}"}
+
+    def mu_opgaver(self):
+        return {
+            "opgaver": [
+                self._named(self._opgave, "kuvertnavn", child) for child in self.children
+            ]
+        }
+
+    def ugebrev(self):
+        return {
+            "personer": [
+                self._named(self._ugebrev, "navn", child) for child in self.children
+            ]
+        }
+
+    def easyiq(self):
+        return self._easyiq
+
+    def meebook(self):
+        return [self._named(self._meebook, "name", child) for child in self.children]
+
+    def huskelisten(self):
+        return [
+            self._named(self._huskelisten, "userName", child) for child in self.children
+        ]
+
+
+class StubServer:
+    """The upstreams of a household, each on its own port of 127.0.0.1."""
+
+    def __init__(self, household, latency=0.0, slow=None):
+        self.household = household
+        self._latency = latency
+        # {upstream: latency}, overriding latency for single upstreams
+        self._slow = slow or {}
+        self.counts = {upstream: 0 for upstream in UPSTREAMS}
+        self._runners = []
+
+    def _app(self, upstream, routes):
+        @web.middleware
+        async def delay(request, handler):
+            if not request.path.startswith("/_"):
+                self.counts[upstream] += 1
+                await asyncio.sleep(self._slow.get(upstream, self._latency))
+            return await handler(request)
+
+        app = web.Application(middlewares=[delay])
+        prefix = urlsplit(UPSTREAMS[upstream]).path.rstrip("/")
+        for method, path, handler in routes:
+            app.router.add_route(method, prefix + path, handler)
+        return app
+
+    async def _aula(self, request):
+        household = self.household
+        method = request.query.get("method")
+        if method == "profiles.getProfilesByLogin":
+            body = household.profiles()
+        elif method == "profiles.getProfileContext":
+            body = household.profile_context()
+        elif method == "presence.getDailyOverview":
+            body = household.daily_overview(request.query.getall("childIds[]", []))
+        elif method == "messaging.getThreads":
+            body = household.threads()
+        elif method == "messaging.getMessagesForThread":
+            body = household.thread()
+        elif method == "calendar.getEventsByProfileIdsAndResourceIds":
+            payload = await request.json()
+            body = household.calendar_events(
+                payload["instProfileIds"],
+                _parse_day(payload["start"]),
+                _parse_day(payload["end"]),
+            )
+        elif method == "aulaToken.getAulaToken":
+            body = household.aula_token(request.query.get("widgetId"))
+        else:
+            return web.json_response({"status": {"code": 404, "message": method}}, status=404)
+        return web.json_response(body)
+
+    async def _stats(self, request):
+        return web.json_response(self.counts)
+
+    async def _reset(self, request):
+        for upstream in self.counts:
+            self.counts[upstream] = 0
+        return web.json_response(self.counts)
+
+    def _routes(self):
+        household = self.household
+
+        def replay(build):
+            async def handler(request):
+                return web.json_response(build())
+
+            return handler
+
+        return {
+            "aula": [
+                ("GET", "", self._aula),
+                ("POST", "", self._aula),
+            ],
+            "minuddannelse": [
+                ("GET", "/opgaveliste", replay(household.mu_opgaver)),
+                ("GET", "/ugebrev", replay(household.ugebrev)),
+            ],
+            "meebook": [
+                ("GET", "/relatedweekplan/all", replay(household.meebook)),
+            ],
+            "easyiq": [
+                ("POST", "/weekplaninfo", replay(household.easyiq)),
+            ],
+            "systematic": [
+                ("GET", "/reminders/v1", replay(household.huskelisten)),
+            ],
+        }
+
+    async def start(self):
+        """Start listening and return {upstream: base URL replacing its constant}."""
+        urls = {}
+        for upstream, routes in self._routes().items():
+            app = self._app(upstream, routes)
+            if upstream == "aula":
+                app.router.add_get("/_stats", self._stats)
+                app.router.add_post("/_reset", self._reset)
+            runner = web.AppRunner(app, access_log=None)
+            await runner.setup()
+            site = web.TCPSite(runner, "127.0.0.1", 0)
+            await site.start()
+            self._runners.append(runner)
+            port = runner.addresses[0][1]
+            urls[upstream] = f"http://127.0.0.1:{port}" + urlsplit(UPSTREAMS[upstream]).path
+        return urls
+
+    async def stop(self):
+        for runner in self._runners:
+            await runner.cleanup()
+
+
+def _serve(children, latency, slow, conn):
+    async def main():
+        server = StubServer(Household(children), latency, slow)
+        conn.send(await server.start())
+        await asyncio.Event().wait()
+
+    asyncio.run(main())
+
+
+class StubProcess:
+    """A StubServer running in a child process."""
+
+    def __init__(self, children, latency=0.0, slow=None):
+        self._args = (children, latency, dict(slow or {}))
+        self._process = None
+        self.urls = None
+
+    def __enter__(self):
+        receiver, sender = multiprocessing.Pipe(duplex=False)
+        self._process = multiprocessing.Process(
+            target=_serve, args=self._args + (sender,), daemon=True
+        )
+        self._process.start()
+        if not receiver.poll(30):
+            self._process.terminate()
+            raise RuntimeError("The stub server did not start")
+        self.urls = receiver.recv()
+        return self
+
+    def __exit__(self, *exc):
+        self._process.terminate()
+        self._process.join()
+
+    def _control_url(self, path):
+        parts = urlsplit(self.urls["aula"])
+        return f"{parts.scheme}://{parts.netloc}{path}"
+
+    def counts(self):
+        """Return the number of requests served per upstream since the last reset."""
+        return requests.get(self._control_url("/_stats"), timeout=10).json()
+
+    def reset(self):
+        requests.post(self._control_url("/_reset"), timeout=10)
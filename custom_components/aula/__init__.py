@@ -1,7 +1,9 @@
 from homeassistant.loader import async_get_integration
 import asyncio
+import aiohttp
 from homeassistant import config_entries, core
 from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.aiohttp_client import async_create_clientsession
 from .const import (
     DOMAIN,
     STARTUP,
@@ -17,9 +19,32 @@ from .const import (
     CONF_SCHOOLSCHEDULE,
     CONF_UGEPLAN,
     CONF_MU_OPGAVER,
+    CONF_MAX_CONCURRENCY,
+    DEFAULT_MAX_CONCURRENCY,
+    CONF_VERIFY_INTERVAL,
+    DEFAULT_VERIFY_INTERVAL,
+    CONF_CALENDAR_WEEKS_BACK,
+    DEFAULT_CALENDAR_WEEKS_BACK,
+    CONF_CALENDAR_WEEKS_AHEAD,
+    DEFAULT_CALENDAR_WEEKS_AHEAD,
+    CONF_WIDGET_TOKEN_TTL,
+    DEFAULT_WIDGET_TOKEN_TTL,
+    CONF_REFRESH_DEADLINE,
+    DEFAULT_REFRESH_DEADLINE,
 )
 import logging
 from .client import Client
+from .calendar_store import CalendarStore
+from .coordinator import create_coordinators
+from .scheduler import AulaScheduler
+from .binary_sensor import LEGACY_MESSAGE_UNIQUE_ID, message_unique_id
+from .calendar import (
+    LEGACY_BIRTHDAYS_UNIQUE_ID,
+    LEGACY_SCHEDULE_UNIQUE_ID,
+    birthdays_unique_id,
+    schedule_unique_id,
+)
+from .sensor import LEGACY_CHILD_UNIQUE_ID, child_unique_id
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -78,6 +103,19 @@ async def async_setup_entry(
     hass_data["unsub_options_update_listener"] = unsub_options_update_listener
     hass.data[DOMAIN][entry.entry_id] = hass_data
 
+    # Aula API calls run on HA's connection pool, with a cookie jar of their
+    # own so Aula's CSRF cookie stays with this entry. HA only closes the
+    # session at shutdown; close it when the entry is unloaded, or its setup
+    # fails and is retried, so reloads don't leak sessions.
+    session = async_create_clientsession(hass, cookie_jar=aiohttp.CookieJar())
+    entry.async_on_unload(session.close)
+
+    # Shared by the clients of all entries: provider sessions, the request
+    # budget, refresh staggering and sharing of identical requests
+    scheduler = hass.data[DOMAIN].get("scheduler")
+    if scheduler is None:
+        scheduler = hass.data[DOMAIN]["scheduler"] = AulaScheduler()
+
     # Create client with MitID authentication
     client = await hass.async_add_executor_job(
         Client,
@@ -93,8 +131,18 @@ async def async_setup_entry(
         mitid_identity,
         hass,  # Pass hass reference for token persistence
         entry,  # Pass config entry for token persistence
+        entry.data.get(CONF_MAX_CONCURRENCY, DEFAULT_MAX_CONCURRENCY),
+        session,
+        entry.data.get(CONF_VERIFY_INTERVAL, DEFAULT_VERIFY_INTERVAL),
+        entry.data.get(CONF_CALENDAR_WEEKS_BACK, DEFAULT_CALENDAR_WEEKS_BACK),
+        entry.data.get(CONF_CALENDAR_WEEKS_AHEAD, DEFAULT_CALENDAR_WEEKS_AHEAD),
+        entry.data.get(CONF_WIDGET_TOKEN_TTL, DEFAULT_WIDGET_TOKEN_TTL),
+        scheduler,
+        entry.data.get(CONF_REFRESH_DEADLINE, DEFAULT_REFRESH_DEADLINE),
     )
-    hass.data[DOMAIN]["client"] = client
+    # Everything belonging to this entry lives under its entry_id, so
+    # several entries (e.g. one per guardian) run side by side.
+    hass_data["client"] = client
 
     # Perform login/validation
     if not stored_tokens:
@@ -105,14 +153,22 @@ async def async_setup_entry(
         # Ensure session is initialized with tokens by calling login which now handles validation
         await hass.async_add_executor_job(client.login)
 
+    # Start from the school schedule saved by the previous run, if any
+    await client.calendar_store.async_load()
+
     # Fetch initial data before setting up platforms
-    await hass.async_add_executor_job(client.update_data)
+    await client.async_update_data()
+
+    # From here on every data source is refreshed on its own schedule
+    scheduler.register(entry.entry_id)
+    hass_data["coordinators"] = create_coordinators(hass, client, entry, scheduler)
 
     # Unloading a platform that was never forwarded raises and leaves the entry
     # stuck in the non-recoverable FAILED_UNLOAD state, so async_unload_entry
     # must unload exactly what was forwarded here - not what entry.data says
     # *now*, since options updates change entry.data before the reload that
     # calls async_unload_entry. Remember the actual list in runtime storage.
+    await _async_migrate_unique_ids(hass, entry)
     platforms = ["sensor", "binary_sensor"]
     if entry.data.get(CONF_SCHOOLSCHEDULE, True):
         platforms.append("calendar")
@@ -131,6 +187,46 @@ async def async_setup_entry(
     return True
 
 
+# (domain, legacy unique id pattern, new unique id for (entry id, child id))
+LEGACY_CHILD_UNIQUE_IDS = (
+    ("sensor", LEGACY_CHILD_UNIQUE_ID, child_unique_id),
+    ("calendar", LEGACY_SCHEDULE_UNIQUE_ID, schedule_unique_id),
+    ("calendar", LEGACY_BIRTHDAYS_UNIQUE_ID, birthdays_unique_id),
+)
+
+
+def migrated_unique_id(domain, unique_id, entry_id):
+    """Return the unique id per config entry for a legacy unique id, or None.
+
+    Unique ids include the entry id, so a child shared by two guardians, each
+    with their own entry, gets separate entities in both entries.
+    """
+    if domain == "binary_sensor" and unique_id == LEGACY_MESSAGE_UNIQUE_ID:
+        return message_unique_id(entry_id)
+    for legacy_domain, legacy, new_unique_id in LEGACY_CHILD_UNIQUE_IDS:
+        if domain != legacy_domain:
+            continue
+        match = legacy.fullmatch(unique_id)
+        if match:
+            return new_unique_id(entry_id, match.group(1))
+    return None
+
+
+async def _async_migrate_unique_ids(hass, entry):
+    """Give the entities unique ids per config entry, keeping their entity ids."""
+
+    @core.callback
+    def migrate(entity_entry):
+        new_unique_id = migrated_unique_id(
+            entity_entry.domain, entity_entry.unique_id, entry.entry_id
+        )
+        if new_unique_id is None:
+            return None
+        return {"new_unique_id": new_unique_id}
+
+    await er.async_migrate_entries(hass, entry.entry_id, migrate)
+
+
 async def async_update_tokens(
     hass: core.HomeAssistant, entry: config_entries.ConfigEntry, tokens: dict
 ):
@@ -178,6 +274,15 @@ async def async_unload_entry(
 
     unload_ok = await hass.config_entries.async_unload_platforms(entry, platforms_to_unload)
 
+    client = stored.get("client")
+    if unload_ok and client is not None:
+        await hass.async_add_executor_job(client.close)
+    scheduler = hass.data.get(DOMAIN, {}).get("scheduler")
+    if unload_ok and scheduler is not None and scheduler.unregister(entry.entry_id):
+        # That was the last entry
+        hass.data[DOMAIN].pop("scheduler")
+        await hass.async_add_executor_job(scheduler.close)
+
     # Remove options_update_listener.
     if entry.entry_id in hass.data.get(DOMAIN, {}):
         hass.data[DOMAIN][entry.entry_id]["unsub_options_update_listener"]()
@@ -186,3 +291,10 @@ async def async_unload_entry(
             hass.data[DOMAIN].pop(entry.entry_id)
 
     return unload_ok
+
+
+async def async_remove_entry(
+    hass: core.HomeAssistant, entry: config_entries.ConfigEntry
+) -> None:
+    """Delete the school schedule saved for a removed config entry."""
+    await CalendarStore(hass, entry.entry_id).async_remove()
@@ -0,0 +1,394 @@
+"""Async access to the Aula API.
+
+Every call Client makes to www.aula.dk goes through AulaApi, which runs on the
+aiohttp session Home Assistant hands out (sharing HA's connection pool), so a
+refresh no longer ties up executor threads while it waits on the network.
+"""
+import asyncio
+import codecs
+import json
+import logging
+import re
+import sys
+import time
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from .const import API, API_VERSION
+from .fingerprint import body_hash
+from .rate_limit import (
+    MAX_RETRIES,
+    THROTTLED_STATUSES,
+    TRANSIENT_STATUSES,
+    backoff_delay,
+    parse_retry_after,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:109.0) Gecko/20100101 Firefox/115.0"
+
+# Bytes of a response body read at a time
+READ_CHUNK_SIZE = 64 * 1024
+
+# Timeouts of every Aula request. A connect or read timeout counts as a
+# connection error, so GETs are retried; total caps one attempt.
+API_TIMEOUT = aiohttp.ClientTimeout(total=60, connect=10, sock_read=30)
+
+# Methods whose response depends only on the request, not on the guardian
+# sending it, so identical requests from several accounts may share one
+# response. Calendar events are not among them: invitations and private
+# events differ between the guardians of the same child.
+SHARED_METHODS = ("presence.getDailyOverview",)
+
+
+def _header_key(headers):
+    return tuple(sorted(headers.items())) if headers else ()
+
+
+def _interned_dict(pairs):
+    # json.loads shares the key strings of a document between its objects,
+    # raw_decode only within one call. Interning them keeps every item of a
+    # response from holding its own copies of the same keys.
+    return {sys.intern(key): value for key, value in pairs}
+
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_DECODER = json.JSONDecoder(object_pairs_hook=_interned_dict)
+
+
+def _next_char(text, pos):
+    # The first character at or after pos that is not whitespace, and its index
+    pos = _WHITESPACE.match(text, pos).end()
+    return text[pos : pos + 1], pos
+
+
+def iter_json_items(text, key="data"):
+    """Yield the items of the array under key in a JSON object, one at a time.
+
+    Only one item is decoded at a time, so a caller that keeps a few of them
+    never holds every item of a large response as objects at once. Nothing
+    after the array is read. Raises ValueError (possibly while iterating) if
+    text is not an object with an array under key.
+    """
+    char, pos = _next_char(text, 0)
+    if char != "{":
+        raise ValueError("Expected a JSON object")
+    char, pos = _next_char(text, pos + 1)
+    while char == '"':
+        name, pos = _DECODER.raw_decode(text, pos)
+        char, pos = _next_char(text, pos)
+        if char != ":":
+            raise ValueError(f"Expected ':' at position {pos}")
+        char, pos = _next_char(text, pos + 1)
+        if name == key:
+            if char != "[":
+                raise ValueError(f"{key!r} is not an array")
+            yield from _iter_array(text, pos + 1)
+            return
+        _, pos = _DECODER.raw_decode(text, pos)
+        char, pos = _next_char(text, pos)
+        if char != ",":
+            break
+        char, pos = _next_char(text, pos + 1)
+    raise ValueError(f"No {key!r} in the JSON object")
+
+
+def _iter_array(text, pos):
+    char, pos = _next_char(text, pos)
+    if char == "]":
+        return
+    while True:
+        item, pos = _DECODER.raw_decode(text, pos)
+        yield item
+        char, pos = _next_char(text, pos)
+        if char == "]":
+            return
+        if char != ",":
+            raise ValueError(f"Expected ',' or ']' at position {pos}")
+        _, pos = _next_char(text, pos + 1)
+
+
+class AulaResponse:
+    """The parts of an HTTP response the integration uses, read eagerly.
+
+    Mirrors the small subset of requests.Response the data path relied on, so
+    callers keep using status_code, text and json(). digest, when known, is
+    the fingerprint.body_digest of the body, taken while reading it.
+    """
+
+    __slots__ = ("status_code", "text", "headers", "digest")
+
+    def __init__(self, status_code, text, headers=None, digest=None):
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers or {}
+        self.digest = digest
+
+    def json(self):
+        return json.loads(self.text)
+
+
+async def _read_body(response):
+    """Return the text, size and digest of an aiohttp response body.
+
+    The body is read in chunks, each hashed, counted and decoded as it
+    arrives, so it is never held as bytes and text at once.
+    """
+    try:
+        encoding = response.get_encoding()
+    except RuntimeError:
+        # No charset to go by; Aula's answers are UTF-8
+        encoding = "utf-8"
+    decoder = codecs.getincrementaldecoder(encoding)()
+    digest = body_hash()
+    size = 0
+    parts = []
+    async for chunk in response.content.iter_chunked(READ_CHUNK_SIZE):
+        size += len(chunk)
+        digest.update(chunk)
+        parts.append(decoder.decode(chunk))
+    parts.append(decoder.decode(b"", final=True))
+    return "".join(parts), size, digest.hexdigest()
+
+
+class AulaApi:
+    """Async implementation of the Aula API methods used by the integration."""
+
+    def __init__(
+        self,
+        session,
+        access_token_getter,
+        on_auth_failure=None,
+        deduper=None,
+        limiter=None,
+        metrics=None,
+    ):
+        """
+        Args:
+            session: aiohttp.ClientSession to send requests on. May be None
+                until the owner attaches one.
+            access_token_getter: Callable returning the current access token,
+                or None when there is none.
+            on_auth_failure: Optional callable invoked whenever Aula answers
+                a request with HTTP 401 or 403.
+            deduper: Optional scheduler.RequestDeduper, shared with other
+                accounts, for the SHARED_METHODS requests.
+            limiter: Optional rate_limit.RateLimiter every request waits
+                for. Throttled (429) and, for GETs, failed (5xx) requests
+                are retried with backoff.
+            metrics: Optional metrics.RequestMetrics every request (each
+                attempt) is recorded in.
+        """
+        self.session = session
+        self._access_token = access_token_getter
+        self._on_auth_failure = on_auth_failure
+        self._deduper = deduper
+        self._limiter = limiter
+        self._metrics = metrics
+        self.apiurl = API + API_VERSION
+
+    def csrf_token(self):
+        """Return the CSRF token Aula set as a cookie, or None if not available."""
+        if self.session is None:
+            return None
+        for cookie in self.session.cookie_jar:
+            if cookie.key == "Csrfp-Token":
+                return cookie.value
+        return None
+
+    def _params(self, method, params=()):
+        query = [("method", method)]
+        query.extend(params)
+        access_token = self._access_token()
+        if access_token:
+            query.append(("access_token", access_token))
+        return query
+
+    def _headers(self, json_body=False, extra=None):
+        headers = {"User-Agent": USER_AGENT}
+        if json_body:
+            headers["content-type"] = "application/json"
+            csrf_token = self.csrf_token()
+            if csrf_token:
+                headers["csrfp-token"] = csrf_token
+        if extra:
+            headers.update(extra)
+        return headers
+
+    async def _request(
+        self, http_method, url, params=None, data=None, json_body=False, headers=None
+    ):
+        host = urlsplit(url).netloc
+        retry_statuses = THROTTLED_STATUSES
+        if http_method == "GET":
+            retry_statuses = THROTTLED_STATUSES + TRANSIENT_STATUSES
+        attempt = 0
+        while True:
+            if self._limiter is not None:
+                await self._limiter.async_acquire(host)
+            started = time.monotonic()
+            try:
+                async with self.session.request(
+                    http_method,
+                    url,
+                    params=params,
+                    data=data,
+                    headers=self._headers(json_body, headers),
+                    timeout=API_TIMEOUT,
+                ) as response:
+                    text, size, digest = await _read_body(response)
+            except Exception as e:
+                self._record(host, started)
+                if not isinstance(e, aiohttp.ClientConnectionError):
+                    raise
+                if http_method != "GET" or attempt >= MAX_RETRIES:
+                    raise
+                delay = backoff_delay(attempt)
+                _LOGGER.debug(f"{http_method} {host} failed ({e}), retrying in {delay:.1f}s")
+            else:
+                self._record(host, started, size, response.status)
+                if response.status not in retry_statuses or attempt >= MAX_RETRIES:
+                    break
+                delay = backoff_delay(
+                    attempt, parse_retry_after(response.headers.get("Retry-After"))
+                )
+                if response.status in THROTTLED_STATUSES and self._limiter is not None:
+                    self._limiter.throttle(host, delay)
+                _LOGGER.debug(
+                    f"{http_method} {host} answered {response.status}, retrying in {delay:.1f}s"
+                )
+            attempt += 1
+            await asyncio.sleep(delay)
+
+        if response.status in (401, 403) and self._on_auth_failure is not None:
+            self._on_auth_failure()
+        return AulaResponse(response.status, text, dict(response.headers), digest)
+
+    def _record(self, host, started, size=0, status=None):
+        if self._metrics is not None:
+            self._metrics.record(host, time.monotonic() - started, size, status)
+
+    async def _shared(self, key, request):
+        """Send request(), sharing the response with identical requests in flight."""
+        if self._deduper is None or key[1] not in SHARED_METHODS:
+            return await request()
+        return await self._deduper.run(key, request, owner=self)
+
+    async def get(self, method, params=(), headers=None):
+        """GET an Aula API method, e.g. get("presence.getDailyOverview", [...]).
+
+        headers are sent on top of the default ones (e.g. If-None-Match).
+        """
+        return await self._shared(
+            ("GET", method, tuple(params), None, _header_key(headers)),
+            lambda: self._request(
+                "GET",
+                self.apiurl,
+                params=self._params(method, params),
+                headers=headers,
+            ),
+        )
+
+    async def post(self, method, payload, params=(), headers=None):
+        """POST a JSON payload (dict or already encoded string) to an Aula API method."""
+        if not isinstance(payload, str):
+            payload = json.dumps(payload)
+        return await self._shared(
+            ("POST", method, tuple(params), payload, _header_key(headers)),
+            lambda: self._request(
+                "POST",
+                self.apiurl,
+                params=self._params(method, params),
+                data=payload,
+                json_body=True,
+                headers=headers,
+            ),
+        )
+
+    async def call(self, uri, post_data=None):
+        """Call a raw "?method=..." uri, as used by the api_call service."""
+        url = self.apiurl + uri
+        access_token = self._access_token()
+        if access_token:
+            url = url + "&access_token=" + access_token
+        if post_data is None:
+            return await self._request("GET", url, json_body=True)
+        return await self._request("POST", url, data=post_data, json_body=True)
+
+    # profiles.*
+
+    async def get_profiles_by_login(self):
+        return await self.get("profiles.getProfilesByLogin")
+
+    async def get_profile_context(self, portalrole="guardian"):
+        params = [("portalrole", portalrole)] if portalrole else []
+        return await self.get("profiles.getProfileContext", params)
+
+    async def get_contactlist(self, group_id, page, filter="child", field="name", order="asc"):
+        return await self.get(
+            "profiles.getContactlist",
+            [
+                ("groupId", str(group_id)),
+                ("filter", filter),
+                ("field", field),
+                ("page", str(page)),
+                ("order", order),
+            ],
+        )
+
+    # presence.*
+
+    async def get_daily_overview(self, child_ids, headers=None):
+        return await self.get(
+            "presence.getDailyOverview",
+            [("childIds[]", str(child_id)) for child_id in child_ids],
+            headers,
+        )
+
+    # messaging.*
+
+    async def get_threads(self, page=0, headers=None):
+        return await self.get(
+            "messaging.getThreads",
+            [("sortOn", "date"), ("orderDirection", "desc"), ("page", str(page))],
+            headers,
+        )
+
+    async def get_messages_for_thread(self, thread_id, page=0):
+        return await self.get(
+            "messaging.getMessagesForThread",
+            [("threadId", str(thread_id)), ("page", str(page))],
+        )
+
+    # calendar.*
+
+    async def get_events_by_profile_ids_and_resource_ids(
+        self, inst_profile_ids, start, end, resource_ids=(), headers=None
+    ):
+        payload = {
+            "instProfileIds": [int(i) for i in inst_profile_ids],
+            "resourceIds": list(resource_ids),
+            "start": start,
+            "end": end,
+        }
+        return await self.post(
+            "calendar.getEventsByProfileIdsAndResourceIds", payload, headers=headers
+        )
+
+    # aulaToken.*
+
+    async def get_aula_token(self, widget_id):
+        return await self.get("aulaToken.getAulaToken", [("widgetId", widget_id)])
+
+    # groups.*
+
+    async def get_groups_by_context(self, child_institution_profile_ids):
+        return await self.get(
+            "groups.getGroupsByContext",
+            [
+                ("childInstitutionProfileIds[]", str(child_id))
+                for child_id in child_institution_profile_ids
+            ],
+        )
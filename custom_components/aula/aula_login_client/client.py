@@ -6,6 +6,7 @@ authentication flow including OAuth 2.0/OIDC, SAML, and MitID authentication.
 """
 
 import requests
+from requests.adapters import HTTPAdapter
 import urllib.parse
 import base64
 import hashlib
@@ -18,7 +19,7 @@ import uuid
 import os
 import logging
 from pathlib import Path
-from typing import Dict, Optional, Tuple, List
+from typing import Dict, Optional, Tuple, List, Union
 from urllib.parse import parse_qs, urlparse, urljoin
 
 from bs4 import BeautifulSoup
@@ -76,9 +77,10 @@ class AulaLoginClient:
         mitid_token: Optional[str] = None,
         auth_method: str = "APP",
         proxy: Optional[str] = None,
-        timeout: int = 30,
+        timeout: Union[float, Tuple[float, float]] = 30,
         debug: bool = False,
         verbose: bool = False,
+        adapter: Optional[HTTPAdapter] = None,
     ):
         """
         Initialize the Aula login client.
@@ -88,9 +90,11 @@ class AulaLoginClient:
             mitid_password: Your MitID password (for TOKEN method)
             auth_method: "APP" for MitID app, "TOKEN" for code token
             proxy: Optional SOCKS5 proxy (format: "host:port")
-            timeout: Request timeout in seconds
+            timeout: Request timeout in seconds, or a (connect, read) tuple
             debug: Enable debug logging
             verbose: Enable verbose output (default: False)
+            adapter: Optional transport adapter to send all requests through
+                (e.g. one that rate limits and retries them)
 
         Raises:
             ConfigurationError: If MitID BrowserClient is not available
@@ -101,6 +105,9 @@ class AulaLoginClient:
             )
 
         self.session = requests.Session()
+        if adapter is not None:
+            self.session.mount("https://", adapter)
+            self.session.mount("http://", adapter)
         self.mitid_username = mitid_username
         self.mitid_password = mitid_password
         self.mitid_token = mitid_token
@@ -2,17 +2,27 @@ from datetime import timedelta
 from homeassistant.components.binary_sensor import BinarySensorEntity
 from homeassistant.helpers.restore_state import RestoreEntity
 from homeassistant import config_entries, core
+from homeassistant.core import callback
 #from homeassistant.util import Throttle
 import logging
 
-from .const import DOMAIN
+from .const import DOMAIN, SOURCE_MESSAGES
 
 _LOGGER = logging.getLogger(__name__)
 SCAN_INTERVAL = timedelta(seconds=300.0)
 
+# Before several entries were supported there was a single message sensor
+LEGACY_MESSAGE_UNIQUE_ID = "aulamessage"
+
+
+def message_unique_id(entry_id):
+    """Return the unique id of the message sensor of a config entry."""
+    return LEGACY_MESSAGE_UNIQUE_ID + "_" + entry_id
+
 async def async_setup_entry(hass: core.HomeAssistant, config_entry: config_entries.ConfigEntry, async_add_entities):
 
-    client = hass.data[DOMAIN]["client"]
+    entry_data = hass.data[DOMAIN][config_entry.entry_id]
+    client = entry_data["client"]
     if client.unread_messages == 1:
         try:
             subject = client.message["subject"]
@@ -32,19 +42,30 @@ async def async_setup_entry(hass: core.HomeAssistant, config_entry: config_entri
         sender= ""
 
     sensors = []
-    device = AulaBinarySensor(hass=hass, unread=client.unread_messages, subject=subject, text=text, sender=sender)
+    device = AulaBinarySensor(
+        hass=hass,
+        client=client,
+        coordinator=entry_data["coordinators"][SOURCE_MESSAGES],
+        unique_id=message_unique_id(config_entry.entry_id),
+        unread=client.unread_messages,
+        subject=subject,
+        text=text,
+        sender=sender,
+    )
     sensors.append(device)
     async_add_entities(sensors, True)
 
 
 class AulaBinarySensor(BinarySensorEntity, RestoreEntity):
-    def __init__(self,hass,unread,subject,text,sender):
+    def __init__(self,hass,client,coordinator,unique_id,unread,subject,text,sender):
         self._hass = hass
+        self._unique_id = unique_id
         self._unread = unread
         self._subject = subject
         self._text = text
         self._sender = sender
-        self._client = self._hass.data[DOMAIN]["client"]
+        self._client = client
+        self._coordinator = coordinator
 
     @property
     def extra_state_attributes(self):
@@ -57,8 +78,7 @@ class AulaBinarySensor(BinarySensorEntity, RestoreEntity):
 
     @property
     def unique_id(self):
-        unique_id = "aulamessage"
-        return unique_id
+        return self._unique_id
 
     @property
     def icon(self):
@@ -68,6 +88,26 @@ class AulaBinarySensor(BinarySensorEntity, RestoreEntity):
     def friendly_name(self):
         return "Aula message"
 
+    @property
+    def should_poll(self):
+        """No need to poll. The messages coordinator notifies us of updates."""
+        return False
+
+    @property
+    def available(self):
+        return self._coordinator.last_update_success
+
+    async def async_added_to_hass(self):
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            self._coordinator.async_add_listener(self._handle_coordinator_update)
+        )
+
+    @callback
+    def _handle_coordinator_update(self):
+        self.update()
+        self.async_write_ha_state()
+
     @property
     def is_on(self):
         if self._state == 1:
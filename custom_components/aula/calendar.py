@@ -1,7 +1,10 @@
 from datetime import datetime, timedelta, date
-import logging, time
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+import hashlib, json, logging, re, time
 from .const import (
     DOMAIN,
+    SOURCE_CALENDAR,
     CONF_SCHOOLSCHEDULE,
     CONF_SCHOOLSCHEDULE_EMOJI,
     TEACHER_NAME_INITIALS,
@@ -22,6 +25,21 @@ _LOGGER = logging.getLogger(__name__)
 MIN_TIME_BETWEEN_UPDATES = timedelta(minutes=10)
 PARALLEL_UPDATES = 1
 
+# Before several entries were supported the calendars of a child were
+# "aulacalendar<child id>" and "aulabirthdays<child id>"
+LEGACY_SCHEDULE_UNIQUE_ID = re.compile(r"aulacalendar(\d+)")
+LEGACY_BIRTHDAYS_UNIQUE_ID = re.compile(r"aulabirthdays(\d+)")
+
+
+def schedule_unique_id(entry_id, childid):
+    """Return the unique id of a child's school schedule in a config entry."""
+    return f"aulacalendar{childid}_{entry_id}"
+
+
+def birthdays_unique_id(entry_id, childid):
+    """Return the unique id of a child's birthday calendar in a config entry."""
+    return f"aulabirthdays{childid}_{entry_id}"
+
 
 async def async_setup_entry(
     hass: core.HomeAssistant,
@@ -36,7 +54,7 @@ async def async_setup_entry(
     if not config[CONF_SCHOOLSCHEDULE] == True:
         async_add_entities([])
         return
-    client = hass.data[DOMAIN]["client"]
+    client = config["client"]
     teacher_name_display = resolve_teacher_name_display(config)
     show_emoji = config.get(CONF_SCHOOLSCHEDULE_EMOJI, False)
 
@@ -44,9 +62,7 @@ async def async_setup_entry(
     calendar = []
 
     # Discover each child's actual Aula class group.
-    child_groups = await hass.async_add_executor_job(
-        client.get_child_class_groups
-    )
+    child_groups = await client.async_get_child_class_groups()
 
     for child in client._children:
         childid = child["id"]
@@ -56,11 +72,14 @@ async def async_setup_entry(
         calendar_devices.append(
             CalendarDevice(
                 hass,
+                client,
+                config["coordinators"][SOURCE_CALENDAR],
                 calendar,
                 name,
                 childid,
                 teacher_name_display,
                 show_emoji,
+                config_entry.entry_id,
             )
         )
 
@@ -71,9 +90,11 @@ async def async_setup_entry(
             calendar_devices.append(
                 BirthdayCalendarDevice(
                     hass,
+                    client,
                     name,
                     childid,
                     group_info["group_id"],
+                    config_entry.entry_id,
                 )
             )
         else:
@@ -89,16 +110,23 @@ class CalendarDevice(CalendarEntity):
     def __init__(
         self,
         hass,
+        client,
+        coordinator,
         calendar,
         name,
         childid,
         teacher_name_display=TEACHER_NAME_INITIALS,
         show_emoji=False,
+        entry_id=None,
     ):
-        self.data = CalendarData(hass, calendar, childid, teacher_name_display, show_emoji)
+        self.data = CalendarData(
+            hass, client, calendar, childid, teacher_name_display, show_emoji
+        )
+        self._coordinator = coordinator
         self._cal_data = {}
         self._name = "Skoleskema " + name
         self._childid = childid
+        self._entry_id = entry_id
 
     @property
     def event(self):
@@ -112,14 +140,24 @@ class CalendarDevice(CalendarEntity):
 
     @property
     def unique_id(self):
-        unique_id = "aulacalendar" + str(self._childid)
+        unique_id = schedule_unique_id(self._entry_id, self._childid)
         _LOGGER.debug("Unique ID for calendar " + str(self._childid) + " " + unique_id)
         return unique_id
 
-    def update(self):
-        """Update all Calendars."""
+    async def async_update(self):
+        """Update all Calendars.
+
+        Only reads the in-memory calendar store, so it runs on the event loop
+        like everything else that reads or updates the store.
+        """
         self.data.update()
 
+    async def async_added_to_hass(self):
+        """Keep the school schedule refreshed while the calendar exists."""
+        self.async_on_remove(
+            self._coordinator.async_add_listener(self.async_write_ha_state)
+        )
+
     async def async_get_events(self, hass, start_date, end_date):
         """Get all events in a specific time frame."""
         return await self.data.async_get_events(hass, start_date, end_date)
@@ -129,15 +167,18 @@ class BirthdayCalendarDevice(CalendarEntity):
     def __init__(
         self,
         hass,
+        client,
         child_name,
         childid,
         group_id,
+        entry_id=None,
     ):
         self._hass = hass
-        self._client = hass.data[DOMAIN]["client"]
+        self._client = client
 
         self._childid = childid
         self._group_id = group_id
+        self._entry_id = entry_id
 
         # Use first name in event summaries
         self._child_name = child_name.split()[0]
@@ -155,17 +196,17 @@ class BirthdayCalendarDevice(CalendarEntity):
     @property
     def unique_id(self):
         """Return unique entity ID."""
-        return "aulabirthdays" + str(self._childid)
+        return birthdays_unique_id(self._entry_id, self._childid)
 
     @property
     def event(self):
         """Return next upcoming birthday."""
         return self._event
 
-    def update(self):
+    async def async_update(self):
         """Update birthday information."""
 
-        self._birthdays = self._client.get_class_birthdays(
+        self._birthdays = await self._client.async_get_class_birthdays(
             self._group_id
         )
 
@@ -179,9 +220,8 @@ class BirthdayCalendarDevice(CalendarEntity):
     ):
         """Return birthday events for requested period."""
 
-        birthdays = await hass.async_add_executor_job(
-            self._client.get_class_birthdays,
-            self._group_id,
+        birthdays = await self._client.async_get_class_birthdays(
+            self._group_id
         )
 
         return self._create_events(
@@ -319,6 +359,7 @@ class CalendarData:
     def __init__(
         self,
         hass,
+        client,
         calendar,
         childid,
         teacher_name_display=TEACHER_NAME_INITIALS,
@@ -333,43 +374,113 @@ class CalendarData:
         self._show_emoji = show_emoji
 
         self.all_events = []
-        self._client = hass.data[DOMAIN]["client"]
+        self.parse_cache = LessonParseCache(teacher_name_display, show_emoji)
+        self._index = EventIndex([])
+        self._all_events_version = None
+        self._client = client
 
     def parseCalendarData(self, i=None):
-        import json
-
-        try:
-            with open("skoleskema.json", "r") as openfile:
-                _data = json.load(openfile)
-            data = json.loads(_data)
-        except:
-            _LOGGER.warn("Could not open and parse file skoleskema.json!")
-            return False
-        events = []
-        _LOGGER.debug("Parsing skoleskema.json...")
-        for c in data["data"]:
-            if c["type"] == "lesson" and c["belongsToProfiles"][0] == self._childid:
-                event = parseCalendarLesson(c, self._teacher_name_display, self._show_emoji)
-                events.append(event)
-        return events
+        """Return this child's lessons as CalendarEvents.
+
+        The lessons come from the client's in-memory calendar store. They are
+        only converted again (and the range index rebuilt) when the store has
+        received new data.
+        """
+        store = self._client.calendar_store
+        if self._all_events_version != store.version:
+            self.all_events = self.parse_cache.parse(store.lessons(self._childid))
+            _LOGGER.debug(
+                "Parsed school schedule for child %s (parse cache: %s hits, %s misses)",
+                self._childid,
+                self.parse_cache.hits,
+                self.parse_cache.misses,
+            )
+            self._index = EventIndex(self.all_events)
+            self._all_events_version = store.version
+        return self.all_events
 
     async def async_get_events(self, hass, start_date, end_date):
-        # Run file I/O in executor to avoid blocking the event loop
-        all_events = await hass.async_add_executor_job(self.parseCalendarData)
-        if not all_events:
-            return []
-
-        filtered_events = []
-        for event in all_events:
-            if event.end > start_date and event.start < end_date:
-                filtered_events.append(event)
-
-        return filtered_events
+        await self._client.async_load_calendar_range(start_date, end_date)
+        self.parseCalendarData()
+        return self._index.between(start_date, end_date)
 
     @Throttle(MIN_TIME_BETWEEN_UPDATES)
     def update(self):
         _LOGGER.debug("Updating calendars...")
-        self.parseCalendarData(self)
+        self.parseCalendarData()
+
+
+class EventIndex:
+    """CalendarEvents sorted by start time, for fast range queries.
+
+    Next to the start times the index keeps the running maximum of the end
+    times, so between() can bisect both ends of the range and only has to
+    check the end time of the events inside it.
+    """
+
+    def __init__(self, events):
+        self._events = sorted(events, key=lambda event: event.start)
+        self._starts = [event.start for event in self._events]
+        self._max_ends = list(accumulate((event.end for event in self._events), max))
+
+    def __len__(self):
+        return len(self._events)
+
+    def between(self, start, end):
+        """Return the events that overlap the range from start to end."""
+        lo = bisect_right(self._max_ends, start)
+        hi = bisect_left(self._starts, end)
+        return [event for event in self._events[lo:hi] if event.end > start]
+
+
+def lesson_digest(lesson):
+    """Return a hash of a lesson's raw JSON, to tell when it has changed."""
+    raw = json.dumps(lesson, sort_keys=True, separators=(",", ":"))
+    return hashlib.blake2b(raw.encode(), digest_size=16).digest()
+
+
+class LessonParseCache:
+    """CalendarEvents built by parseCalendarLesson, keyed by lesson id.
+
+    Each entry remembers the digest of the lesson it was built from, so a
+    lesson is only parsed again when it is new or its content has changed.
+    hits and misses count the lessons reused and parsed since creation.
+    """
+
+    def __init__(self, teacher_name_display=TEACHER_NAME_INITIALS, show_emoji=False):
+        self._teacher_name_display = teacher_name_display
+        self._show_emoji = show_emoji
+        self._entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def parse(self, lessons):
+        """Return the CalendarEvents for lessons, reusing unchanged ones.
+
+        Lessons that are no longer present are dropped from the cache.
+        """
+        entries = {}
+        events = []
+        for lesson in lessons:
+            lesson_id = lesson.get("id")
+            digest = lesson_digest(lesson)
+            cached = self._entries.get(lesson_id)
+            if lesson_id is not None and cached is not None and cached[0] == digest:
+                self.hits += 1
+                event = cached[1]
+            else:
+                self.misses += 1
+                event = parseCalendarLesson(
+                    lesson, self._teacher_name_display, self._show_emoji
+                )
+            if lesson_id is not None:
+                entries[lesson_id] = (digest, event)
+            events.append(event)
+        self._entries = entries
+        return events
 
 
 def parseCalendarLesson(lesson, teacher_name_display=TEACHER_NAME_INITIALS, show_emoji=False):
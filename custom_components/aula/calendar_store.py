@@ -0,0 +1,293 @@
+"""In-memory store for the school schedule fetched from Aula.
+
+Client decodes the calendar.getEventsByProfileIdsAndResourceIds responses and
+keeps the lessons here, so the calendar entities read them straight from
+memory. The events of a response are decoded and sorted into weeks and
+children one at a time, dropping everything that is not a lesson, so a long
+range never becomes one list of every event. The schedule is kept in
+week-sized windows (Monday to Monday, UTC), each fetched and refreshed on its
+own: the current and next week on every refresh, weeks further away much
+more rarely. Inside Home Assistant the windows are also saved under
+.storage, so the schedule is available right after a restart.
+"""
+import datetime
+import logging
+
+from .const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+
+# How old a window may get before it is fetched again. The current and next
+# week are fetched on every refresh.
+NEAR_WEEKS = 2
+FUTURE_WEEK_MAX_AGE = datetime.timedelta(hours=6)
+PAST_WEEK_MAX_AGE = datetime.timedelta(hours=24)
+
+# Contiguous stale weeks are fetched together, at most this many per request
+MAX_WEEKS_PER_REQUEST = 4
+
+# Upper bound on the weeks fetched for one calendar query outside the horizon
+MAX_ON_DEMAND_WEEKS = 26
+
+
+def week_start(day):
+    """Return the Monday of the week day falls in."""
+    return day - datetime.timedelta(days=day.weekday())
+
+
+def horizon_weeks(today, weeks_back, weeks_ahead):
+    """Return the Mondays of the weeks from weeks_back before to weeks_ahead after today's week."""
+    monday = week_start(today)
+    return [
+        monday + datetime.timedelta(weeks=offset)
+        for offset in range(-weeks_back, weeks_ahead + 1)
+    ]
+
+
+def weeks_between(start, end):
+    """Return the Mondays of the weeks overlapping the range from start to end."""
+    weeks = []
+    monday = week_start(start)
+    while monday < end:
+        weeks.append(monday)
+        monday += datetime.timedelta(weeks=1)
+    return weeks
+
+
+def week_runs(weeks, max_length=MAX_WEEKS_PER_REQUEST):
+    """Group Mondays into runs of consecutive weeks, at most max_length long."""
+    runs = []
+    for monday in sorted(weeks):
+        if (
+            runs
+            and len(runs[-1]) < max_length
+            and monday - runs[-1][-1] == datetime.timedelta(weeks=1)
+        ):
+            runs[-1].append(monday)
+        else:
+            runs.append([monday])
+    return runs
+
+
+def lesson_week(lesson):
+    """Return the Monday (UTC) of the week a lesson starts in."""
+    start = datetime.datetime.fromisoformat(lesson["startDateTime"])
+    if start.tzinfo is not None:
+        start = start.astimezone(datetime.timezone.utc)
+    return week_start(start.date())
+
+
+def _lesson_child(event):
+    # The child a lesson belongs to: the first profile in its
+    # belongsToProfiles list. None for other events.
+    try:
+        if event["type"] != "lesson":
+            return None
+        return event["belongsToProfiles"][0]
+    except (KeyError, IndexError, TypeError):
+        _LOGGER.debug("Skipping calendar event without profile: " + str(event))
+        return None
+
+
+def index_lessons(events):
+    """Return {child id: [lesson, ...]} for the lessons in a calendar response.
+
+    A lesson belongs to the first profile in its belongsToProfiles list.
+    Events that are not lessons are left out.
+    """
+    lessons = {}
+    for event in events or []:
+        childid = _lesson_child(event)
+        if childid is not None:
+            lessons.setdefault(childid, []).append(event)
+    return lessons
+
+
+def index_lessons_by_week(events):
+    """Return {monday: {child id: [lesson, ...]}} for the lessons among events.
+
+    events may be any iterable, such as the items of a calendar response as
+    they are decoded. Every event is looked at once and only lessons are kept,
+    so no list of all the events is needed.
+    """
+    weeks = {}
+    for event in events:
+        childid = _lesson_child(event)
+        if childid is None:
+            continue
+        try:
+            monday = lesson_week(event)
+        except (KeyError, TypeError, ValueError):
+            continue
+        weeks.setdefault(monday, {}).setdefault(childid, []).append(event)
+    return weeks
+
+
+class CalendarStore:
+    """The school schedule, as week windows of lessons indexed by child id."""
+
+    def __init__(self, hass=None, entry_id=None):
+        # {monday: (fetched at, {child id: [lesson, ...]})}
+        self._weeks = {}
+        # Bumped on every update, so readers can tell when to rebuild
+        # anything they derived from the lessons.
+        self.version = 0
+        self._store = None
+        if hass is not None and entry_id is not None:
+            from homeassistant.helpers.storage import Store
+
+            self._store = Store(
+                hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}.calendar"
+            )
+
+    def lessons(self, childid):
+        """Return the lessons of one child in all loaded weeks."""
+        lessons = []
+        for monday in sorted(self._weeks):
+            lessons.extend(self._weeks[monday][1].get(childid, []))
+        return lessons
+
+    def day_bounds(self, childid, day, tzinfo):
+        """Return (first lesson start, last lesson end) of a child on a day.
+
+        The times are aware datetimes in tzinfo. Returns None if the child
+        has no lessons that day (or the week is not loaded).
+        """
+        first = last = None
+        week = self._weeks.get(week_start(day))
+        for lesson in week[1].get(childid, []) if week else []:
+            try:
+                start = datetime.datetime.fromisoformat(lesson["startDateTime"]).astimezone(tzinfo)
+                end = datetime.datetime.fromisoformat(lesson["endDateTime"]).astimezone(tzinfo)
+            except (KeyError, TypeError, ValueError):
+                continue
+            if start.date() != day:
+                continue
+            if first is None or start < first:
+                first = start
+            if last is None or end > last:
+                last = end
+        if first is None:
+            return None
+        return first, last
+
+    def loaded_weeks(self):
+        """Return the Mondays of the weeks currently loaded."""
+        return sorted(self._weeks)
+
+    def missing_weeks(self, weeks):
+        """Return the weeks that have not been fetched at all."""
+        return [monday for monday in weeks if monday not in self._weeks]
+
+    def stale_weeks(self, weeks, now):
+        """Return the weeks that are due to be fetched (again)."""
+        this_week = week_start(now.date())
+        stale = []
+        for monday in weeks:
+            if monday not in self._weeks:
+                stale.append(monday)
+                continue
+            offset = (monday - this_week).days // 7
+            if 0 <= offset < NEAR_WEEKS:
+                stale.append(monday)
+                continue
+            max_age = FUTURE_WEEK_MAX_AGE if offset > 0 else PAST_WEEK_MAX_AGE
+            if now - self._weeks[monday][0] >= max_age:
+                stale.append(monday)
+        return stale
+
+    def update(self, weeks, events, now):
+        """Store the events of a calendar response covering the given weeks.
+
+        Every week in weeks is replaced, including weeks the response has no
+        lessons for. Lessons starting outside those weeks are ignored.
+        """
+        self.update_weeks(weeks, index_lessons_by_week(events or []), now)
+
+    def update_weeks(self, weeks, lessons_by_week, now):
+        """Like update, for lessons already indexed by index_lessons_by_week."""
+        for monday in weeks:
+            self._weeks[monday] = (now, lessons_by_week.get(monday, {}))
+        self.version += 1
+        self._schedule_save()
+
+    def touch(self, weeks, now):
+        """Mark loaded weeks as fetched at now, without changing their lessons.
+
+        Used when a week was fetched again but the response had not changed.
+        The fetched-at times are saved too, so the weeks are not stale again
+        after a restart.
+        """
+        touched = False
+        for monday in weeks:
+            if monday in self._weeks:
+                self._weeks[monday] = (now, self._weeks[monday][1])
+                touched = True
+        if touched:
+            self._schedule_save()
+
+    def prune(self, keep, now, max_age=FUTURE_WEEK_MAX_AGE):
+        """Drop weeks outside keep that were fetched more than max_age ago.
+
+        Weeks fetched on demand (when the calendar was browsed outside the
+        horizon) are kept around for a while, so browsing back and forth does
+        not fetch them again.
+        """
+        keep = set(keep)
+        expired = [
+            monday
+            for monday, (fetched, _) in self._weeks.items()
+            if monday not in keep and now - fetched >= max_age
+        ]
+        for monday in expired:
+            del self._weeks[monday]
+        if expired:
+            self.version += 1
+            self._schedule_save()
+
+    def _schedule_save(self):
+        if self._store is not None:
+            self._store.async_delay_save(self._data_to_save, 10)
+
+    def _data_to_save(self):
+        return {
+            "weeks": {
+                monday.isoformat(): {
+                    "fetched": fetched.isoformat(),
+                    "lessons": lessons,
+                }
+                for monday, (fetched, lessons) in self._weeks.items()
+            }
+        }
+
+    async def async_load(self):
+        """Load the schedule saved by a previous run, if any."""
+        if self._store is None:
+            return
+        try:
+            data = await self._store.async_load()
+        except Exception as e:
+            _LOGGER.warning(f"Could not load cached school schedule: {e}")
+            return
+        if not data or self._weeks:
+            return
+        try:
+            for monday, week in data.get("weeks", {}).items():
+                # JSON turned the child ids into strings
+                self._weeks[datetime.date.fromisoformat(monday)] = (
+                    datetime.datetime.fromisoformat(week["fetched"]),
+                    {int(childid): lessons for childid, lessons in week["lessons"].items()},
+                )
+        except (KeyError, TypeError, ValueError) as e:
+            _LOGGER.warning(f"Ignoring invalid cached school schedule: {e}")
+            self._weeks = {}
+            return
+        self.version += 1
+        _LOGGER.debug("Loaded cached school schedule from storage")
+
+    async def async_remove(self):
+        """Delete the saved schedule."""
+        if self._store is not None:
+            await self._store.async_remove()
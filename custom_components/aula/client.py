@@ -1,12 +1,13 @@
 import logging
-import requests
 import datetime
 import pytz
 import asyncio
 import threading
 import datetime
 import base64
+import inspect
 import urllib.parse
+import aiohttp
 from bs4 import BeautifulSoup
 import json, re
 from .const import (
@@ -16,8 +17,45 @@ from .const import (
     MEEBOOK_API,
     SYSTEMATIC_API,
     EASYIQ_API,
+    DEFAULT_MAX_CONCURRENCY,
+    PROFILE_CONTEXT_TTL,
+    DEFAULT_VERIFY_INTERVAL,
+    DEFAULT_CALENDAR_WEEKS_BACK,
+    DEFAULT_CALENDAR_WEEKS_AHEAD,
+    DEFAULT_WIDGET_TOKEN_TTL,
+    DEFAULT_REFRESH_DEADLINE,
+    WIDGET_TOKEN_RENEW_MARGIN,
+    SOURCES,
+    SOURCE_PRESENCE,
+    SOURCE_MESSAGES,
+    SOURCE_CALENDAR,
+    SOURCE_MU_OPGAVER,
+    SOURCE_UGEPLAN,
+    STAGE_PREPARE,
+    STAGE_PRESENCE,
+    STAGE_MESSAGES,
+    STAGE_CALENDAR,
+    STAGE_MU_OPGAVER,
+    STAGE_MU_UGEBREV,
+    STAGE_EASYIQ,
+    STAGE_MEEBOOK,
+    STAGE_HUSKELISTEN,
 )
 from homeassistant.exceptions import ConfigEntryNotReady, ConfigEntryAuthFailed
+from homeassistant.helpers.update_coordinator import UpdateFailed
+from .api import AulaApi, iter_json_items
+from .scheduler import AulaScheduler
+from .rate_limit import JitteredRetry, RateLimitedAdapter
+from .fingerprint import ResponseCache
+from .pipeline import StageHealth
+from .calendar_store import (
+    CalendarStore,
+    MAX_ON_DEMAND_WEEKS,
+    horizon_weeks,
+    index_lessons_by_week,
+    week_runs,
+    weeks_between,
+)
 from .aula_login_client.client import AulaLoginClient
 from .aula_login_client.exceptions import AulaAuthenticationError
 
@@ -29,6 +67,19 @@ _LOGGER = logging.getLogger(__name__)
 # schools that do not expose 0030 to guardians.
 MU_OPGAVER_WIDGETS = ("0030", "0023")
 
+# The login flow is a chain of one-off steps, so only its GETs are retried
+LOGIN_RETRY = JitteredRetry(
+    total=2,
+    backoff_factor=0.5,
+    status_forcelist=(429, 502, 503, 504),
+    allowed_methods=frozenset({"GET"}),
+    respect_retry_after_header=True,
+    raise_on_status=False,
+)
+
+# (connect, read) timeout in seconds for the requests of the login flow
+LOGIN_TIMEOUT = (10, 30)
+
 
 def decode_mu_deeplink(url):
     """Return the MinUddannelse page URL embedded in an opgave "url" field.
@@ -74,16 +125,77 @@ def format_mu_opgaver(opgaver, first_name):
     return _ugep
 
 
-class Client:
-    huskeliste = {}
-    presence = {}
-    ugep_attr = {}
-    ugepnext_attr = {}
-    mu_opgaver_attr = {}
-    mu_opgaver_next_attr = {}
-    widgets = {}
-    tokens = {}
+def map_daily_overview(overviews, child_ids):
+    """Map a presence.getDailyOverview data list to {child id: overview}.
+
+    The overviews are matched on institutionProfile.id, which is the child id
+    the overview was requested for. Children missing from the list map to None.
+    """
+    by_id = {}
+    for overview in overviews or []:
+        try:
+            by_id[str(overview["institutionProfile"]["id"])] = overview
+        except (KeyError, TypeError):
+            _LOGGER.debug("Daily overview without institution profile: " + str(overview))
+    return {str(child_id): by_id.get(str(child_id)) for child_id in child_ids}
+
+
+def _response_data(response):
+    """Return the data member of an Aula JSON response, or None."""
+    response_json = response.json()
+    return response_json.get("data") if response_json else None
+
+
+def _first_unread_thread(response):
+    """Return the id of the newest unread thread in a messaging.getThreads response."""
+    response_data = _response_data(response)
+    for thread in (response_data or {}).get("threads") or []:
+        if not thread["read"]:
+            return thread["id"]
+    return None
+
+
+def _calendar_key(weeks):
+    return (SOURCE_CALENDAR, weeks[0].isoformat(), len(weeks))
+
+
+def _calendar_lessons(response):
+    """Return the lessons of a calendar response by week and child.
+
+    The data array is decoded one event at a time and only lessons are kept.
+    Returns None if the response has no data array.
+    """
+    try:
+        return index_lessons_by_week(iter_json_items(response.text))
+    except (ValueError, TypeError):
+        return None
 
+
+def _require_guardian(guardian):
+    # A failed guardian lookup only fails the stages that need the userId
+    if guardian is None:
+        raise ValueError("Could not get the guardian userId from the profile context")
+
+
+# Result of a stage whose fetch failed
+_FAILED = object()
+
+
+def jwt_expiry(token):
+    """Return the exp claim of a JWT as an aware UTC datetime.
+
+    Returns None if the token is not a JWT or has no exp claim.
+    """
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        claims = json.loads(base64.urlsafe_b64decode(payload))
+        return datetime.datetime.fromtimestamp(int(claims["exp"]), datetime.timezone.utc)
+    except (AttributeError, IndexError, KeyError, TypeError, ValueError):
+        return None
+
+
+class Client:
     def __init__(
         self,
         mitid_username,
@@ -98,6 +210,14 @@ class Client:
         mitid_identity=1,
         hass=None,
         config_entry=None,
+        max_concurrency=DEFAULT_MAX_CONCURRENCY,
+        session=None,
+        verify_interval=DEFAULT_VERIFY_INTERVAL,
+        calendar_weeks_back=DEFAULT_CALENDAR_WEEKS_BACK,
+        calendar_weeks_ahead=DEFAULT_CALENDAR_WEEKS_AHEAD,
+        widget_token_ttl=DEFAULT_WIDGET_TOKEN_TTL,
+        scheduler=None,
+        refresh_deadline=DEFAULT_REFRESH_DEADLINE,
     ):
         self._mitid_username = mitid_username
         self._auth_method = auth_method
@@ -105,13 +225,59 @@ class Client:
         self._mitid_token = mitid_token
         self._mitid_identity = mitid_identity
 
+        # Data read by the entities. Kept per client, so several config
+        # entries (e.g. one per guardian) never see each other's data.
+        self.huskeliste = {}
+        self.presence = {}
+        self.ugep_attr = {}
+        self.ugepnext_attr = {}
+        self.mu_opgaver_attr = {}
+        self.mu_opgaver_next_attr = {}
+        self.widgets = {}
+        self.tokens = {}
+
         self._birthday_cache = {}
         self._birthday_cache_time = {}
 
+        # School schedule, read by the calendar entities. The weeks from
+        # calendar_weeks_back before to calendar_weeks_ahead after the current
+        # week are kept loaded; other weeks are fetched when asked for.
+        self.calendar_store = CalendarStore(
+            hass, config_entry.entry_id if config_entry else None
+        )
+        self._calendar_weeks_back = calendar_weeks_back
+        self._calendar_weeks_ahead = calendar_weeks_ahead
+        self._calendar_lock = asyncio.Lock()
+
+        # Fingerprints and parsed results of the last responses, so unchanged
+        # responses are not parsed and rendered again.
+        self.response_cache = ResponseCache()
+
+        # Timing and outcome of every refresh stage
+        self.stage_health = StageHealth()
+
+        # The sources are refreshed on separate schedules; only one refresh
+        # at a time checks the login and rebuilds the list of children.
+        self._prepare_lock = asyncio.Lock()
+
+        # Guardian profile context, shared by every lookup within a refresh
+        self._profile_context = None
+        self._profile_context_time = None
+
         # Store Home Assistant references for token persistence
         self._hass = hass
         self._config_entry = config_entry
 
+        # Shared with the clients of the other config entries: keep-alive
+        # sessions for the widget providers, the rate limiter, the global
+        # request budget and the sharing of identical requests. A client on
+        # its own gets one of its own.
+        self._owns_scheduler = scheduler is None
+        if scheduler is None:
+            scheduler = AulaScheduler(max_concurrency, stagger_spacing=0)
+        self._scheduler = scheduler
+        self._provider_sessions = scheduler.provider_sessions
+
         # Initialize AulaLoginClient
         self._aula_client = AulaLoginClient(
             mitid_username=mitid_username,
@@ -120,6 +286,10 @@ class Client:
             auth_method=auth_method,
             verbose=False,
             debug=False,
+            timeout=LOGIN_TIMEOUT,
+            adapter=RateLimitedAdapter(
+                scheduler.rate_limiter, scheduler.metrics, max_retries=LOGIN_RETRY
+            ),
         )
 
         # Set up identity selector callback
@@ -143,38 +313,118 @@ class Client:
         self._ugeplan = ugeplan
         self._mu_opgaver = mu_opgaver
 
+        # Upper bound on the number of requests update_data runs at once
+        self._max_concurrency = max_concurrency
+
+        # Seconds a refresh waits for the widget providers before publishing
+        # what it has without them
+        self._refresh_deadline = refresh_deadline
+
+        # Widget tokens are kept until shortly before their JWT exp, or for
+        # widget_token_ttl seconds when they carry no expiry. Concurrent
+        # requests for the same widget share one aulaToken.getAulaToken call.
+        self._widget_token_ttl = widget_token_ttl
+        self._token_requests = {}
+
+        # Minutes a successful profiles.getProfilesByLogin call is trusted
+        # before update_data checks the login again (0 = every refresh)
+        self._verify_interval = verify_interval
+        self._verified_at = None
+
         # Token storage
         self._tokens = stored_tokens or {}
 
         # Token refresh lock to prevent concurrent refresh attempts
         self._token_refresh_lock = threading.Lock()
 
-        # HTTP session
-        self._session = None
+        # Aula API (async, on the aiohttp session Home Assistant hands us)
+        self._api = AulaApi(
+            session,
+            self._get_access_token,
+            on_auth_failure=self._on_auth_failure,
+            deduper=scheduler.deduper,
+            limiter=scheduler.rate_limiter,
+            metrics=scheduler.metrics,
+        )
+        self._loop = None
         self.unread_messages = unread_messages
+        self.message = {}
+        # (unread messages, message) fetched for the thread list cached
+        # under (SOURCE_MESSAGES, "threads"), whether or not it was merged
+        self._thread_messages = None
+        self._daily_overview = {}
+
+    @property
+    def apiurl(self):
+        return self._api.apiurl
 
-    def _get_access_token_param(self):
+    def _get_access_token(self):
         if self._tokens and "access_token" in self._tokens:
-            return "&access_token=" + self._tokens["access_token"]
-        return ""
+            return self._tokens["access_token"]
+        return None
+
+    def close(self):
+        """Close the HTTP sessions held for the widget providers, unless shared."""
+        if self._owns_scheduler:
+            self._scheduler.close()
+
+    def _on_auth_failure(self):
+        """Aula rejected a request - check the login on the next refresh."""
+        if self._verified_at is not None:
+            _LOGGER.debug("Aula returned 401/403, login will be verified again")
+        self._verified_at = None
 
     def _get_csrf_token(self):
         """Get CSRF token from session cookies, or None if not available."""
-        cookies = self._session.cookies.get_dict()
-        return cookies.get("Csrfp-Token")
+        return self._api.csrf_token()
+
+    def _run(self, coro):
+        """Run an async Client/AulaApi coroutine from synchronous code.
+
+        This keeps the old synchronous methods working as thin wrappers: the
+        coroutine is scheduled on the event loop that owns the aiohttp session
+        and the calling thread waits for the result. Inside Home Assistant that
+        is HA's loop; without hass (scripts, tests) the client starts a private
+        loop in a background thread. Must not be called from the event loop
+        itself - use the async_ variant there.
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            pass
+        else:
+            coro.close()
+            raise RuntimeError("Blocking Aula call made from inside the event loop")
+
+        if self._hass is not None:
+            return asyncio.run_coroutine_threadsafe(coro, self._hass.loop).result()
+
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=self._loop.run_forever, name="aula_client", daemon=True
+            ).start()
+
+        async def with_session():
+            if self._api.session is None:
+                self._api.session = aiohttp.ClientSession()
+            return await coro
+
+        return asyncio.run_coroutine_threadsafe(with_session(), self._loop).result()
+
+    async def _async_executor(self, func, *args):
+        """Run a blocking function (MitID login, third-party widget fetch) off the loop."""
+        if self._hass is not None:
+            return await self._hass.async_add_executor_job(func, *args)
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
 
     def custom_api_call(self, uri, post_data):
-        csrf_token = self._get_csrf_token()
-        headers = {"content-type": "application/json"}
-        if csrf_token:
-            headers["csrfp-token"] = csrf_token
+        return self._run(self.async_custom_api_call(uri, post_data))
+
+    async def async_custom_api_call(self, uri, post_data):
         _LOGGER.debug("custom_api_call: Making API call to " + self.apiurl + uri)
         if post_data == 0:
-            response = self._session.get(
-                self.apiurl + uri + self._get_access_token_param(),
-                headers=headers,
-                verify=True,
-            )
+            response = await self._api.call(uri)
         else:
             try:
                 # Check if post_data is valid JSON
@@ -184,12 +434,7 @@ class Client:
                 error_msg = {"result": "Fail - invalid json supplied as post_data"}
                 return error_msg
             _LOGGER.debug("custom_api_call: post_data:" + post_data)
-            response = self._session.post(
-                self.apiurl + uri + self._get_access_token_param(),
-                headers=headers,
-                json=json.loads(post_data),
-                verify=True,
-            )
+            response = await self._api.call(uri, post_data)
         _LOGGER.debug(response.text)
         try:
             res = response.json()
@@ -219,7 +464,6 @@ class Client:
                 # If token looks valid and not forced to refresh, try to use it
                 if token_check.get("valid", False) and not force_refresh:
                     _LOGGER.info("Using valid stored tokens")
-                    self._apply_token_to_session(self._tokens["access_token"])
                     try:
                         return self._verify_api_access()
                     except (ConfigEntryNotReady, Exception) as e:
@@ -232,7 +476,6 @@ class Client:
                 if self._aula_client.renew_access_token():
                     # Update local tokens
                     self._tokens = self._aula_client.tokens
-                    self._apply_token_to_session(self._tokens["access_token"])
                     _LOGGER.info("Token refreshed successfully")
 
                     # Persist refreshed tokens to runtime storage (non-blocking)
@@ -268,7 +511,6 @@ class Client:
 
             # Store new tokens
             self._tokens = auth_result["tokens"]
-            self._apply_token_to_session(self._tokens["access_token"])
 
             # Verify API access
             return self._verify_api_access()
@@ -279,23 +521,14 @@ class Client:
             _LOGGER.error(f"Login failed: {str(e)}")
             raise ConfigEntryNotReady(f"Login failed: {str(e)}")
 
-    def _apply_token_to_session(self, access_token):
-        """Initialize session for API calls. Token is passed as query parameter, not header."""
-        if not self._session:
-            self._session = requests.Session()
-
-        # Don't set Authorization header - Aula API expects token as query parameter
-        # Setting both causes 400 Bad Request errors
-        self._session.headers.update(
-            {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:109.0) Gecko/20100101 Firefox/115.0",
-            }
-        )
-
     def _verify_api_access(self):
+        """Verify API access with current token."""
+        return self._run(self.async_verify_api_access())
+
+    async def async_verify_api_access(self):
         """Verify API access with current token."""
         # Find the API url in case of a version change
-        self.apiurl = API + API_VERSION
+        self._api.apiurl = API + API_VERSION
         apiver = int(API_VERSION)
         api_success = False
         max_version_attempts = 20  # Prevent infinite loop
@@ -303,12 +536,7 @@ class Client:
         while not api_success and apiver < int(API_VERSION) + max_version_attempts:
             _LOGGER.debug("Trying API at " + self.apiurl)
             try:
-                ver = self._session.get(
-                    self.apiurl
-                    + "?method=profiles.getProfilesByLogin"
-                    + self._get_access_token_param(),
-                    verify=True,
-                )
+                ver = await self._api.get_profiles_by_login()
 
                 if ver.status_code == 410:
                     _LOGGER.debug(
@@ -317,7 +545,7 @@ class Client:
                         + " but responded with HTTP 410. The integration will automatically try a newer version and everything may work fine."
                     )
                     apiver += 1
-                    self.apiurl = API + str(apiver)
+                    self._api.apiurl = API + str(apiver)
                 elif ver.status_code == 403:
                     msg = "Access to Aula API was denied. Token may be invalid or expired."
                     _LOGGER.error(msg)
@@ -332,6 +560,7 @@ class Client:
                     if not ver_data or "profiles" not in ver_data:
                         raise ConfigEntryNotReady("API returned 200 but no profile data")
                     self._profiles = ver_data["profiles"]
+                    self._verified_at = datetime.datetime.now(datetime.timezone.utc)
                     api_success = True
                 else:
                     _LOGGER.error(f"Unexpected API response: {ver.status_code}")
@@ -343,13 +572,8 @@ class Client:
         _LOGGER.debug("Found API on " + self.apiurl)
 
         # Get profile context
-        profile_context_response = self._session.get(
-            self.apiurl
-            + "?method=profiles.getProfileContext&portalrole=guardian"
-            + self._get_access_token_param(),
-            verify=True,
-        ).json()
-        profile_context_data = profile_context_response.get("data") if profile_context_response else None
+        self._profile_context = None
+        profile_context_data = await self.async_get_profile_context()
         if not profile_context_data:
             raise ConfigEntryNotReady("Could not get profile context - API returned no data")
         self._profilecontext = profile_context_data.get("institutionProfile", {}).get("relations", [])
@@ -365,38 +589,56 @@ class Client:
         )
         return True
 
+    async def async_get_profile_context(self):
+        """Return the data of profiles.getProfileContext for the guardian.
+
+        The response holds the guardian userId, the institution relations and
+        the widget configurations. It is cached for PROFILE_CONTEXT_TTL
+        seconds, so everything that needs it during one refresh shares a
+        single request. Returns None if Aula returned no data.
+        """
+        now = datetime.datetime.now(datetime.timezone.utc)
+        ttl = datetime.timedelta(seconds=PROFILE_CONTEXT_TTL)
+        if (
+            self._profile_context is not None
+            and now - self._profile_context_time < ttl
+        ):
+            _LOGGER.debug("Using cached profile context")
+            return self._profile_context
+
+        profile_context_response = (await self._api.get_profile_context()).json()
+        profile_context_data = profile_context_response.get("data") if profile_context_response else None
+        if profile_context_data:
+            self._profile_context = profile_context_data
+            self._profile_context_time = now
+        return profile_context_data
+
     def get_child_class_groups(self):
         """Return each child's main class group."""
+        return self._run(self.async_get_child_class_groups())
+
+    async def async_get_child_class_groups(self):
+        """Return each child's main class group."""
 
-        if not self._ensure_valid_token():
+        if not await self._async_executor(self._ensure_valid_token):
             _LOGGER.warning("Unable to retrieve Aula groups: token is not valid")
             return {}
 
         if not self._children:
             return {}
 
-        params = [
-            ("method", "groups.getGroupsByContext"),
-        ]
-
-        # Aula expects the institution profile ID, which is child["id"]
-        for child in self._children:
-            params.append(
-                ("childInstitutionProfileIds[]", str(child["id"]))
-            )
-        if self._tokens and "access_token" in self._tokens:
-            params.append(
-                ("access_token", self._tokens["access_token"])
-            )
-
         try:
-            response = self._session.get(
-                self.apiurl,
-                params=params,
-                verify=True,
+            # Aula expects the institution profile ID, which is child["id"]
+            response = await self._api.get_groups_by_context(
+                [child["id"] for child in self._children]
             )
 
-            response.raise_for_status()
+            if response.status_code != 200:
+                _LOGGER.warning(
+                    "groups.getGroupsByContext failed: HTTP %s",
+                    response.status_code,
+                )
+                return {}
             result = response.json()
 
             if result.get("status", {}).get("message") != "OK":
@@ -488,6 +730,10 @@ class Client:
 
     def get_class_birthdays(self, group_id):
         """Return classmates with birthdays for an Aula class group."""
+        return self._run(self.async_get_class_birthdays(group_id))
+
+    async def async_get_class_birthdays(self, group_id):
+        """Return classmates with birthdays for an Aula class group."""
 
         if not group_id:
             return []
@@ -504,7 +750,7 @@ class Client:
             )
             return cached
 
-        if not self._ensure_valid_token():
+        if not await self._async_executor(self._ensure_valid_token):
             _LOGGER.warning(
                 "Unable to retrieve Aula birthdays: token is not valid"
             )
@@ -517,25 +763,7 @@ class Client:
 
         while page < 50:
             try:
-                params = {
-                    "method": "profiles.getContactlist",
-                    "groupId": str(group_id),
-                    "filter": "child",
-                    "field": "name",
-                    "page": str(page),
-                    "order": "asc",
-                }
-                
-                if self._tokens and "access_token" in self._tokens:
-                    params["access_token"] = self._tokens["access_token"]
-
-                response = self._session.get(
-                    self.apiurl,
-                    params=params,
-                    verify=True,
-                )
-
-                response.raise_for_status()
+                response = await self._api.get_contactlist(group_id, page)
 
                 if response.status_code != 200:
                     _LOGGER.warning(
@@ -610,13 +838,10 @@ class Client:
         return birthdays
 
     def get_widgets(self):
-        widgets_response = self._session.get(
-            self.apiurl
-            + "?method=profiles.getProfileContext"
-            + self._get_access_token_param(),
-            verify=True,
-        ).json()
-        widgets_data = widgets_response.get("data") if widgets_response else None
+        return self._run(self.async_get_widgets())
+
+    async def async_get_widgets(self):
+        widgets_data = await self.async_get_profile_context()
         if not widgets_data:
             _LOGGER.warning("Could not get widgets - API returned no data")
             return
@@ -628,30 +853,45 @@ class Client:
         _LOGGER.info("Widgets found: " + str(self.widgets))
 
     def get_token(self, widgetid, mock=False):
+        return self._run(self.async_get_token(widgetid, mock))
+
+    async def async_get_token(self, widgetid, mock=False):
         if widgetid in self.tokens:
-            token, timestamp = self.tokens[widgetid]
-            current_time = datetime.datetime.now(pytz.utc)
-            if current_time - timestamp < datetime.timedelta(minutes=1):
+            token, renew_at = self.tokens[widgetid]
+            if datetime.datetime.now(pytz.utc) < renew_at:
                 _LOGGER.debug("Reusing existing token for widget " + widgetid)
                 return token
         if mock:
             return "MockToken"
 
+        request = self._token_requests.get(widgetid)
+        if request is None:
+            request = asyncio.ensure_future(self._request_token(widgetid))
+            self._token_requests[widgetid] = request
+            request.add_done_callback(
+                lambda _: self._token_requests.pop(widgetid, None)
+            )
+        else:
+            _LOGGER.debug("Waiting for token request in flight for widget " + widgetid)
+        return await asyncio.shield(request)
+
+    async def _request_token(self, widgetid):
         _LOGGER.debug("Requesting new token for widget " + widgetid)
-        token_response = self._session.get(
-            self.apiurl
-            + "?method=aulaToken.getAulaToken&widgetId="
-            + widgetid
-            + self._get_access_token_param(),
-            verify=True,
-        ).json()
+        token_response = (await self._api.get_aula_token(widgetid)).json()
         self._bearertoken = token_response.get("data") if token_response else None
         if not self._bearertoken:
             _LOGGER.warning(f"Could not get token for widget {widgetid}")
             return None
 
         token = "Bearer " + str(self._bearertoken)
-        self.tokens[widgetid] = (token, datetime.datetime.now(pytz.utc))
+        now = datetime.datetime.now(pytz.utc)
+        expiry = jwt_expiry(str(self._bearertoken))
+        if expiry is not None:
+            renew_at = expiry - datetime.timedelta(seconds=WIDGET_TOKEN_RENEW_MARGIN)
+            _LOGGER.debug(f"Token for widget {widgetid} expires at {expiry}")
+        else:
+            renew_at = now + datetime.timedelta(seconds=self._widget_token_ttl)
+        self.tokens[widgetid] = (token, renew_at)
         return token
 
     def _ensure_valid_token(self):
@@ -709,7 +949,6 @@ class Client:
                         "tokens": self._aula_client.tokens,
                     }
                     self._tokens = refresh_result["tokens"]
-                    self._apply_token_to_session(self._tokens["access_token"])
                     _LOGGER.info("Token refreshed successfully")
 
                     # Persist refreshed tokens to runtime storage (non-blocking)
@@ -755,670 +994,974 @@ class Client:
 
     ###
 
+    async def _async_fan_out(self, stages, optional=(), deadline=None):
+        """Run independent fetch stages concurrently and merge them in order.
+
+        Each stage is a (name, fetch, args, merge) tuple. A fetch is either a
+        coroutine function (Aula API calls, awaited on the event loop) or a
+        plain function (third-party widget providers, run in the executor).
+        At most max_concurrency fetches run at once, and the scheduler caps
+        the fetches in flight across all config entries. The merges run
+        afterwards, in the order the stages were given, so the result does not
+        depend on which request finished first.
+
+        Every stage is an error boundary: when its fetch or merge raises, the
+        error is recorded in stage_health under its name and its merge is
+        skipped, so what it feeds keeps its last good values. Only
+        ConfigEntryAuthFailed, which Home Assistant has to act on, is passed
+        on. Returns the names of the stages that failed.
+
+        The optional stages only get until deadline (a loop.time() value).
+        Those still running then are abandoned: their merge is skipped, so
+        their previous values stay, and the rest is published without them.
+        """
+        if not stages and not optional:
+            return []
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(max(1, self._max_concurrency))
+        failed = []
+        started = {}
+        # Seconds each fetch took, taken when it returns: the merges only
+        # run once every stage has finished
+        durations = {}
+
+        async def run(index, name, fetch, args):
+            async with semaphore, self._scheduler.request_slots:
+                started[index] = loop.time()
+                try:
+                    if inspect.iscoroutinefunction(fetch):
+                        result = await fetch(*args)
+                    else:
+                        result = await self._async_executor(fetch, *args)
+                except ConfigEntryAuthFailed:
+                    raise
+                except Exception as e:
+                    _LOGGER.warning(f"Refreshing {name} failed, keeping its last values: {e}")
+                    self.stage_health.failed(name, e, loop.time() - started[index])
+                    failed.append(name)
+                    return _FAILED
+                durations[index] = loop.time() - started[index]
+                return result
+
+        def merge_result(index, name, merge, result):
+            if result is _FAILED:
+                return
+            merge_started = loop.time()
+            try:
+                merge(result)
+            except Exception as e:
+                _LOGGER.warning(f"Processing {name} failed, keeping its last values: {e}")
+                duration = durations[index] + loop.time() - merge_started
+                self.stage_health.failed(name, e, duration)
+                failed.append(name)
+                return
+            duration = durations[index] + loop.time() - merge_started
+            self.stage_health.succeeded(name, duration)
+
+        # Created first, so the required stages get the first slots
+        required = asyncio.gather(
+            *(run(i, *stage[:3]) for i, stage in enumerate(stages))
+        )
+        offset = len(stages)
+        tasks = [
+            asyncio.ensure_future(run(offset + i, *stage[:3]))
+            for i, stage in enumerate(optional)
+        ]
+        try:
+            if tasks:
+                timeout = None
+                if deadline is not None:
+                    timeout = max(0, deadline - loop.time())
+                _, pending = await asyncio.wait(tasks, timeout=timeout)
+                if pending:
+                    # An executor thread cannot be interrupted; it finishes
+                    # within the provider timeouts and its result is dropped.
+                    for task in pending:
+                        task.cancel()
+                    _LOGGER.warning(
+                        f"Refresh deadline of {self._refresh_deadline}s reached, "
+                        f"publishing without {len(pending)} of {len(tasks)} widget requests"
+                    )
+            results = await required
+        except BaseException:
+            required.cancel()
+            for task in tasks:
+                task.cancel()
+            raise
+        for i, ((name, _, _, merge), result) in enumerate(zip(stages, results)):
+            merge_result(i, name, merge, result)
+        for i, ((name, _, _, merge), task) in enumerate(zip(optional, tasks)):
+            if task.cancelled():
+                since = started.get(offset + i)
+                self.stage_health.abandoned(
+                    name, None if since is None else loop.time() - since
+                )
+            else:
+                merge_result(offset + i, name, merge, task.result())
+        return failed
+
+    def _login_recently_verified(self):
+        """Return True if the login check can be skipped this refresh.
+
+        That is the case when profiles.getProfilesByLogin succeeded less than
+        verify_interval minutes ago and no request has been rejected with
+        401/403 since. The profile list (children and institutions) comes from
+        that same call, so it is refreshed on the same schedule.
+        """
+        if self._verified_at is None or not getattr(self, "_profiles", None):
+            return False
+        age = datetime.datetime.now(datetime.timezone.utc) - self._verified_at
+        return age < datetime.timedelta(minutes=self._verify_interval)
+
     def update_data(self):
+        return self._run(self.async_update_data())
+
+    async def async_update_data(self, sources=SOURCES):
+        """Refresh the given data sources (all of them by default).
+
+        The requests of all the sources are fanned out together, see
+        _async_fan_out. The widget providers (MU Opgaver and ugeplaner) only
+        get what is left of refresh_deadline seconds, counted from the start
+        of the refresh, so a slow provider cannot hold up presence.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self._refresh_deadline
+        async with self._prepare_lock:
+            started = loop.time()
+            try:
+                await self._async_prepare_update()
+            except Exception as e:
+                self.stage_health.failed(STAGE_PREPARE, e, loop.time() - started)
+                raise
+            self.stage_health.succeeded(STAGE_PREPARE, loop.time() - started)
+
+        stages = []
+        if SOURCE_PRESENCE in sources:
+            stages.extend(self._presence_stages())
+        if SOURCE_MESSAGES in sources:
+            stages.append(
+                (STAGE_MESSAGES, self._fetch_messages, (), self._merge_messages)
+            )
+        if SOURCE_CALENDAR in sources and self._schoolschedule is True:
+            stages.extend(self._calendar_stages())
+        optional = []
+        mu_opgaver = SOURCE_MU_OPGAVER in sources and self._mu_opgaver is True
+        ugeplan = SOURCE_UGEPLAN in sources and self._ugeplan is True
+        if mu_opgaver or ugeplan:
+            guardian = await self._async_guardian()
+            if len(self.widgets) == 0:
+                try:
+                    await self.async_get_widgets()
+                except Exception as e:
+                    _LOGGER.warning(f"Could not get widgets: {e}")
+            if mu_opgaver:
+                optional.extend(self._mu_opgaver_stages(guardian))
+            if ugeplan:
+                optional.extend(self._ugeplan_stages(guardian))
+
+        failed = await self._async_fan_out(stages, optional, deadline)
+        if failed and len(failed) >= len(stages) + len(optional):
+            # Nothing could be refreshed, so let the coordinators know
+            raise UpdateFailed(
+                "Refreshing " + ", ".join(sorted(set(failed))) + " failed"
+            )
+        # _LOGGER.debug("End result of ugeplan object: "+str(self.ugep_attr))
+        return True
+
+    async def _async_prepare_update(self):
+        """Make sure we are logged in and know the children and institutions."""
         # Ensure valid token before making API calls
-        self._ensure_valid_token()
+        token_valid = await self._async_executor(self._ensure_valid_token)
 
         is_logged_in = False
-        if self._session:
-            response = self._session.get(
-                self.apiurl
-                + "?method=profiles.getProfilesByLogin"
-                + self._get_access_token_param(),
-                verify=True,
-            ).json()
-            is_logged_in = response["status"]["message"] == "OK"
+        if token_valid and self._login_recently_verified():
+            # The JWT is valid locally and Aula accepted it recently, so skip
+            # the profiles.getProfilesByLogin round trip and reuse _profiles.
+            is_logged_in = True
+        else:
+            try:
+                response = (await self._api.get_profiles_by_login()).json()
+                is_logged_in = response["status"]["message"] == "OK"
+                if is_logged_in:
+                    self._profiles = response["data"]["profiles"]
+                    self._verified_at = datetime.datetime.now(datetime.timezone.utc)
+            except Exception as e:
+                is_logged_in = False
+                _LOGGER.debug(f"Login check failed: {e}")
 
         _LOGGER.debug("is_logged_in? " + str(is_logged_in))
 
         if not is_logged_in:
-            self.login()
-
-        self._childnames = {}
-        self._institutions = {}
-        self._childuserids = []
-        self._childids = []
-        self._children = []
-        self._institutionProfiles = []
-        self._childrenFirstNamesAndUserIDs = {}
+            await self._async_executor(self.login)
+
+        # Built aside and assigned at the end: the stages of other
+        # coordinators read these, also from executor threads, while this
+        # refresh runs, and must never see them empty or half filled
+        childnames = {}
+        institutions = {}
+        childuserids = []
+        childids = []
+        children = []
+        institution_profiles = []
+        first_names = {}
         for profile in self._profiles:
             for child in profile["children"]:
-                self._childnames[child["id"]] = child["name"]
-                self._institutions[child["id"]] = child["institutionProfile"][
+                childnames[child["id"]] = child["name"]
+                institutions[child["id"]] = child["institutionProfile"][
                     "institutionName"
                 ]
-                self._children.append(child)
-                self._childids.append(str(child["id"]))
-                self._childuserids.append(str(child["userId"]))
-                self._childrenFirstNamesAndUserIDs[child["userId"]] = child[
-                    "name"
-                ].split()[0]
+                children.append(child)
+                childids.append(str(child["id"]))
+                childuserids.append(str(child["userId"]))
+                first_names[child["userId"]] = child["name"].split()[0]
             for institutioncode in profile["institutionProfiles"]:
-                if (
-                    str(institutioncode["institutionCode"])
-                    not in self._institutionProfiles
-                ):
-                    self._institutionProfiles.append(
-                        str(institutioncode["institutionCode"])
-                    )
+                if str(institutioncode["institutionCode"]) not in institution_profiles:
+                    institution_profiles.append(str(institutioncode["institutionCode"]))
+        self._childnames = childnames
+        self._institutions = institutions
+        self._childuserids = childuserids
+        self._childids = childids
+        self._children = children
+        self._institutionProfiles = institution_profiles
+        self._childrenFirstNamesAndUserIDs = first_names
         _LOGGER.debug("Child ids and names: " + str(self._childnames))
         _LOGGER.debug("Child ids and institution names: " + str(self._institutions))
         _LOGGER.debug("Institution codes: " + str(self._institutionProfiles))
 
+    def _presence_stages(self):
+        if not self._childids:
+            return []
+        return [(STAGE_PRESENCE, self._fetch_presence, (), self._merge_presence)]
+
+    def _calendar_stages(self):
+        utcnow = datetime.datetime.now(datetime.timezone.utc)
+        horizon = horizon_weeks(
+            utcnow.date(), self._calendar_weeks_back, self._calendar_weeks_ahead
+        )
+        self.calendar_store.prune(horizon, utcnow)
+        loaded = {monday.isoformat() for monday in self.calendar_store.loaded_weeks()}
+        self.response_cache.prune(SOURCE_CALENDAR, lambda key: key[1] in loaded)
+        return [
+            (STAGE_CALENDAR, self._fetch_calendar, (run,), self._merge_calendar)
+            for run in week_runs(self.calendar_store.stale_weeks(horizon, utcnow))
+        ]
+
+    def _weeks(self):
+        """Return (week, ugeplan attribute, MU Opgaver attribute) for this and next week."""
+        now = datetime.datetime.now() + datetime.timedelta(weeks=1)
+        thisweek = datetime.datetime.now().strftime("%Y-W%V")
+        nextweek = now.strftime("%Y-W%V")
+        return (
+            (thisweek, self.ugep_attr, self.mu_opgaver_attr),
+            (nextweek, self.ugepnext_attr, self.mu_opgaver_next_attr),
+        )
+
+    async def _async_guardian(self):
+        """Return the guardian userId the widget providers need, or None."""
+        try:
+            guardian_data = await self.async_get_profile_context()
+        except Exception as e:
+            _LOGGER.warning(f"Could not get the guardian profile: {e}")
+            return None
+        if not guardian_data or "userId" not in guardian_data:
+            _LOGGER.warning("Could not get guardian userId for the widget providers")
+            return None
+        return guardian_data["userId"]
+
+    def _mu_opgaver_stages(self, guardian):
+        stages = []
+        mu_widget = next(
+            (widget for widget in MU_OPGAVER_WIDGETS if widget in self.widgets),
+            None,
+        )
+        if mu_widget is None:
+            _LOGGER.error(
+                "You have enabled Min Uddannelse Opgaver, but we cannot find any supported widgets (0030,0023) in Aula."
+            )
+        else:
+            weeks = self._weeks()
+            current = {week for week, _, _ in weeks}
+            self.response_cache.prune(
+                SOURCE_MU_OPGAVER, lambda key: key[1] in current
+            )
+            for week, _, mu_attr in weeks:
+                stages.append(
+                    (
+                        STAGE_MU_OPGAVER,
+                        self._fetch_mu_opgaver,
+                        (week, guardian, mu_widget),
+                        mu_attr.update,
+                    )
+                )
+        return stages
+
+    def _ugeplan_stages(self, guardian):
+        stages = []
+        if (
+            "0029" not in self.widgets
+            and "0004" not in self.widgets
+            and "0062" not in self.widgets
+            and "0001" not in self.widgets
+        ):
+            _LOGGER.error(
+                "You have enabled ugeplaner, but we cannot find any supported widgets (0029,0004,0001) in Aula."
+            )
+        if "0029" in self.widgets and "0004" in self.widgets:
+            _LOGGER.warning(
+                "Multiple sources for ugeplaner is untested and might cause problems."
+            )
+
+        # Stages are merged in the order they are added here, which is the
+        # order the providers used to run in sequentially - so when more
+        # than one provider returns a plan for a child, the same one wins.
+        weeks = self._weeks()
+        thisweek = weeks[0][0]
+        current = {week for week, _, _ in weeks}
+        self.response_cache.prune(
+            SOURCE_UGEPLAN, lambda key: len(key) < 3 or key[2] in current
+        )
+        for week, ugep_attr, _ in weeks:
+            if "0029" in self.widgets:
+                stages.append(
+                    (
+                        STAGE_MU_UGEBREV,
+                        self._fetch_mu_ugebrev,
+                        (week, guardian),
+                        ugep_attr.update,
+                    )
+                )
+            if "0001" in self.widgets:
+                for userid, first_name in self._childrenFirstNamesAndUserIDs.items():
+                    stages.append(
+                        (
+                            STAGE_EASYIQ,
+                            self._fetch_easyiq,
+                            (week, guardian, userid, first_name),
+                            ugep_attr.update,
+                        )
+                    )
+            if "0062" in self.widgets and week == thisweek:
+                # Huskelisten is not week based, so it is only fetched once.
+                stages.append(
+                    (
+                        STAGE_HUSKELISTEN,
+                        self._fetch_huskelisten,
+                        (),
+                        self.huskeliste.update,
+                    )
+                )
+            if "0004" in self.widgets:
+                stages.append(
+                    (STAGE_MEEBOOK, self._fetch_meebook, (week,), ugep_attr.update)
+                )
+        return stages
+
+    async def _fetch_presence(self):
+        """Fetch the daily overview of all children in a single request.
+
+        presence.getDailyOverview takes an array of child ids, so one request
+        covers every child. If Aula rejects the batch, fall back to one request
+        per child. Raises when that gets no child's overview either, so the
+        presence stage fails and keeps its last values.
+        """
+        childids = self._childids
+        key = (SOURCE_PRESENCE, ",".join(childids))
+        try:
+            response = await self._api.get_daily_overview(
+                childids, headers=self.response_cache.conditional_headers(key)
+            )
+            response_data = (
+                self.response_cache.parse(key, response, _response_data)
+                if response.status_code in (200, 304)
+                else None
+            )
+        except Exception as e:
+            _LOGGER.debug(f"Batched presence request failed: {e}")
+            response_data = None
+        if isinstance(response_data, list):
+            return map_daily_overview(response_data, childids)
+
+        _LOGGER.debug(
+            "Batched presence request was rejected, fetching presence per child"
+        )
+        self.response_cache.forget(key)
+        overviews = await asyncio.gather(
+            *(self._fetch_child_presence(childid) for childid in childids)
+        )
+        if all(overview is None for overview in overviews):
+            raise RuntimeError("Aula returned the presence of none of the children")
+        return dict(zip(childids, overviews))
+
+    async def _fetch_child_presence(self, childid):
+        key = (SOURCE_PRESENCE, childid)
+        try:
+            response = await self._api.get_daily_overview(
+                [childid], headers=self.response_cache.conditional_headers(key)
+            )
+            response_data = self.response_cache.parse(key, response, _response_data)
+        except Exception as e:
+            _LOGGER.debug(f"Presence request for child {childid} failed: {e}")
+            return None
+        if response_data and len(response_data) > 0:
+            return response_data[0]
+        return None
+
+    def _merge_presence(self, overviews):
         self._daily_overview = {}
-        for i, child in enumerate(self._children):
-            response = self._session.get(
-                self.apiurl
-                + "?method=presence.getDailyOverview&childIds[]="
-                + str(child["id"])
-                + self._get_access_token_param(),
-                verify=True,
-            ).json()
-            response_data = response.get("data") if response else None
-            if response_data and len(response_data) > 0:
-                self.presence[str(child["id"])] = 1
-                self._daily_overview[str(child["id"])] = response_data[0]
+        for childid, overview in overviews.items():
+            if overview is not None:
+                self.presence[childid] = 1
+                self._daily_overview[childid] = overview
             else:
                 _LOGGER.debug(
                     "Unable to retrieve presence data from Aula from child with id "
-                    + str(child["id"])
+                    + childid
                     + ". Some data will be missing from sensor entities."
                 )
-                self.presence[str(child["id"])] = 0
-        _LOGGER.debug("Child ids and presence data status: " + str(self.presence))
-
-        # Messages:
-        mesres = self._session.get(
-            self.apiurl
-            + "?method=messaging.getThreads&sortOn=date&orderDirection=desc&page=0"
-            + self._get_access_token_param(),
-            verify=True,
+                self.presence[childid] = 0
+
+    async def _fetch_messages(self):
+        key = (SOURCE_MESSAGES, "threads")
+        mesres = await self._api.get_threads(
+            headers=self.response_cache.conditional_headers(key)
         )
         # _LOGGER.debug("mesres "+str(mesres.text))
-        self.unread_messages = 0
-        unread = 0
-        self.message = {}
-        mesres_json = mesres.json()
-        threads = mesres_json.get("data", {}).get("threads") if mesres_json else None
-        for mes in threads or []:
-            if not mes["read"]:
-                # self.unread_messages = 1
-#                print("unread mes "+str(mes))
-                unread = 1
-                threadid = mes["id"]
-                break
-        # if self.unread_messages == 1:
-        if unread == 1:
+        unchanged = []
+        threadid = self.response_cache.parse(
+            key, mesres, _first_unread_thread, unchanged.append
+        )
+        if unchanged and self._thread_messages is not None:
+            # Same threads as last time, so the newest unread message is too
+            return self._thread_messages
+        self._thread_messages = None
+        try:
+            result = await self._fetch_unread_message(threadid)
+        except BaseException:
+            # Fetch the thread again next time, even if the list is unchanged
+            self.response_cache.forget(key)
+            raise
+        self._thread_messages = result
+        return result
+
+    async def _fetch_unread_message(self, threadid):
+        unread_messages = 0
+        message = {}
+        if threadid is not None:
             # _LOGGER.debug("tid "+str(threadid))
-            threadres = self._session.get(
-                self.apiurl
-                + "?method=messaging.getMessagesForThread&threadId="
-                + str(threadid)
-                + "&page=0"
-                + self._get_access_token_param(),
-                verify=True,
-            )
+            threadres = await self._api.get_messages_for_thread(threadid)
             # _LOGGER.debug("threadres "+str(threadres.text))
             threadres_json = threadres.json()
             if threadres_json.get("status", {}).get("code") == 403:
-                self.message["text"] = (
+                message["text"] = (
                     "Log ind på Aula med MitID for at læse denne besked."
                 )
-                self.message["sender"] = "Ukendt afsender"
-                self.message["subject"] = "Følsom besked"
-                self.unread_messages = 1
+                message["sender"] = "Ukendt afsender"
+                message["subject"] = "Følsom besked"
+                unread_messages = 1
             elif threadres_json.get("data") and threadres_json["data"].get("messages"):
-                for message in threadres_json["data"]["messages"]:
-                    if message["messageType"] == "Message":
+                for mes in threadres_json["data"]["messages"]:
+                    if mes["messageType"] == "Message":
                         try:
-                            self.message["text"] = message["text"]["html"]
+                            message["text"] = mes["text"]["html"]
                         except:
                             try:
-                                self.message["text"] = message["text"]
+                                message["text"] = mes["text"]
                             except:
-                                self.message["text"] = "intet indhold..."
+                                message["text"] = "intet indhold..."
                                 _LOGGER.warning(
                                     "There is an unread message, but we cannot get the text."
                                 )
                         try:
-                            self.message["sender"] = message["sender"]["fullName"]
+                            message["sender"] = mes["sender"]["fullName"]
                         except:
-                            self.message["sender"] = "Ukendt afsender"
+                            message["sender"] = "Ukendt afsender"
                         try:
-                            self.message["subject"] = threadres_json["data"].get(
+                            message["subject"] = threadres_json["data"].get(
                                 "subject", ""
                             )
                         except:
-                            self.message["subject"] = ""
-                        self.unread_messages = 1
+                            message["subject"] = ""
+                        unread_messages = 1
                         break
+        return unread_messages, message
 
-        # Calendar:
-        if self._schoolschedule is True:
-            instProfileIds = ",".join(self._childids)
-            csrf_token = self._get_csrf_token()
-            headers = {"content-type": "application/json"}
-            if csrf_token:
-                headers["csrfp-token"] = csrf_token
-            start = datetime.datetime.now(datetime.timezone.utc).strftime(
-                "%Y-%m-%d 00:00:00.0000%z"
-            )
-            _end = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(
-                days=14
-            )
-            end = _end.strftime("%Y-%m-%d 00:00:00.0000%z")
-            post_data = (
-                '{"instProfileIds":['
-                + instProfileIds
-                + '],"resourceIds":[],"start":"'
-                + start
-                + '","end":"'
-                + end
-                + '"}'
-            )
-            _LOGGER.debug("Fetching calendars...")
-            # _LOGGER.debug("Calendar post-data: "+str(post_data))
-            res = self._session.post(
-                self.apiurl
-                + "?method=calendar.getEventsByProfileIdsAndResourceIds"
-                + self._get_access_token_param(),
-                data=post_data,
-                headers=headers,
-                verify=True,
+    def _merge_messages(self, result):
+        self.unread_messages, self.message = result
+
+    async def async_load_calendar_range(self, start, end):
+        """Fetch the weeks between start and end that are not loaded yet.
+
+        Used when a calendar is browsed outside the configured horizon. Weeks
+        that are already loaded, or being loaded by another caller, are not
+        fetched again.
+        """
+        start_day = start.astimezone(datetime.timezone.utc).date()
+        end_day = (
+            end.astimezone(datetime.timezone.utc) - datetime.timedelta(microseconds=1)
+        ).date() + datetime.timedelta(days=1)
+        async with self._calendar_lock:
+            missing = self.calendar_store.missing_weeks(
+                weeks_between(start_day, end_day)
             )
-            try:
-                with open("skoleskema.json", "w") as skoleskema_json:
-                    json.dump(res.text, skoleskema_json)
-            except:
-                _LOGGER.warning(
-                    "Got the following reply when trying to fetch calendars: "
-                    + str(res.text)
+            if not missing:
+                return
+            if len(missing) > MAX_ON_DEMAND_WEEKS:
+                _LOGGER.debug(
+                    f"Only fetching the first {MAX_ON_DEMAND_WEEKS} of {len(missing)} missing calendar weeks"
                 )
-        # End of calendar
-        # MU Opgaver:
-        if self._mu_opgaver is True:
+                missing = missing[:MAX_ON_DEMAND_WEEKS]
             try:
-                guardian = self._session.get(
-                    self.apiurl
-                    + "?method=profiles.getProfileContext&portalrole=guardian"
-                    + self._get_access_token_param(),
-                    verify=True,
-                ).json()["data"]["userId"]
-            except Exception as e:
-                _LOGGER.warning(
-                    f"Error retrieving MU Opgaver: Empty or ambiguous response: {e}"
+                if not await self._async_executor(self._ensure_valid_token):
+                    return
+                await self._async_fan_out(
+                    [
+                        (
+                            STAGE_CALENDAR,
+                            self._fetch_calendar,
+                            (run,),
+                            self._merge_calendar,
+                        )
+                        for run in week_runs(missing)
+                    ]
                 )
-                return
-            childUserIds = ",".join(self._childuserids)
+            except Exception as e:
+                _LOGGER.warning(f"Could not fetch calendar weeks on demand: {e}")
 
-            if len(self.widgets) == 0:
-                self.get_widgets()
-            mu_widget = next(
-                (widget for widget in MU_OPGAVER_WIDGETS if widget in self.widgets),
-                None,
+    async def _fetch_calendar(self, weeks):
+        """Fetch the lessons of a run of consecutive weeks (given by their Mondays)."""
+        start = weeks[0].strftime("%Y-%m-%d 00:00:00.0000+0000")
+        end = (weeks[-1] + datetime.timedelta(weeks=1)).strftime(
+            "%Y-%m-%d 00:00:00.0000+0000"
+        )
+        _LOGGER.debug(f"Fetching calendars from {start} to {end}...")
+        res = await self._api.get_events_by_profile_ids_and_resource_ids(
+            self._childids,
+            start,
+            end,
+            headers=self.response_cache.conditional_headers(_calendar_key(weeks)),
+        )
+        return weeks, res
+
+    def _merge_calendar(self, result):
+        weeks, response = result
+        key = _calendar_key(weeks)
+        now = datetime.datetime.now(datetime.timezone.utc)
+        unchanged = []
+        lessons = self.response_cache.parse(
+            key, response, _calendar_lessons, unchanged.append
+        )
+        if lessons is None:
+            self.response_cache.forget(key)
+            _LOGGER.warning(
+                "Got the following reply when trying to fetch calendars: "
+                + str(response.text)
             )
-            if mu_widget is None:
-                _LOGGER.error(
-                    "You have enabled Min Uddannelse Opgaver, but we cannot find any supported widgets (0030,0023) in Aula."
-                )
+            return
+        if unchanged:
+            # Same lessons as last time; only note that the weeks are fresh
+            self.calendar_store.touch(weeks, now)
+            return
+        self.calendar_store.update_weeks(weeks, lessons, now)
+
+    def _fetch_mu_opgaver(self, week, guardian, mu_widget):
+        _require_guardian(guardian)
+        _LOGGER.debug("In the MU Opgaver flow, using widget " + mu_widget)
+        token = self.get_token(mu_widget)
+        get_payload = (
+            "/opgaveliste?assuranceLevel=2&childFilter="
+            + ",".join(self._childuserids)
+            + "&currentWeekNumber="
+            + week
+            + "&isMobileApp=false&placement=narrow&sessionUUID="
+            + guardian
+            + "&userProfile=guardian"
+        )
+        key = (SOURCE_MU_OPGAVER, week)
+        mu_opgaver = self._provider_sessions.get(
+            MIN_UDDANNELSE_API + get_payload,
+            headers=self.response_cache.conditional_headers(
+                key, {"Authorization": token, "accept": "application/json"}
+            ),
+            verify=True,
+        )
+        _LOGGER.debug("MU Opgaver status_code " + str(mu_opgaver.status_code))
+        _LOGGER.debug("MU Opgaver response " + str(mu_opgaver.text))
 
-            def mu_opgaver(week, thisnext):
-                if mu_widget is not None:
-                    _LOGGER.debug("In the MU Opgaver flow, using widget " + mu_widget)
-                    token = self.get_token(mu_widget)
-                    get_payload = (
-                        "/opgaveliste?assuranceLevel=2&childFilter="
-                        + childUserIds
-                        + "&currentWeekNumber="
-                        + week
-                        + "&isMobileApp=false&placement=narrow&sessionUUID="
-                        + guardian
-                        + "&userProfile=guardian"
-                    )
-                    mu_opgaver = requests.get(
-                        MIN_UDDANNELSE_API + get_payload,
-                        headers={"Authorization": token, "accept": "application/json"},
-                        verify=True,
-                    )
-                    _LOGGER.debug(
-                        "MU Opgaver status_code " + str(mu_opgaver.status_code)
-                    )
-                    _LOGGER.debug("MU Opgaver response " + str(mu_opgaver.text))
-                    mu_opgaver_json = mu_opgaver.json()
-                    opgaver_list = mu_opgaver_json.get("opgaver", []) if mu_opgaver_json else []
-                    for full_name in self._childnames.items():
-                        name_parts = full_name[1].split()
-                        first_name = name_parts[0]
-                        _ugep = format_mu_opgaver(opgaver_list, first_name)
-                        if thisnext == "this":
-                            self.mu_opgaver_attr[first_name] = _ugep
-                        elif thisnext == "next":
-                            self.mu_opgaver_next_attr[first_name] = _ugep
-                        _LOGGER.debug("MU Opgaver result: " + str(_ugep))
-
-            now = datetime.datetime.now() + datetime.timedelta(weeks=1)
-            thisweek = datetime.datetime.now().strftime("%Y-W%V")
-            nextweek = now.strftime("%Y-W%V")
-            mu_opgaver(thisweek, "this")
-            mu_opgaver(nextweek, "next")
-        # End of MU Opgaver
-
-        # Ugeplaner:
-        if self._ugeplan is True:
-            guardian_response = self._session.get(
-                self.apiurl
-                + "?method=profiles.getProfileContext&portalrole=guardian"
-                + self._get_access_token_param(),
-                verify=True,
-            ).json()
-            guardian_data = guardian_response.get("data") if guardian_response else None
-            if not guardian_data or "userId" not in guardian_data:
-                _LOGGER.warning("Could not get guardian userId for ugeplaner")
-                return True
-            guardian = guardian_data["userId"]
-            childUserIds = ",".join(self._childuserids)
+        def parse(mu_opgaver):
+            mu_opgaver_json = mu_opgaver.json()
+            opgaver_list = (
+                mu_opgaver_json.get("opgaver", []) if mu_opgaver_json else []
+            )
+            result = {}
+            for full_name in self._childnames.items():
+                name_parts = full_name[1].split()
+                first_name = name_parts[0]
+                result[first_name] = format_mu_opgaver(opgaver_list, first_name)
+                _LOGGER.debug("MU Opgaver result: " + str(result[first_name]))
+            return result
+
+        return self.response_cache.parse(key, mu_opgaver, parse)
+
+    def _fetch_mu_ugebrev(self, week, guardian):
+        _require_guardian(guardian)
+        token = self.get_token("0029")
+        get_payload = (
+            "/ugebrev?assuranceLevel=2&childFilter="
+            + ",".join(self._childuserids)
+            + "&currentWeekNumber="
+            + week
+            + "&isMobileApp=false&placement=narrow&sessionUUID="
+            + guardian
+            + "&userProfile=guardian"
+        )
+        key = (SOURCE_UGEPLAN, "ugebrev", week)
+        ugeplaner = self._provider_sessions.get(
+            MIN_UDDANNELSE_API + get_payload,
+            headers=self.response_cache.conditional_headers(
+                key, {"Authorization": token, "accept": "application/json"}
+            ),
+            verify=True,
+        )
+        # _LOGGER.debug("ugeplaner status_code "+str(ugeplaner.status_code))
+        # _LOGGER.debug("ugeplaner response "+str(ugeplaner.text))
 
-            if len(self.widgets) == 0:
-                self.get_widgets()
-            if (
-                "0029" not in self.widgets
-                and "0004" not in self.widgets
-                and "0062" not in self.widgets
-                and "0001" not in self.widgets
-            ):
-                _LOGGER.error(
-                    "You have enabled ugeplaner, but we cannot find any supported widgets (0029,0004,0001) in Aula."
-                )
-            if "0029" in self.widgets and "0004" in self.widgets:
-                _LOGGER.warning(
-                    "Multiple sources for ugeplaner is untested and might cause problems."
-                )
+        def parse(ugeplaner):
+            result = {}
+            try:
+                for person in ugeplaner.json()["personer"]:
+                    ugeplan = person["institutioner"][0]["ugebreve"][0]["indhold"]
+                    result[person["navn"].split()[0]] = ugeplan
+            except:
+                _LOGGER.debug("Cannot fetch ugeplaner, so setting as empty")
+                _LOGGER.debug("ugeplaner response " + str(ugeplaner.text))
+            return result
 
-            def ugeplan(week, thisnext):
-                if "0029" in self.widgets:
-                    token = self.get_token("0029")
-                    get_payload = (
-                        "/ugebrev?assuranceLevel=2&childFilter="
-                        + childUserIds
-                        + "&currentWeekNumber="
-                        + week
-                        + "&isMobileApp=false&placement=narrow&sessionUUID="
-                        + guardian
-                        + "&userProfile=guardian"
-                    )
-                    ugeplaner = requests.get(
-                        MIN_UDDANNELSE_API + get_payload,
-                        headers={"Authorization": token, "accept": "application/json"},
-                        verify=True,
-                    )
-                    # _LOGGER.debug("ugeplaner status_code "+str(ugeplaner.status_code))
-                    # _LOGGER.debug("ugeplaner response "+str(ugeplaner.text))
-                    try:
-                        for person in ugeplaner.json()["personer"]:
-                            ugeplan = person["institutioner"][0]["ugebreve"][0][
-                                "indhold"
-                            ]
-                            if thisnext == "this":
-                                self.ugep_attr[person["navn"].split()[0]] = ugeplan
-                            elif thisnext == "next":
-                                self.ugepnext_attr[person["navn"].split()[0]] = ugeplan
-                    except:
-                        _LOGGER.debug("Cannot fetch ugeplaner, so setting as empty")
-                        _LOGGER.debug("ugeplaner response " + str(ugeplaner.text))
-                if "0001" in self.widgets:
-                    import calendar
-
-                    _LOGGER.debug("In the EasyIQ flow")
-                    token = self.get_token("0001")
-                    csrf_token = self._get_csrf_token()
-
-                    easyiq_headers = {
-                        "x-aula-institutionfilter": str(self._institutionProfiles[0]),
-                        "x-aula-userprofile": "guardian",
-                        "Authorization": token,
-                        "accept": "application/json",
-                        "origin": "https://www.aula.dk",
-                        "referer": "https://www.aula.dk/",
-                        "authority": "api.easyiqcloud.dk",
-                    }
-                    if csrf_token:
-                        easyiq_headers["csrfp-token"] = csrf_token
-
-                    for child in self._childrenFirstNamesAndUserIDs.items():
-                        userid = child[0]
-                        first_name = child[1]
-
-                        _LOGGER.debug("EasyIQ headers " + str(easyiq_headers))
-                        post_data = {
-                            "sessionId": guardian,
-                            "currentWeekNr": week,
-                            "userProfile": "guardian",
-                            "institutionFilter": self._institutionProfiles,
-                            "childFilter": [userid],
-                        }
-                        _LOGGER.debug("EasyIQ post data " + str(post_data))
-                        ugeplaner = requests.post(
-                            EASYIQ_API + "/weekplaninfo",
-                            json=post_data,
-                            headers=easyiq_headers,
-                            verify=True,
-                        )
-                        # _LOGGER.debug(
-                        #    "EasyIQ Opgaver status_code " + str(ugeplaner.status_code)
-                        # )
-                        _LOGGER.debug(
-                            "EasyIQ Opgaver response " + str(ugeplaner.json())
-                        )
-                        _ugep = (
-                            "<h2>"
-                            # + ugeplaner.json()["Weekplan"]["ActivityName"]
-                            + " Uge "
-                            + week.split("-W")[1]
-                            # + ugeplaner.json()["Weekplan"]["WeekNo"]
-                            + "</h2>"
-                        )
-                        # from datetime import datetime
-
-                        def findDay(date):
-                            day, month, year = (int(i) for i in date.split(" "))
-                            dayNumber = calendar.weekday(year, month, day)
-                            days = [
-                                "Mandag",
-                                "Tirsdag",
-                                "Onsdag",
-                                "Torsdag",
-                                "Fredag",
-                                "Lørdag",
-                                "Søndag",
-                            ]
-                            return days[dayNumber]
-
-                        def is_correct_format(date_string, format):
-                            try:
-                                datetime.datetime.strptime(date_string, format)
-                                return True
-                            except ValueError:
-                                _LOGGER.debug(
-                                    "Could not parse timestamp: " + str(date_string)
-                                )
-                                return False
+        return self.response_cache.parse(key, ugeplaner, parse)
 
-                        try:
-                            for i in ugeplaner.json()["Events"]:
-                                if is_correct_format(i["start"], "%Y/%m/%d %H:%M"):
-                                    _LOGGER.debug("No Event")
-                                    start_datetime = datetime.datetime.strptime(
-                                        i["start"], "%Y/%m/%d %H:%M"
-                                    )
-                                    _LOGGER.debug(start_datetime)
-                                    end_datetime = datetime.datetime.strptime(
-                                        i["end"], "%Y/%m/%d %H:%M"
-                                    )
-                                    if start_datetime.date() == end_datetime.date():
-                                        formatted_day = findDay(
-                                            start_datetime.strftime("%d %m %Y")
-                                        )
-                                        formatted_start = start_datetime.strftime(
-                                            " %H:%M"
-                                        )
-                                        formatted_end = end_datetime.strftime("- %H:%M")
-                                        dresult = f"{formatted_day} {formatted_start} {formatted_end}"
-                                    else:
-                                        formatted_start = findDay(
-                                            start_datetime.strftime("%d %m %Y")
-                                        )
-                                        formatted_end = findDay(
-                                            end_datetime.strftime("%d %m %Y")
-                                        )
-                                        dresult = f"{formatted_start} {formatted_end}"
-                                    _ugep = _ugep + "<br><b>" + dresult + "</b><br>"
-                                    if i["itemType"] == "5":
-                                        _ugep = (
-                                            _ugep
-                                            + "<br><b>"
-                                            + str(i["title"])
-                                            + "</b><br>"
-                                        )
-                                    else:
-                                        _ugep = (
-                                            _ugep
-                                            + "<br><b>"
-                                            + str(i["ownername"])
-                                            + "</b><br>"
-                                        )
-                                    _ugep = _ugep + str(i["description"]) + "<br>"
-                                else:
-                                    _LOGGER.debug("None")
-                        except KeyError:
-                            _LOGGER.debug("None")
-
-                        if thisnext == "this":
-                            self.ugep_attr[first_name] = _ugep
-                        elif thisnext == "next":
-                            self.ugepnext_attr[first_name] = _ugep
-                        _LOGGER.debug("EasyIQ result: " + str(_ugep))
-
-                if "0062" in self.widgets:
-                    _LOGGER.debug("In the Huskelisten flow...")
-                    token = self.get_token("0062", False)
-                    huskelisten_headers = {
-                        "Accept": "application/json, text/plain, */*",
-                        "Accept-Encoding": "gzip, deflate, br",
-                        "Accept-Language": "en-US,en;q=0.9,da;q=0.8",
-                        "Aula-Authorization": token,
-                        "Origin": "https://www.aula.dk",
-                        "Referer": "https://www.aula.dk/",
-                        "Sec-Fetch-Dest": "empty",
-                        "Sec-Fetch-Mode": "cors",
-                        "Sec-Fetch-Site": "cross-site",
-                        "User-Agent": "Mozilla/5.0 (X11; CrOS x86_64 15183.51.0) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/108.0.0.0 Safari/537.36",
-                        "zone": "Europe/Copenhagen",
-                    }
+    def _fetch_easyiq(self, week, guardian, userid, first_name):
+        import calendar
 
-                    children = "&children=".join(self._childuserids)
-                    institutions = "&institutions=".join(self._institutionProfiles)
-                    timedelta = datetime.datetime.now() + datetime.timedelta(days=7)
-                    From = datetime.datetime.now().strftime("%Y-%m-%d")
-                    dueNoLaterThan = timedelta.strftime("%Y-%m-%d")
-                    get_payload = (
-                        "/reminders/v1?children="
-                        + children
-                        + "&from="
-                        + From
-                        + "&dueNoLaterThan="
-                        + dueNoLaterThan
-                        + "&widgetVersion=1.10&userProfile=guardian&sessionId="
-                        + self._mitid_username
-                        + "&institutions="
-                        + institutions
-                    )
-                    _LOGGER.debug(
-                        "Huskelisten get_payload: " + SYSTEMATIC_API + get_payload
-                    )
-                    #
-                    mock_huskelisten = 0
-                    #
-                    if mock_huskelisten == 1:
-                        _LOGGER.warning("Using mock data for Huskelisten.")
-                        mock_huskelisten = '[{"userName":"Emilie efternavn","userId":164625,"courseReminders":[],"assignmentReminders":[],"teamReminders":[{"id":76169,"institutionName":"Holme Skole","institutionId":183,"dueDate":"2022-11-29T23:00:00Z","teamId":65240,"teamName":"2A","reminderText":"Onsdagslektie: Matematikfessor.dk: Sænk skibet med plus.","createdBy":"Peter ","lastEditBy":"Peter ","subjectName":"Matematik"},{"id":76598,"institutionName":"Holme Skole","institutionId":183,"dueDate":"2022-12-06T23:00:00Z","teamId":65240,"teamName":"2A","reminderText":"Julekalender på Skoledu.dk: I skal forsøge at løse dagens kalenderopgave. opgaven kan også godt løses dagen efter.","createdBy":"Peter ","lastEditBy":"Peter Riis","subjectName":"Matematik"},{"id":76599,"institutionName":"Holme Skole","institutionId":183,"dueDate":"2022-12-13T23:00:00Z","teamId":65240,"teamName":"2A","reminderText":"Julekalender på Skoledu.dk: I skal forsøge at løse dagens kalenderopgave. opgaven kan også godt løses dagen efter.","createdBy":"Peter ","lastEditBy":"Peter ","subjectName":"Matematik"},{"id":76600,"institutionName":"Holme Skole","institutionId":183,"dueDate":"2022-12-20T23:00:00Z","teamId":65240,"teamName":"2A","reminderText":"Julekalender på Skoledu.dk: I skal forsøge at løse dagens kalenderopgave. opgaven kan også godt løses dagen efter.","createdBy":"Peter Riis","lastEditBy":"Peter Riis","subjectName":"Matematik"}]},{"userName":"Karla","userId":77882,"courseReminders":[],"assignmentReminders":[{"id":0,"institutionName":"Holme Skole","institutionId":183,"dueDate":"2022-12-08T11:00:00Z","courseId":297469,"teamNames":["5A","5B"],"teamIds":[65271,65258],"courseSubjects":[],"assignmentId":5027904,"assignmentText":"Skriv en novelle"}],"teamReminders":[{"id":76367,"institutionName":"Holme Skole","institutionId":183,"dueDate":"2022-11-30T23:00:00Z","teamId":65258,"teamName":"5A","reminderText":"Læse resten af kap.1 fra Ternet Ninja ( kopiark) Læs det hele højt eller vælg et afsnit. ","createdBy":"Christina ","lastEditBy":"Christina ","subjectName":"Dansk"}]},{"userName":"Vega  ","userId":206597,"courseReminders":[],"assignmentReminders":[],"teamReminders":[]}]'
-                        data = json.loads(mock_huskelisten, strict=False)
-                    else:
-                        response = requests.get(
-                            SYSTEMATIC_API + get_payload,
-                            headers=huskelisten_headers,
-                            verify=True,
+        _LOGGER.debug("In the EasyIQ flow")
+        _require_guardian(guardian)
+        token = self.get_token("0001")
+        csrf_token = self._get_csrf_token()
+
+        easyiq_headers = {
+            "x-aula-institutionfilter": str(self._institutionProfiles[0]),
+            "x-aula-userprofile": "guardian",
+            "Authorization": token,
+            "accept": "application/json",
+            "origin": "https://www.aula.dk",
+            "referer": "https://www.aula.dk/",
+            "authority": "api.easyiqcloud.dk",
+        }
+        if csrf_token:
+            easyiq_headers["csrfp-token"] = csrf_token
+
+        _LOGGER.debug("EasyIQ headers " + str(easyiq_headers))
+        post_data = {
+            "sessionId": guardian,
+            "currentWeekNr": week,
+            "userProfile": "guardian",
+            "institutionFilter": self._institutionProfiles,
+            "childFilter": [userid],
+        }
+        _LOGGER.debug("EasyIQ post data " + str(post_data))
+        ugeplaner = self._provider_sessions.post(
+            EASYIQ_API + "/weekplaninfo",
+            json=post_data,
+            headers=easyiq_headers,
+            verify=True,
+        )
+        # _LOGGER.debug(
+        #    "EasyIQ Opgaver status_code " + str(ugeplaner.status_code)
+        # )
+        # A POST, so there is no ETag to send; only the body is compared.
+        key = (SOURCE_UGEPLAN, "easyiq", week, userid)
+
+        def parse(ugeplaner):
+            _LOGGER.debug("EasyIQ Opgaver response " + str(ugeplaner.json()))
+            _ugep = (
+                "<h2>"
+                # + ugeplaner.json()["Weekplan"]["ActivityName"]
+                + " Uge "
+                + week.split("-W")[1]
+                # + ugeplaner.json()["Weekplan"]["WeekNo"]
+                + "</h2>"
+            )
+            # from datetime import datetime
+
+            def findDay(date):
+                day, month, year = (int(i) for i in date.split(" "))
+                dayNumber = calendar.weekday(year, month, day)
+                days = [
+                    "Mandag",
+                    "Tirsdag",
+                    "Onsdag",
+                    "Torsdag",
+                    "Fredag",
+                    "Lørdag",
+                    "Søndag",
+                ]
+                return days[dayNumber]
+
+            def is_correct_format(date_string, format):
+                try:
+                    datetime.datetime.strptime(date_string, format)
+                    return True
+                except ValueError:
+                    _LOGGER.debug("Could not parse timestamp: " + str(date_string))
+                    return False
+
+            try:
+                for i in ugeplaner.json()["Events"]:
+                    if is_correct_format(i["start"], "%Y/%m/%d %H:%M"):
+                        _LOGGER.debug("No Event")
+                        start_datetime = datetime.datetime.strptime(
+                            i["start"], "%Y/%m/%d %H:%M"
                         )
-                        try:
-                            data = json.loads(response.text, strict=False)
-                        except (json.JSONDecodeError, ValueError):
-                            _LOGGER.error(
-                                "Could not parse the response from Huskelisten as json."
-                            )
-                            data = None
-                        # _LOGGER.debug("Huskelisten raw response: "+str(response.text))
+                        _LOGGER.debug(start_datetime)
+                        end_datetime = datetime.datetime.strptime(
+                            i["end"], "%Y/%m/%d %H:%M"
+                        )
+                        if start_datetime.date() == end_datetime.date():
+                            formatted_day = findDay(start_datetime.strftime("%d %m %Y"))
+                            formatted_start = start_datetime.strftime(" %H:%M")
+                            formatted_end = end_datetime.strftime("- %H:%M")
+                            dresult = f"{formatted_day} {formatted_start} {formatted_end}"
+                        else:
+                            formatted_start = findDay(start_datetime.strftime("%d %m %Y"))
+                            formatted_end = findDay(end_datetime.strftime("%d %m %Y"))
+                            dresult = f"{formatted_start} {formatted_end}"
+                        _ugep = _ugep + "<br><b>" + dresult + "</b><br>"
+                        if i["itemType"] == "5":
+                            _ugep = _ugep + "<br><b>" + str(i["title"]) + "</b><br>"
+                        else:
+                            _ugep = _ugep + "<br><b>" + str(i["ownername"]) + "</b><br>"
+                        _ugep = _ugep + str(i["description"]) + "<br>"
+                    else:
+                        _LOGGER.debug("None")
+            except KeyError:
+                _LOGGER.debug("None")
+
+            _LOGGER.debug("EasyIQ result: " + str(_ugep))
+            return {first_name: _ugep}
+
+        return self.response_cache.parse(key, ugeplaner, parse)
+
+    def _fetch_huskelisten(self):
+        _LOGGER.debug("In the Huskelisten flow...")
+        token = self.get_token("0062", False)
+        huskelisten_headers = {
+            "Accept": "application/json, text/plain, */*",
+            "Accept-Encoding": "gzip, deflate, br",
+            "Accept-Language": "en-US,en;q=0.9,da;q=0.8",
+            "Aula-Authorization": token,
+            "Origin": "https://www.aula.dk",
+            "Referer": "https://www.aula.dk/",
+            "Sec-Fetch-Dest": "empty",
+            "Sec-Fetch-Mode": "cors",
+            "Sec-Fetch-Site": "cross-site",
+            "User-Agent": "Mozilla/5.0 (X11; CrOS x86_64 15183.51.0) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/108.0.0.0 Safari/537.36",
+            "zone": "Europe/Copenhagen",
+        }
+
+        children = "&children=".join(self._childuserids)
+        institutions = "&institutions=".join(self._institutionProfiles)
+        timedelta = datetime.datetime.now() + datetime.timedelta(days=7)
+        From = datetime.datetime.now().strftime("%Y-%m-%d")
+        dueNoLaterThan = timedelta.strftime("%Y-%m-%d")
+        get_payload = (
+            "/reminders/v1?children="
+            + children
+            + "&from="
+            + From
+            + "&dueNoLaterThan="
+            + dueNoLaterThan
+            + "&widgetVersion=1.10&userProfile=guardian&sessionId="
+            + self._mitid_username
+            + "&institutions="
+            + institutions
+        )
+        _LOGGER.debug("Huskelisten get_payload: " + SYSTEMATIC_API + get_payload)
 
-                    if not isinstance(data, list):
-                        if data is not None:
-                            _LOGGER.warning("Unexpected response type from Huskelisten: " + str(type(data)) + ". Response: " + str(data)[:200])
+        def render(data):
+            result = {}
+            if not isinstance(data, list):
+                if data is not None:
+                    _LOGGER.warning("Unexpected response type from Huskelisten: " + str(type(data)) + ". Response: " + str(data)[:200])
+            else:
+                for person in data:
+                    name = person["userName"].split()[0]
+                    _LOGGER.debug("Huskelisten for " + name)
+                    huskel = ""
+                    reminders = person["teamReminders"]
+                    if len(reminders) > 0:
+                        for reminder in reminders:
+                            local_timezone = (
+                                datetime.datetime.now(datetime.timezone.utc)
+                                .astimezone()
+                                .tzinfo
+                            )
+                            due_date = datetime.datetime.strptime(
+                                reminder["dueDate"], "%Y-%m-%dT%H:%M:%SZ"
+                            )
+                            local_due_date = (
+                                due_date.replace(tzinfo=datetime.timezone.utc)
+                                .astimezone(local_timezone)
+                                .strftime("%A %d. %B")
+                            )
+                            huskel = huskel + "<h3>" + local_due_date + "</h3>"
+                            subjectName = (
+                                reminder["subjectName"] if "subjectName" in reminder else ""
+                            )
+                            huskel = huskel + "<b>" + subjectName + "</b><br>"
+                            huskel = huskel + "af " + reminder["createdBy"] + "<br><br>"
+                            content = re.sub(
+                                r"([0-9]+)(\.)", r"\1\.", reminder["reminderText"]
+                            )
+                            huskel = huskel + content + "<br><br>"
                     else:
-                        for person in data:
-                            name = person["userName"].split()[0]
-                            _LOGGER.debug("Huskelisten for " + name)
-                            huskel = ""
-                            reminders = person["teamReminders"]
-                            if len(reminders) > 0:
-                                for reminder in reminders:
-                                    local_timezone = (
-                                        datetime.datetime.now(datetime.timezone.utc)
-                                        .astimezone()
-                                        .tzinfo
-                                    )
-                                    due_date = datetime.datetime.strptime(
-                                        reminder["dueDate"], "%Y-%m-%dT%H:%M:%SZ"
-                                    )
-                                    local_due_date = (
-                                        due_date.replace(tzinfo=datetime.timezone.utc)
-                                        .astimezone(local_timezone)
-                                        .strftime("%A %d. %B")
-                                    )
-                                    huskel = huskel + "<h3>" + local_due_date + "</h3>"
-                                    subjectName = (
-                                        reminder["subjectName"]
-                                        if "subjectName" in reminder
-                                        else ""
-                                    )
-                                    huskel = huskel + "<b>" + subjectName + "</b><br>"
-                                    huskel = (
-                                        huskel + "af " + reminder["createdBy"] + "<br><br>"
+                        huskel = huskel + str(name) + " har ingen påmindelser."
+                    result[name] = huskel
+            return result
+
+        #
+        mock_huskelisten = 0
+        #
+        if mock_huskelisten == 1:
+            _LOGGER.warning("Using mock data for Huskelisten.")
+            mock_huskelisten = '[{"userName":"Emilie efternavn","userId":164625,"courseReminders":[],"assignmentReminders":[],"teamReminders":[{"id":76169,"institutionName":"Holme Skole","institutionId":183,"dueDate":"2022-11-29T23:00:00Z","teamId":65240,"teamName":"2A","reminderText":"Onsdagslektie: Matematikfessor.dk: Sænk skibet med plus.","createdBy":"Peter ","lastEditBy":"Peter ","subjectName":"Matematik"},{"id":76598,"institutionName":"Holme Skole","institutionId":183,"dueDate":"2022-12-06T23:00:00Z","teamId":65240,"teamName":"2A","reminderText":"Julekalender på Skoledu.dk: I skal forsøge at løse dagens kalenderopgave. opgaven kan også godt løses dagen efter.","createdBy":"Peter ","lastEditBy":"Peter Riis","subjectName":"Matematik"},{"id":76599,"institutionName":"Holme Skole","institutionId":183,"dueDate":"2022-12-13T23:00:00Z","teamId":65240,"teamName":"2A","reminderText":"Julekalender på Skoledu.dk: I skal forsøge at løse dagens kalenderopgave. opgaven kan også godt løses dagen efter.","createdBy":"Peter ","lastEditBy":"Peter ","subjectName":"Matematik"},{"id":76600,"institutionName":"Holme Skole","institutionId":183,"dueDate":"2022-12-20T23:00:00Z","teamId":65240,"teamName":"2A","reminderText":"Julekalender på Skoledu.dk: I skal forsøge at løse dagens kalenderopgave. opgaven kan også godt løses dagen efter.","createdBy":"Peter Riis","lastEditBy":"Peter Riis","subjectName":"Matematik"}]},{"userName":"Karla","userId":77882,"courseReminders":[],"assignmentReminders":[{"id":0,"institutionName":"Holme Skole","institutionId":183,"dueDate":"2022-12-08T11:00:00Z","courseId":297469,"teamNames":["5A","5B"],"teamIds":[65271,65258],"courseSubjects":[],"assignmentId":5027904,"assignmentText":"Skriv en novelle"}],"teamReminders":[{"id":76367,"institutionName":"Holme Skole","institutionId":183,"dueDate":"2022-11-30T23:00:00Z","teamId":65258,"teamName":"5A","reminderText":"Læse resten af kap.1 fra Ternet Ninja ( kopiark) Læs det hele højt eller vælg et afsnit. ","createdBy":"Christina ","lastEditBy":"Christina ","subjectName":"Dansk"}]},{"userName":"Vega  ","userId":206597,"courseReminders":[],"assignmentReminders":[],"teamReminders":[]}]'
+            return render(json.loads(mock_huskelisten, strict=False))
+
+        def parse(response):
+            try:
+                data = json.loads(response.text, strict=False)
+            except (json.JSONDecodeError, ValueError):
+                _LOGGER.error("Could not parse the response from Huskelisten as json.")
+                data = None
+            # _LOGGER.debug("Huskelisten raw response: "+str(response.text))
+            return render(data)
+
+        key = (SOURCE_UGEPLAN, "huskelisten")
+        response = self._provider_sessions.get(
+            SYSTEMATIC_API + get_payload,
+            headers=self.response_cache.conditional_headers(key, huskelisten_headers),
+            verify=True,
+        )
+        return self.response_cache.parse(key, response, parse)
+
+    def _fetch_meebook(self, week):
+        # Try Meebook:
+        _LOGGER.debug("In the Meebook flow...")
+        token = self.get_token("0004")
+        # _LOGGER.debug("Token "+token)
+        headers = {
+            "authority": "app.meebook.com",
+            "accept": "application/json",
+            "authorization": token,
+            "dnt": "1",
+            "origin": "https://www.aula.dk",
+            "referer": "https://www.aula.dk/",
+            "sessionuuid": self._mitid_username,
+            "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/107.0.0.0 Safari/537.36",
+            "x-version": "1.0",
+        }
+        childFilter = "&childFilter[]=".join(self._childuserids)
+        institutionFilter = "&institutionFilter[]=".join(self._institutionProfiles)
+        get_payload = (
+            "/relatedweekplan/all?currentWeekNumber="
+            + week
+            + "&userProfile=guardian&childFilter[]="
+            + childFilter
+            + "&institutionFilter[]="
+            + institutionFilter
+        )
+
+        def load(response, context=""):
+            try:
+                return json.loads(response.text, strict=False)
+            except (json.JSONDecodeError, ValueError):
+                _LOGGER.warning("Could not parse the response from Meebook as json" + context + ". Response: " + str(response.text[:200]))
+                return None
+
+        def render(data):
+            result = {}
+            if not isinstance(data, list):
+                if isinstance(data, dict) and "exceptionMessage" in data:
+                    _LOGGER.warning(
+                        "Ignoring error in fetching data from Meebook. Error exception message: "
+                        + data["exceptionMessage"]
+                    )
+                elif data is not None:
+                    _LOGGER.warning("Unexpected response type from Meebook: " + str(type(data)) + ". Response: " + str(data)[:200])
+            else:
+                for person in data:
+                    _LOGGER.debug("Meebook ugeplan for " + person["name"])
+                    ugep = ""
+                    ugeplan = person["weekPlan"]
+                    for day in ugeplan:
+                        ugep = ugep + "<h3>" + day["date"] + "</h3>"
+                        if len(day["tasks"]) > 0:
+                            for task in day["tasks"]:
+                                if not task["pill"] == "Ingen fag tilknyttet":
+                                    ugep = ugep + "<b>" + task["pill"] + "</b><br>"
+                                author = task.get("author")
+                                if author:
+                                    ugep = ugep + author + "<br><br>"
+                                if task["type"] == "comment" or task["type"] == "task":
+                                    content = re.sub(
+                                        r"([0-9]+)(\.)",
+                                        r"\1\.",
+                                        task["content"],
                                     )
+                                elif task["type"] == "assignment":
                                     content = re.sub(
-                                        r"([0-9]+)(\.)", r"\1\.", reminder["reminderText"]
+                                        r"([0-9]+)(\.)", r"\1\.", task["title"]
                                     )
-                                    huskel = huskel + content + "<br><br>"
-                            else:
-                                huskel = huskel + str(name) + " har ingen påmindelser."
-                            self.huskeliste[name] = huskel
-
-                # End Huskelisten
-                if "0004" in self.widgets:
-                    # Try Meebook:
-                    _LOGGER.debug("In the Meebook flow...")
-                    token = self.get_token("0004")
-                    # _LOGGER.debug("Token "+token)
-                    headers = {
-                        "authority": "app.meebook.com",
-                        "accept": "application/json",
-                        "authorization": token,
-                        "dnt": "1",
-                        "origin": "https://www.aula.dk",
-                        "referer": "https://www.aula.dk/",
-                        "sessionuuid": self._mitid_username,
-                        "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/107.0.0.0 Safari/537.36",
-                        "x-version": "1.0",
-                    }
-                    childFilter = "&childFilter[]=".join(self._childuserids)
-                    institutionFilter = "&institutionFilter[]=".join(
-                        self._institutionProfiles
-                    )
-                    get_payload = (
-                        "/relatedweekplan/all?currentWeekNumber="
-                        + week
-                        + "&userProfile=guardian&childFilter[]="
-                        + childFilter
-                        + "&institutionFilter[]="
-                        + institutionFilter
-                    )
+                                ugep = ugep + content + "<br><br>"
+                        else:
+                            ugep = ugep + "-"
+                    try:
+                        name = person["name"].split()[0]
+                    except:
+                        name = person["name"]
+                    result[name] = ugep
+            return result
+
+        mock_meebook = 0
+        if mock_meebook == 1:
+            _LOGGER.warning("Using mock data for Meebook ugeplaner.")
+            mock_meebook = '[{"id":490000,"name":"Emilie efternavn","unilogin":"lud...","weekPlan":[{"date":"mandag 28. nov.","tasks":[{"id":3069630,"type":"comment","author":"Met...","group":"3.a - ugeplan","pill":"Ingen fag tilknyttet","content":"I denne uge er der omlagt uge p\u00e5 hele skolen.\n\nMandag har vi \nKlippeklistredag:\n\nMan m\u00e5 gerne have nissehuer p\u00e5 :)\n\nMedbring gerne en god saks, limstift, skabeloner mm. \n\nB\u00f8rnene skal ogs\u00e5 medbringe et vasket syltet\u00f8jsglas eller lign., som vi skal male p\u00e5. S\u00f8rg gerne for at der ikke er m\u00e6rker p\u00e5:-)\n\n1. lektion: Morgenb\u00e5nd med l\u00e6sning/opgaver\n\n2. lektion: \nVi laver f\u00e6lles julenisser efter en bestemt skabelon.\n\n3. - 5. lektion: \nVi julehygger med musik og kreative projekter. Vi pynter vores f\u00e6lles juletr\u00e6, og synger julesange. \n\n6. lektion:\nAfslutning og oprydning.","editUrl":"https://app.meebook.com//arsplaner/dlap//956783//202248"}]},{"date":"tirsdag 29. nov.","tasks":[{"id":3069630,"type":"comment","author":"Met...","group":"3.a - ugeplan","pill":"Ingen fag tilknyttet","content":"Omlagt uge:\n\n1. lektion\nMorgenb\u00e5nd med l\u00e6sning og opgaver.\n\n2. lektion\nVi starter p\u00e5 storylineforl\u00f8b om jul. Vi taler om nisser og danner nissefamilier i klassen.\n\n3.-5. lektion\nVi lave et juleprojekt med filt...\n\n6. lektion\nVi arbejder med en kreativ opgave om v\u00e5benskold.","editUrl":"https://app.meebook.com//arsplaner/dlap//956783//202248"}]},{"date":"onsdag 30. nov.","tasks":[{"id":3069630,"type":"comment","author":"Met...","group":"3.a - ugeplan","pill":"Ingen fag tilknyttet","content":"Omlagt uge:\n\n1. -2. lektion\nVi skal til foredrag med SOS B\u00f8rnebyerne om omvendt julekalender.\n\n3-4. lektion\nVi skriver nissehistorier om nissefamilierne.\n\n5.-6. lektion\nVi laver jule-postel\u00f8b, hvor posterne skal l\u00e6ses med en kodel\u00e6ser.","editUrl":"https://app.meebook.com//arsplaner/dlap//956783//202248"}]},{"date":"torsdag 1. dec.","tasks":[{"id":3069630,"type":"comment","author":"Met...","group":"3.a - ugeplan","pill":"Ingen fag tilknyttet","content":"Omlagt uge:\n\n1. lektion\nMorgenb\u00e5nd med l\u00e6sning og opgaver. \nVi arbejder med l\u00e6s og forst\u00e5 i en julehistorie.\n\n2.-5. lektion\nVi skal arbejde med et kreativt juleprojekt, hvor der laves huse til nisserne.\n\n6. lektion\nSe SOS b\u00f8rnebyernes julekalender og afrunding af dagen.","editUrl":"https://app.meebook.com//arsplaner/dlap//956783//202248"}]},{"date":"fredag 2. dec.","tasks":[{"id":3069630,"type":"comment","author":"Met...","group":"3.a - ugeplan","pill":"Ingen fag tilknyttet","content":"1. lektion\nMorgenb\u00e5nd med l\u00e6sning og opgaver samt julehygge, hvor vi l\u00e6ser julehistorie \n\n2. lektion:\nVi skal lave et julerim og skrive det ind p\u00e5 en flot julenisse samt tegne nissen. \n\n3.-4. lektion\nVi skal lave jule-postel\u00f8b p\u00e5 skolen. \n\n5.. lektion\nVi skal l\u00f8se et hemmeligt kodebrev ved hj\u00e6lp af en kodel\u00e6ser. \n\nVi evaluerer og afrunder ugen.","editUrl":"https://app.meebook.com//arsplaner/dlap//956783//202248"}]}]},{"id":630000,"name":"Ann...","unilogin":"ann...","weekPlan":[{"date":"mandag 28. nov.","tasks":[{"id":3090189,"type":"comment","author":"May...","group":"0C (22/23)","pill":"B\u00f8rnehaveklasse, B\u00f8rnehaveklassen, Dansk, Matematik","content":"I dag skal vi h\u00f8re om jul i Norge og lave Norsk julepynt.\nEfter 12 pausen skal vi h\u00f8re om julen i Danmark f\u00f8r juletr\u00e6et og andestegen.\nVi skal farvel\u00e6gge g\u00e5rdnisserne der passede p\u00e5 g\u00e5rdene i gamle dage.","editUrl":"https://app.meebook.com//arsplaner/dlap//899210//202248"}]},{"date":"tirsdag 29. nov.","tasks":[{"id":3090189,"type":"comment","author":"May...","group":"0C (22/23)","pill":"B\u00f8rnehaveklasse, B\u00f8rnehaveklassen, Dansk, Matematik","content":"I dag skal vi arbejde med julen i Gr\u00f8nland og lave gr\u00f8nlandske julehuse.\nEfter 12 pausen skal vi h\u00f8re om JUletr\u00e6et der flytter ind i de danske stuer. Vi skal tale om hvor det stammer fra og hvad der var p\u00e5 juletr\u00e6et i gamle dage . Blandt andet den spiselige pynt.\nVi taler om Peters jul og at der ikke altid har v\u00e6ret en stjerne i toppen. Vi klipper storke til juletr\u00e6stoppen","editUrl":"https://app.meebook.com//arsplaner/dlap//899210//202248"}]},{"date":"onsdag 30. nov.","tasks":[{"id":3090189,"type":"comment","author":"May...","group":"0C (22/23)","pill":"B\u00f8rnehaveklasse, B\u00f8rnehaveklassen, Dansk, Matematik","content":"I dag st\u00e5r den p\u00e5 Jul i Finland og finske juletraditioner. Vi klipper finske julestjerner.\nEfter pausen skal vi arbejde videre med jul og julepynt gennem tiden i dk. \nVi skal tale om hvorfor der er flag, trompeter og trommer p\u00e5 tr\u00e6et (krigen i 1864) og vi skal lave gammeldags silkeroser og musetrapper til tr\u00e6et","editUrl":"https://app.meebook.com//arsplaner/dlap//899210//202248"}]},{"date":"torsdag 1. dec.","tasks":[{"id":3090189,"type":"comment","author":"May...","group":"0C (22/23)","pill":"B\u00f8rnehaveklasse, B\u00f8rnehaveklassen, Dansk, Matematik","content":"I dag skal vi p\u00e5 en juletur med hygge og posl\u00f8b til trylleskoven \nBussen k\u00f8rer os derud kl 10 og vi er senest tilbage n\u00e5r skoledagen slutter .\nHusk at f\u00e5 varmt praktisk t\u00f8j p\u00e5 og en turtaske med en let tilg\u00e6ngelig madpakke der kan spises i det fri. Regnbukser eller overtr\u00e6ksbukser s\u00e5 man kan sidde p\u00e5 jorden.","editUrl":"https://app.meebook.com//arsplaner/dlap//899210//202248"}]},{"date":"fredag 2. dec.","tasks":[{"id":3090189,"type":"comment","author":"May...","group":"0C (22/23)","pill":"B\u00f8rnehaveklasse, B\u00f8rnehaveklassen, Dansk, Matematik","content":"Klippe/ klistre dag .\nHusk at tage lim, saks og kaffe m.m., kop og tallerkner med hjemmefra. Hvis i tager kage med er det til en buffet i klassen.","editUrl":"https://app.meebook.com//arsplaner/dlap//899210//202248"}]}]}]'
+            return render(json.loads(mock_meebook, strict=False))
+
+        key = (SOURCE_UGEPLAN, "meebook", week)
+        response = self._provider_sessions.get(
+            MEEBOOK_API + get_payload,
+            headers=self.response_cache.conditional_headers(key, headers),
+            verify=True,
+        )
+        # _LOGGER.debug("Meebook ugeplan raw response from week "+week+": "+str(response.text))
+        context = ""
+        # Only parse here if the body can be an expiry message at all
+        data = load(response) if "expired" in response.text.lower() else None
+        if isinstance(data, dict) and "message" in data and "expired" in str(data["message"]).lower():
+            _LOGGER.debug("Meebook token expired, resetting session and retrying...")
+            self.tokens.pop("0004", None)
+            try:
+                self.login(force_refresh=True)
+            except Exception as login_err:
+                _LOGGER.warning(f"Failed to refresh Aula session after Meebook token expiry: {login_err}")
+            token = self.get_token("0004")
+            if token:
+                headers["authorization"] = token
+                response = self._provider_sessions.get(
+                    MEEBOOK_API + get_payload,
+                    headers=self.response_cache.conditional_headers(key, headers),
+                    verify=True,
+                )
+                context = " after token refresh"
 
-                    mock_meebook = 0
-                    if mock_meebook == 1:
-                        _LOGGER.warning("Using mock data for Meebook ugeplaner.")
-                        mock_meebook = '[{"id":490000,"name":"Emilie efternavn","unilogin":"lud...","weekPlan":[{"date":"mandag 28. nov.","tasks":[{"id":3069630,"type":"comment","author":"Met...","group":"3.a - ugeplan","pill":"Ingen fag tilknyttet","content":"I denne uge er der omlagt uge p\u00e5 hele skolen.\n\nMandag har vi \nKlippeklistredag:\n\nMan m\u00e5 gerne have nissehuer p\u00e5 :)\n\nMedbring gerne en god saks, limstift, skabeloner mm. \n\nB\u00f8rnene skal ogs\u00e5 medbringe et vasket syltet\u00f8jsglas eller lign., som vi skal male p\u00e5. S\u00f8rg gerne for at der ikke er m\u00e6rker p\u00e5:-)\n\n1. lektion: Morgenb\u00e5nd med l\u00e6sning/opgaver\n\n2. lektion: \nVi laver f\u00e6lles julenisser efter en bestemt skabelon.\n\n3. - 5. lektion: \nVi julehygger med musik og kreative projekter. Vi pynter vores f\u00e6lles juletr\u00e6, og synger julesange. \n\n6. lektion:\nAfslutning og oprydning.","editUrl":"https://app.meebook.com//arsplaner/dlap//956783//202248"}]},{"date":"tirsdag 29. nov.","tasks":[{"id":3069630,"type":"comment","author":"Met...","group":"3.a - ugeplan","pill":"Ingen fag tilknyttet","content":"Omlagt uge:\n\n1. lektion\nMorgenb\u00e5nd med l\u00e6sning og opgaver.\n\n2. lektion\nVi starter p\u00e5 storylineforl\u00f8b om jul. Vi taler om nisser og danner nissefamilier i klassen.\n\n3.-5. lektion\nVi lave et juleprojekt med filt...\n\n6. lektion\nVi arbejder med en kreativ opgave om v\u00e5benskold.","editUrl":"https://app.meebook.com//arsplaner/dlap//956783//202248"}]},{"date":"onsdag 30. nov.","tasks":[{"id":3069630,"type":"comment","author":"Met...","group":"3.a - ugeplan","pill":"Ingen fag tilknyttet","content":"Omlagt uge:\n\n1. -2. lektion\nVi skal til foredrag med SOS B\u00f8rnebyerne om omvendt julekalender.\n\n3-4. lektion\nVi skriver nissehistorier om nissefamilierne.\n\n5.-6. lektion\nVi laver jule-postel\u00f8b, hvor posterne skal l\u00e6ses med en kodel\u00e6ser.","editUrl":"https://app.meebook.com//arsplaner/dlap//956783//202248"}]},{"date":"torsdag 1. dec.","tasks":[{"id":3069630,"type":"comment","author":"Met...","group":"3.a - ugeplan","pill":"Ingen fag tilknyttet","content":"Omlagt uge:\n\n1. lektion\nMorgenb\u00e5nd med l\u00e6sning og opgaver. \nVi arbejder med l\u00e6s og forst\u00e5 i en julehistorie.\n\n2.-5. lektion\nVi skal arbejde med et kreativt juleprojekt, hvor der laves huse til nisserne.\n\n6. lektion\nSe SOS b\u00f8rnebyernes julekalender og afrunding af dagen.","editUrl":"https://app.meebook.com//arsplaner/dlap//956783//202248"}]},{"date":"fredag 2. dec.","tasks":[{"id":3069630,"type":"comment","author":"Met...","group":"3.a - ugeplan","pill":"Ingen fag tilknyttet","content":"1. lektion\nMorgenb\u00e5nd med l\u00e6sning og opgaver samt julehygge, hvor vi l\u00e6ser julehistorie \n\n2. lektion:\nVi skal lave et julerim og skrive det ind p\u00e5 en flot julenisse samt tegne nissen. \n\n3.-4. lektion\nVi skal lave jule-postel\u00f8b p\u00e5 skolen. \n\n5.. lektion\nVi skal l\u00f8se et hemmeligt kodebrev ved hj\u00e6lp af en kodel\u00e6ser. \n\nVi evaluerer og afrunder ugen.","editUrl":"https://app.meebook.com//arsplaner/dlap//956783//202248"}]}]},{"id":630000,"name":"Ann...","unilogin":"ann...","weekPlan":[{"date":"mandag 28. nov.","tasks":[{"id":3090189,"type":"comment","author":"May...","group":"0C (22/23)","pill":"B\u00f8rnehaveklasse, B\u00f8rnehaveklassen, Dansk, Matematik","content":"I dag skal vi h\u00f8re om jul i Norge og lave Norsk julepynt.\nEfter 12 pausen skal vi h\u00f8re om julen i Danmark f\u00f8r juletr\u00e6et og andestegen.\nVi skal farvel\u00e6gge g\u00e5rdnisserne der passede p\u00e5 g\u00e5rdene i gamle dage.","editUrl":"https://app.meebook.com//arsplaner/dlap//899210//202248"}]},{"date":"tirsdag 29. nov.","tasks":[{"id":3090189,"type":"comment","author":"May...","group":"0C (22/23)","pill":"B\u00f8rnehaveklasse, B\u00f8rnehaveklassen, Dansk, Matematik","content":"I dag skal vi arbejde med julen i Gr\u00f8nland og lave gr\u00f8nlandske julehuse.\nEfter 12 pausen skal vi h\u00f8re om JUletr\u00e6et der flytter ind i de danske stuer. Vi skal tale om hvor det stammer fra og hvad der var p\u00e5 juletr\u00e6et i gamle dage . Blandt andet den spiselige pynt.\nVi taler om Peters jul og at der ikke altid har v\u00e6ret en stjerne i toppen. Vi klipper storke til juletr\u00e6stoppen","editUrl":"https://app.meebook.com//arsplaner/dlap//899210//202248"}]},{"date":"onsdag 30. nov.","tasks":[{"id":3090189,"type":"comment","author":"May...","group":"0C (22/23)","pill":"B\u00f8rnehaveklasse, B\u00f8rnehaveklassen, Dansk, Matematik","content":"I dag st\u00e5r den p\u00e5 Jul i Finland og finske juletraditioner. Vi klipper finske julestjerner.\nEfter pausen skal vi arbejde videre med jul og julepynt gennem tiden i dk. \nVi skal tale om hvorfor der er flag, trompeter og trommer p\u00e5 tr\u00e6et (krigen i 1864) og vi skal lave gammeldags silkeroser og musetrapper til tr\u00e6et","editUrl":"https://app.meebook.com//arsplaner/dlap//899210//202248"}]},{"date":"torsdag 1. dec.","tasks":[{"id":3090189,"type":"comment","author":"May...","group":"0C (22/23)","pill":"B\u00f8rnehaveklasse, B\u00f8rnehaveklassen, Dansk, Matematik","content":"I dag skal vi p\u00e5 en juletur med hygge og posl\u00f8b til trylleskoven \nBussen k\u00f8rer os derud kl 10 og vi er senest tilbage n\u00e5r skoledagen slutter .\nHusk at f\u00e5 varmt praktisk t\u00f8j p\u00e5 og en turtaske med en let tilg\u00e6ngelig madpakke der kan spises i det fri. Regnbukser eller overtr\u00e6ksbukser s\u00e5 man kan sidde p\u00e5 jorden.","editUrl":"https://app.meebook.com//arsplaner/dlap//899210//202248"}]},{"date":"fredag 2. dec.","tasks":[{"id":3090189,"type":"comment","author":"May...","group":"0C (22/23)","pill":"B\u00f8rnehaveklasse, B\u00f8rnehaveklassen, Dansk, Matematik","content":"Klippe/ klistre dag .\nHusk at tage lim, saks og kaffe m.m., kop og tallerkner med hjemmefra. Hvis i tager kage med er det til en buffet i klassen.","editUrl":"https://app.meebook.com//arsplaner/dlap//899210//202248"}]}]}]'
-                        data = json.loads(mock_meebook, strict=False)
-                    else:
-                        response = requests.get(
-                            MEEBOOK_API + get_payload, headers=headers, verify=True
-                        )
-                        try:
-                            data = json.loads(response.text, strict=False)
-                        except (json.JSONDecodeError, ValueError):
-                            _LOGGER.warning("Could not parse the response from Meebook as json. Response: " + str(response.text[:200]))
-                            data = None
-                        # _LOGGER.debug("Meebook ugeplan raw response from week "+week+": "+str(response.text))
-
-                    if isinstance(data, dict) and "message" in data and "expired" in str(data["message"]).lower():
-                        _LOGGER.debug("Meebook token expired, resetting session and retrying...")
-                        self.tokens.pop("0004", None)
-                        self._session = None
-                        try:
-                            self.login(force_refresh=True)
-                        except Exception as login_err:
-                            _LOGGER.warning(f"Failed to refresh Aula session after Meebook token expiry: {login_err}")
-                        token = self.get_token("0004")
-                        if token:
-                            headers["authorization"] = token
-                            response = requests.get(
-                                MEEBOOK_API + get_payload, headers=headers, verify=True
-                            )
-                            try:
-                                data = json.loads(response.text, strict=False)
-                            except (json.JSONDecodeError, ValueError):
-                                _LOGGER.warning("Could not parse the response from Meebook as json after token refresh. Response: " + str(response.text[:200]))
-                                data = None
-
-                    if not isinstance(data, list):
-                        if isinstance(data, dict) and "exceptionMessage" in data:
-                            _LOGGER.warning(
-                                "Ignoring error in fetching data from Meebook. Error exception message: "
-                                + data["exceptionMessage"]
-                            )
-                        elif data is not None:
-                            _LOGGER.warning("Unexpected response type from Meebook: " + str(type(data)) + ". Response: " + str(data)[:200])
-                    else:
-                        for person in data:
-                            _LOGGER.debug("Meebook ugeplan for " + person["name"])
-                            ugep = ""
-                            ugeplan = person["weekPlan"]
-                            for day in ugeplan:
-                                ugep = ugep + "<h3>" + day["date"] + "</h3>"
-                                if len(day["tasks"]) > 0:
-                                    for task in day["tasks"]:
-                                        if not task["pill"] == "Ingen fag tilknyttet":
-                                            ugep = (
-                                                ugep + "<b>" + task["pill"] + "</b><br>"
-                                            )
-                                        author = task.get("author")
-                                        if author:
-                                            ugep = ugep + author + "<br><br>"
-                                        if (
-                                            task["type"] == "comment"
-                                            or task["type"] == "task"
-                                        ):
-                                            content = re.sub(
-                                                r"([0-9]+)(\.)",
-                                                r"\1\.",
-                                                task["content"],
-                                            )
-                                        elif task["type"] == "assignment":
-                                            content = re.sub(
-                                                r"([0-9]+)(\.)", r"\1\.", task["title"]
-                                            )
-                                        ugep = ugep + content + "<br><br>"
-                                else:
-                                    ugep = ugep + "-"
-                            try:
-                                name = person["name"].split()[0]
-                            except:
-                                name = person["name"]
-                            if thisnext == "this":
-                                self.ugep_attr[name] = ugep
-                            elif thisnext == "next":
-                                self.ugepnext_attr[name] = ugep
-
-            now = datetime.datetime.now() + datetime.timedelta(weeks=1)
-            thisweek = datetime.datetime.now().strftime("%Y-W%V")
-            nextweek = now.strftime("%Y-W%V")
-            ugeplan(thisweek, "this")
-            ugeplan(nextweek, "next")
-            # _LOGGER.debug("End result of ugeplan object: "+str(self.ugep_attr))
-        # End of Ugeplaner
-        return True
+        return self.response_cache.parse(
+            key, response, lambda response: render(load(response, context))
+        )
@@ -15,6 +15,27 @@ from .const import (
     CONF_SCHOOLSCHEDULE,
     CONF_UGEPLAN,
     CONF_MU_OPGAVER,
+    CONF_MAX_CONCURRENCY,
+    DEFAULT_MAX_CONCURRENCY,
+    CONF_VERIFY_INTERVAL,
+    DEFAULT_VERIFY_INTERVAL,
+    CONF_ADAPTIVE_PRESENCE,
+    CONF_PRESENCE_INTERVAL,
+    DEFAULT_PRESENCE_INTERVAL,
+    CONF_MESSAGES_INTERVAL,
+    DEFAULT_MESSAGES_INTERVAL,
+    CONF_CALENDAR_INTERVAL,
+    DEFAULT_CALENDAR_INTERVAL,
+    CONF_WEEKPLAN_INTERVAL,
+    DEFAULT_WEEKPLAN_INTERVAL,
+    CONF_WIDGET_TOKEN_TTL,
+    DEFAULT_WIDGET_TOKEN_TTL,
+    CONF_REFRESH_DEADLINE,
+    DEFAULT_REFRESH_DEADLINE,
+    CONF_CALENDAR_WEEKS_BACK,
+    DEFAULT_CALENDAR_WEEKS_BACK,
+    CONF_CALENDAR_WEEKS_AHEAD,
+    DEFAULT_CALENDAR_WEEKS_AHEAD,
     CONF_TEACHER_NAME_DISPLAY,
     TEACHER_NAME_INITIALS,
     TEACHER_NAME_FULL,
@@ -489,6 +510,42 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
                 vol.Optional(
                     CONF_MU_OPGAVER, default=current.get(CONF_MU_OPGAVER, True)
                 ): cv.boolean,
+                vol.Optional(
+                    CONF_ADAPTIVE_PRESENCE,
+                    default=current.get(CONF_ADAPTIVE_PRESENCE, True),
+                ): cv.boolean,
+                vol.Optional(
+                    CONF_PRESENCE_INTERVAL,
+                    default=current.get(CONF_PRESENCE_INTERVAL, DEFAULT_PRESENCE_INTERVAL),
+                ): vol.All(vol.Coerce(int), vol.Range(min=1, max=1440)),
+                vol.Optional(
+                    CONF_MESSAGES_INTERVAL,
+                    default=current.get(CONF_MESSAGES_INTERVAL, DEFAULT_MESSAGES_INTERVAL),
+                ): vol.All(vol.Coerce(int), vol.Range(min=1, max=1440)),
+                vol.Optional(
+                    CONF_CALENDAR_INTERVAL,
+                    default=current.get(CONF_CALENDAR_INTERVAL, DEFAULT_CALENDAR_INTERVAL),
+                ): vol.All(vol.Coerce(int), vol.Range(min=1, max=1440)),
+                vol.Optional(
+                    CONF_WEEKPLAN_INTERVAL,
+                    default=current.get(CONF_WEEKPLAN_INTERVAL, DEFAULT_WEEKPLAN_INTERVAL),
+                ): vol.All(vol.Coerce(int), vol.Range(min=1, max=1440)),
+                vol.Optional(
+                    CONF_MAX_CONCURRENCY,
+                    default=current.get(CONF_MAX_CONCURRENCY, DEFAULT_MAX_CONCURRENCY),
+                ): vol.All(vol.Coerce(int), vol.Range(min=1, max=16)),
+                vol.Optional(
+                    CONF_VERIFY_INTERVAL,
+                    default=current.get(CONF_VERIFY_INTERVAL, DEFAULT_VERIFY_INTERVAL),
+                ): vol.All(vol.Coerce(int), vol.Range(min=0, max=1440)),
+                vol.Optional(
+                    CONF_WIDGET_TOKEN_TTL,
+                    default=current.get(CONF_WIDGET_TOKEN_TTL, DEFAULT_WIDGET_TOKEN_TTL),
+                ): vol.All(vol.Coerce(int), vol.Range(min=0, max=3600)),
+                vol.Optional(
+                    CONF_REFRESH_DEADLINE,
+                    default=current.get(CONF_REFRESH_DEADLINE, DEFAULT_REFRESH_DEADLINE),
+                ): vol.All(vol.Coerce(int), vol.Range(min=10, max=600)),
             }
         )
         return self.async_show_form(step_id="options", data_schema=options_schema)
@@ -502,6 +559,12 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
             self._pending_updates[CONF_SCHOOLSCHEDULE_EMOJI] = user_input[
                 CONF_SCHOOLSCHEDULE_EMOJI
             ]
+            self._pending_updates[CONF_CALENDAR_WEEKS_BACK] = user_input[
+                CONF_CALENDAR_WEEKS_BACK
+            ]
+            self._pending_updates[CONF_CALENDAR_WEEKS_AHEAD] = user_input[
+                CONF_CALENDAR_WEEKS_AHEAD
+            ]
             return self._save_options()
 
         current = self.config_entry.data
@@ -515,6 +578,14 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
                     CONF_SCHOOLSCHEDULE_EMOJI,
                     default=current.get(CONF_SCHOOLSCHEDULE_EMOJI, False),
                 ): cv.boolean,
+                vol.Optional(
+                    CONF_CALENDAR_WEEKS_BACK,
+                    default=current.get(CONF_CALENDAR_WEEKS_BACK, DEFAULT_CALENDAR_WEEKS_BACK),
+                ): vol.All(vol.Coerce(int), vol.Range(min=0, max=52)),
+                vol.Optional(
+                    CONF_CALENDAR_WEEKS_AHEAD,
+                    default=current.get(CONF_CALENDAR_WEEKS_AHEAD, DEFAULT_CALENDAR_WEEKS_AHEAD),
+                ): vol.All(vol.Coerce(int), vol.Range(min=0, max=52)),
             }
         )
         return self.async_show_form(step_id="schoolschedule_display", data_schema=schema)
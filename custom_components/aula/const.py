@@ -21,9 +21,74 @@ MIN_UDDANNELSE_API = "https://api.minuddannelse.net/aula"
 MEEBOOK_API = "https://app.meebook.com/aulaapi"
 SYSTEMATIC_API = "https://systematic-momo.dk/api/aula"
 EASYIQ_API = "https://api.easyiqcloud.dk/api/aula"
+# Seconds a fetched profiles.getProfileContext response is reused, so the
+# lookups made during one refresh share a single request.
+PROFILE_CONTEXT_TTL = 60
+# Widget tokens are renewed this many seconds before they expire
+WIDGET_TOKEN_RENEW_MARGIN = 60
 CONF_SCHOOLSCHEDULE = "schoolschedule"
 CONF_UGEPLAN = "ugeplan"
 CONF_MU_OPGAVER = "mu_opgaver"
+CONF_MAX_CONCURRENCY = "max_concurrency"
+DEFAULT_MAX_CONCURRENCY = 4
+CONF_CALENDAR_WEEKS_BACK = "calendar_weeks_back"
+DEFAULT_CALENDAR_WEEKS_BACK = 0
+CONF_CALENDAR_WEEKS_AHEAD = "calendar_weeks_ahead"
+DEFAULT_CALENDAR_WEEKS_AHEAD = 2
+CONF_WIDGET_TOKEN_TTL = "widget_token_ttl"  # seconds, for tokens that are not JWTs
+DEFAULT_WIDGET_TOKEN_TTL = 60
+# Seconds a refresh may take before the widget providers still running
+# (MU Opgaver, ugeplaner, Huskelisten) are abandoned
+CONF_REFRESH_DEADLINE = "refresh_deadline"
+DEFAULT_REFRESH_DEADLINE = 60
+# Data sources update_data can refresh independently, each on its own schedule
+SOURCE_PRESENCE = "presence"
+SOURCE_MESSAGES = "messages"
+SOURCE_CALENDAR = "calendar"
+SOURCE_MU_OPGAVER = "mu_opgaver"
+SOURCE_UGEPLAN = "ugeplan"
+SOURCES = (
+    SOURCE_PRESENCE,
+    SOURCE_MESSAGES,
+    SOURCE_CALENDAR,
+    SOURCE_MU_OPGAVER,
+    SOURCE_UGEPLAN,
+)
+# Stages of a refresh, each timed and failing on its own (see pipeline.py)
+STAGE_PRESENCE = SOURCE_PRESENCE
+STAGE_MESSAGES = SOURCE_MESSAGES
+STAGE_CALENDAR = SOURCE_CALENDAR
+STAGE_MU_OPGAVER = SOURCE_MU_OPGAVER
+STAGE_MU_UGEBREV = "mu_ugebrev"
+STAGE_EASYIQ = "easyiq"
+STAGE_MEEBOOK = "meebook"
+STAGE_HUSKELISTEN = "huskelisten"
+STAGES = (
+    STAGE_PRESENCE,
+    STAGE_MESSAGES,
+    STAGE_CALENDAR,
+    STAGE_MU_OPGAVER,
+    STAGE_MU_UGEBREV,
+    STAGE_EASYIQ,
+    STAGE_MEEBOOK,
+    STAGE_HUSKELISTEN,
+)
+# Token renewal and login check before the stages; timed, but not isolated
+STAGE_PREPARE = "prepare"
+# Refresh intervals in minutes. MU Opgaver and ugeplaner share one interval.
+CONF_ADAPTIVE_PRESENCE = "adaptive_presence"
+CONF_PRESENCE_INTERVAL = "presence_interval"
+DEFAULT_PRESENCE_INTERVAL = 5
+CONF_MESSAGES_INTERVAL = "messages_interval"
+DEFAULT_MESSAGES_INTERVAL = 5
+CONF_CALENDAR_INTERVAL = "calendar_interval"
+DEFAULT_CALENDAR_INTERVAL = 15
+CONF_WEEKPLAN_INTERVAL = "weekplan_interval"
+DEFAULT_WEEKPLAN_INTERVAL = 60
+# Minutes, 0 = verify on every refresh. The profile list (children and
+# institutions) comes with the login check, so it is refreshed as often.
+CONF_VERIFY_INTERVAL = "verify_interval"
+DEFAULT_VERIFY_INTERVAL = 60
 CONF_TEACHER_FULL_NAME = "teacher_full_name"  # Deprecated, kept for migration only
 CONF_TEACHER_NAME_DISPLAY = "teacher_name_display"
 TEACHER_NAME_INITIALS = "initials"
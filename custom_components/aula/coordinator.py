@@ -0,0 +1,131 @@
+"""One DataUpdateCoordinator per data source.
+
+Presence, messages, the school schedule and the weekly plans change at very
+different rates, so each is refreshed on its own interval. Entities listen
+only to the coordinators of the sources they render, and a coordinator only
+polls while something listens to it.
+
+The data of a coordinator is the fingerprints of the responses its source
+was built from, so when nothing changed since the last refresh the listeners
+are not called and no entity state is written.
+"""
+from datetime import timedelta
+import inspect
+import logging
+
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
+import homeassistant.util.dt as dt_util
+
+from .const import (
+    DOMAIN,
+    SOURCE_PRESENCE,
+    SOURCE_MESSAGES,
+    SOURCE_CALENDAR,
+    SOURCE_MU_OPGAVER,
+    SOURCE_UGEPLAN,
+    CONF_ADAPTIVE_PRESENCE,
+    CONF_PRESENCE_INTERVAL,
+    DEFAULT_PRESENCE_INTERVAL,
+    CONF_MESSAGES_INTERVAL,
+    DEFAULT_MESSAGES_INTERVAL,
+    CONF_CALENDAR_INTERVAL,
+    DEFAULT_CALENDAR_INTERVAL,
+    CONF_WEEKPLAN_INTERVAL,
+    DEFAULT_WEEKPLAN_INTERVAL,
+)
+from .presence_schedule import presence_poll_interval
+
+_LOGGER = logging.getLogger(__name__)
+
+# Home Assistant 2024.11 and later want the config entry passed explicitly
+# and warn otherwise; older versions lack the argument.
+_ACCEPTS_CONFIG_ENTRY = (
+    "config_entry" in inspect.signature(DataUpdateCoordinator.__init__).parameters
+)
+
+
+def source_intervals(data):
+    """Return {source: refresh interval} from the config entry data."""
+    weekplan = timedelta(
+        minutes=data.get(CONF_WEEKPLAN_INTERVAL, DEFAULT_WEEKPLAN_INTERVAL)
+    )
+    return {
+        SOURCE_PRESENCE: timedelta(
+            minutes=data.get(CONF_PRESENCE_INTERVAL, DEFAULT_PRESENCE_INTERVAL)
+        ),
+        SOURCE_MESSAGES: timedelta(
+            minutes=data.get(CONF_MESSAGES_INTERVAL, DEFAULT_MESSAGES_INTERVAL)
+        ),
+        SOURCE_CALENDAR: timedelta(
+            minutes=data.get(CONF_CALENDAR_INTERVAL, DEFAULT_CALENDAR_INTERVAL)
+        ),
+        SOURCE_MU_OPGAVER: weekplan,
+        SOURCE_UGEPLAN: weekplan,
+    }
+
+
+def next_presence_interval(client, base_interval):
+    """Return when to poll presence again, based on the children's school day."""
+    now = dt_util.now()
+    overviews = {
+        childid: client._daily_overview.get(childid) for childid in client._childids
+    }
+    lesson_bounds = {}
+    for childid in overviews:
+        bounds = client.calendar_store.day_bounds(int(childid), now.date(), now.tzinfo)
+        if bounds is not None:
+            lesson_bounds[childid] = bounds
+    return presence_poll_interval(now, overviews, lesson_bounds, base_interval)
+
+
+def create_coordinators(hass, client, entry, scheduler=None):
+    """Create a coordinator for each data source of client, for config entry entry.
+
+    With a scheduler, a refresh waits its turn when another config entry has
+    just refreshed the same source, so several entries do not refresh in
+    lockstep.
+
+    With adaptive presence polling enabled, the presence coordinator moves
+    its interval after every poll: fast around expected check-in and
+    check-out, slow at night, at weekends and when every child is done.
+    """
+    data, entry_id = entry.data, entry.entry_id
+    adaptive_presence = data.get(CONF_ADAPTIVE_PRESENCE, True)
+    entry_kwargs = {"config_entry": entry} if _ACCEPTS_CONFIG_ENTRY else {}
+    coordinators = {}
+    for source, interval in source_intervals(data).items():
+
+        async def async_update_data(source=source, base_interval=interval):
+            if scheduler is not None:
+                await scheduler.async_wait_turn(source, entry_id)
+            await client.async_update_data(sources=(source,))
+            if source == SOURCE_PRESENCE and adaptive_presence:
+                _set_presence_interval(
+                    coordinators[source], next_presence_interval(client, base_interval)
+                )
+            return client.response_cache.fingerprints(source)
+
+        coordinators[source] = DataUpdateCoordinator(
+            hass,
+            _LOGGER,
+            name=f"{DOMAIN} {source}",
+            update_method=async_update_data,
+            update_interval=interval,
+            **entry_kwargs,
+        )
+        # Only call the listeners when the fingerprints changed. Set after
+        # construction, as older Home Assistant versions lack the argument.
+        coordinators[source].always_update = False
+
+    if adaptive_presence:
+        base_interval = coordinators[SOURCE_PRESENCE].update_interval
+        _set_presence_interval(
+            coordinators[SOURCE_PRESENCE], next_presence_interval(client, base_interval)
+        )
+    return coordinators
+
+
+def _set_presence_interval(coordinator, interval):
+    if interval != coordinator.update_interval:
+        _LOGGER.debug(f"Polling presence again in {interval}")
+        coordinator.update_interval = interval
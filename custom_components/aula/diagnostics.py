@@ -0,0 +1,54 @@
+"""Diagnostics download of an Aula config entry: refresh cost and health."""
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import (
+    DOMAIN,
+    CONF_MITID_USERNAME,
+    CONF_MITID_PASSWORD,
+    CONF_MITID_TOKEN,
+    CONF_ACCESS_TOKEN,
+    CONF_REFRESH_TOKEN,
+)
+from .metrics import hit_ratio
+
+TO_REDACT = {
+    CONF_MITID_USERNAME,
+    CONF_MITID_PASSWORD,
+    CONF_MITID_TOKEN,
+    CONF_ACCESS_TOKEN,
+    CONF_REFRESH_TOKEN,
+    "stored_tokens",
+}
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry):
+    """Return the timing and request statistics of the entry.
+
+    The request, rate limit and shared request statistics are those of the
+    scheduler, so they cover every Aula config entry.
+    """
+    entry_data = hass.data[DOMAIN][entry.entry_id]
+    client = entry_data["client"]
+    scheduler = hass.data[DOMAIN]["scheduler"]
+    deduper = scheduler.deduper
+    return {
+        "config": async_redact_data(dict(entry.data), TO_REDACT),
+        "stages": client.stage_health.stats(),
+        "response_cache": client.response_cache.stats(),
+        "coordinators": {
+            source: {
+                "update_interval": str(coordinator.update_interval),
+                "last_update_success": coordinator.last_update_success,
+            }
+            for source, coordinator in entry_data["coordinators"].items()
+        },
+        "requests": scheduler.metrics.stats(),
+        "rate_limit": scheduler.rate_limiter.stats(),
+        "shared_requests": {
+            "sent": deduper.sent,
+            "shared": deduper.shared,
+            "hit_ratio": hit_ratio(deduper.shared, deduper.sent),
+        },
+    }
@@ -0,0 +1,155 @@
+"""Skip work for responses that have not changed since the last refresh.
+
+Every response a refresh fetches is fingerprinted under a key such as
+("ugeplan", "meebook", "2025-W08"). When the body hashes the same as last
+time - or the server answered 304 Not Modified to the ETag we sent - the
+result parsed and rendered from it last time is reused, so parsing and HTML
+rendering are skipped. The fingerprints of a source also tell its coordinator
+whether anything changed at all, so unchanged refreshes write no entity state.
+"""
+import hashlib
+import json
+import logging
+import threading
+
+from .metrics import hit_ratio
+
+_LOGGER = logging.getLogger(__name__)
+
+
+# Characters of a str body encoded at a time for its digest
+_ENCODE_CHUNK = 64 * 1024
+
+
+def body_hash():
+    """Return a hash object to feed a body to; its hexdigest() is body_digest."""
+    return hashlib.blake2b(digest_size=16)
+
+
+def body_digest(body):
+    """Return a short hash of a response body (str or bytes)."""
+    digest = body_hash()
+    if isinstance(body, str):
+        # A slice at a time, so the body is not copied whole
+        for start in range(0, len(body), _ENCODE_CHUNK):
+            digest.update(body[start : start + _ENCODE_CHUNK].encode())
+    else:
+        digest.update(body or b"")
+    return digest.hexdigest()
+
+
+def state_digest(state, attributes, available=True):
+    """Return a short hash of an entity's state, attributes and availability."""
+    payload = json.dumps(
+        [state, attributes, available], sort_keys=True, default=str
+    )
+    return body_digest(payload)
+
+
+def _response_body(response):
+    # requests.Response has .content, AulaResponse only .text
+    content = getattr(response, "content", None)
+    if isinstance(content, (bytes, str)):
+        return content
+    return response.text
+
+
+def _etag(response):
+    # AulaResponse headers are a plain dict, so the case is whatever the
+    # server sent
+    for name, value in (response.headers or {}).items():
+        if name.lower() == "etag":
+            return value
+    return None
+
+
+class ResponseCache:
+    """Fingerprints, ETags and parsed results of the last response per key.
+
+    A key is a tuple whose first item is the data source (see const.SOURCES).
+    hits and misses count the responses reused and parsed. Thread-safe: the
+    widget providers are fetched and parsed in executor threads while the
+    other coordinators read and prune the cache on the event loop.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # {key: (etag, digest, result)}
+        self._entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    def conditional_headers(self, key, headers=None):
+        """Return headers with If-None-Match added when we hold an ETag for key."""
+        headers = dict(headers or {})
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None and entry[0]:
+            headers["If-None-Match"] = entry[0]
+        return headers
+
+    def parse(self, key, response, parse, unchanged=None):
+        """Return parse(response), or the cached result if the response is unchanged.
+
+        unchanged, if given, is called with the cached result when it is
+        reused, for callers that need to do something even then.
+        """
+        # AulaResponse hashed its body while reading it
+        digest = getattr(response, "digest", None) or body_digest(
+            _response_body(response)
+        )
+        with self._lock:
+            entry = self._entries.get(key)
+            hit = entry is not None and (
+                response.status_code == 304 or entry[1] == digest
+            )
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if hit:
+            _LOGGER.debug(f"{key} unchanged, reusing parsed result")
+            if unchanged is not None:
+                unchanged(entry[2])
+            return entry[2]
+
+        # Parsed without holding the lock, it may render HTML
+        result = parse(response)
+        with self._lock:
+            self._entries[key] = (_etag(response), digest, result)
+        return result
+
+    def forget(self, key):
+        """Drop key, so its next response is parsed whatever it contains."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def prune(self, source, keep):
+        """Drop the keys of a source for which keep(key) is false."""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == source]:
+                if not keep(key):
+                    del self._entries[key]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": hit_ratio(self.hits, self.misses),
+            }
+
+    def fingerprints(self, source):
+        """Return the fingerprints of all responses cached for a source.
+
+        The value only changes when one of the responses changed, so it can be
+        used as coordinator data to skip unchanged refreshes.
+        """
+        with self._lock:
+            fingerprints = [
+                (key, entry[1])
+                for key, entry in self._entries.items()
+                if key[0] == source
+            ]
+        return tuple(sorted(fingerprints))
@@ -0,0 +1,85 @@
+"""Request counters and latency histograms.
+
+Every request sent to Aula (AulaApi), the widget providers and the login
+hosts (RateLimitedAdapter) is recorded per host: its latency, the bytes
+received and whether it failed. Together with the per-stage timing in
+pipeline.StageHealth and the response cache hit ratio, this tells where the
+time of a slow refresh goes. It is shown in the diagnostics download and by
+the refresh sensors (disabled by default).
+"""
+import bisect
+import threading
+
+# Upper bounds in seconds of the latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def hit_ratio(hits, misses):
+    """Return hits / (hits + misses), or None before anything was counted."""
+    total = hits + misses
+    return round(hits / total, 3) if total else None
+
+
+class LatencyHistogram:
+    """Counts of durations per bucket, plus their count, sum and maximum."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self._buckets = buckets
+        # One count per bucket, and one for durations above the last bound
+        self._counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self._counts[bisect.bisect_left(self._buckets, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def as_dict(self):
+        buckets = {f"<={bound}": count for bound, count in zip(self._buckets, self._counts)}
+        buckets[f">{self._buckets[-1]}"] = self._counts[-1]
+        return {
+            "count": self.count,
+            "mean": round(self.total / self.count, 4) if self.count else None,
+            "max": round(self.max, 4),
+            "buckets": buckets,
+        }
+
+
+class RequestMetrics:
+    """Requests, failures, bytes received and latency per host. Thread-safe."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hosts = {}
+
+    def record(self, host, seconds, size=0, status=None):
+        """Record a request to host. status None means it got no response."""
+        with self._lock:
+            stats = self._hosts.get(host)
+            if stats is None:
+                stats = self._hosts[host] = {
+                    "requests": 0,
+                    "errors": 0,
+                    "bytes": 0,
+                    "latency": LatencyHistogram(),
+                }
+            stats["requests"] += 1
+            if status is None or status >= 400:
+                stats["errors"] += 1
+            stats["bytes"] += size
+            stats["latency"].observe(seconds)
+
+    def total_requests(self):
+        with self._lock:
+            return sum(stats["requests"] for stats in self._hosts.values())
+
+    def stats(self):
+        """Return a copy of the statistics of every host."""
+        with self._lock:
+            return {
+                host: dict(stats, latency=stats["latency"].as_dict())
+                for host, stats in self._hosts.items()
+            }
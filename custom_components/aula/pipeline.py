@@ -0,0 +1,69 @@
+"""Fault isolation and timing of the stages of a refresh.
+
+A refresh is split into stages, one per data source or widget provider (see
+const.STAGES). Every stage is its own error boundary: when it fails, the
+error is logged and its merge is skipped, so the attributes it feeds keep
+their last good values while the other stages are published as usual.
+StageHealth keeps the timing and outcome of the runs of every stage.
+"""
+import datetime
+
+from .metrics import LatencyHistogram
+
+
+class StageHealth:
+    """Timing and outcome of the runs of each stage, by stage name.
+
+    A stage may run more than once per refresh (e.g. once per week), so the
+    counters add up the runs and the rest describes the last one.
+    """
+
+    def __init__(self):
+        self._stages = {}
+
+    def _stage(self, name):
+        return self._stages.setdefault(
+            name,
+            {
+                "runs": 0,
+                "failures": 0,
+                "abandoned": 0,
+                "consecutive_failures": 0,
+                "last_duration": None,
+                "last_success": None,
+                "last_error": None,
+                "latency": LatencyHistogram(),
+            },
+        )
+
+    def succeeded(self, name, duration, now=None):
+        stage = self._stage(name)
+        stage["runs"] += 1
+        stage["consecutive_failures"] = 0
+        stage["last_duration"] = duration
+        stage["last_success"] = now or datetime.datetime.now(datetime.timezone.utc)
+        stage["latency"].observe(duration)
+
+    def failed(self, name, error, duration=None):
+        stage = self._stage(name)
+        stage["runs"] += 1
+        stage["failures"] += 1
+        stage["consecutive_failures"] += 1
+        stage["last_duration"] = duration
+        stage["last_error"] = f"{type(error).__name__}: {error}"
+        if duration is not None:
+            stage["latency"].observe(duration)
+
+    def abandoned(self, name, duration):
+        """Record a run given up on when the refresh deadline was reached."""
+        stage = self._stage(name)
+        stage["runs"] += 1
+        stage["abandoned"] += 1
+        stage["last_duration"] = duration
+
+    def stats(self):
+        """Return a copy of the statistics of every stage that has run."""
+        return {
+            name: dict(stage, latency=stage["latency"].as_dict())
+            for name, stage in self._stages.items()
+        }
@@ -0,0 +1,104 @@
+"""Adaptive polling interval for presence.getDailyOverview.
+
+A child's presence status only changes around check-in and check-out. The
+expected times come from the daily overview (entryTime, exitTime and the
+actual checkInTime) and, when those are not set, from the first and last
+lesson of the day in the school schedule. Close to one of those times
+presence is polled every FAST_INTERVAL; at night, at weekends and once every
+child is done for the day it is polled only every IDLE_INTERVAL.
+"""
+import datetime
+
+FAST_INTERVAL = datetime.timedelta(seconds=30)
+IDLE_INTERVAL = datetime.timedelta(hours=1)
+# Poll fast from this long before an expected check-in/check-out until this
+# long after it
+FAST_WINDOW = datetime.timedelta(minutes=30)
+# Outside these hours nobody is checked in or out
+DAY_START = datetime.time(6, 0)
+DAY_END = datetime.time(18, 0)
+
+# 1 = SYG, 2 = FERIE/FRI, 8 = HENTET/GÅET: nothing changes for the rest of the day
+DONE_STATUSES = (1, 2, 8)
+# 0 = IKKE KOMMET
+NOT_ARRIVED_STATUSES = (0,)
+
+# Aula's placeholder for "no exit time set"
+NO_EXIT_TIME = "23:59:00"
+
+
+def _time_today(now, value):
+    """Return the "HH:MM:SS" value as an aware datetime today, or None."""
+    if not value or value == NO_EXIT_TIME:
+        return None
+    try:
+        parsed = datetime.datetime.strptime(value, "%H:%M:%S").time()
+    except (TypeError, ValueError):
+        return None
+    return datetime.datetime.combine(now.date(), parsed, now.tzinfo)
+
+
+def expected_changes(now, overview, lesson_bounds=None):
+    """Return the times today a child's presence status is expected to change.
+
+    lesson_bounds is (first lesson start, last lesson end) for today, used when
+    the overview has no entry or exit time.
+    """
+    status = overview.get("status")
+    if status in DONE_STATUSES:
+        return []
+    first_lesson, last_lesson = lesson_bounds or (None, None)
+    times = []
+    if status in NOT_ARRIVED_STATUSES and not overview.get("checkInTime"):
+        times.append(_time_today(now, overview.get("entryTime")) or first_lesson)
+    times.append(_time_today(now, overview.get("exitTime")) or last_lesson)
+    return [time for time in times if time is not None]
+
+
+def presence_poll_interval(now, overviews, lesson_bounds, base_interval):
+    """Return how long to wait before polling presence again.
+
+    Args:
+        now: Current local time (aware).
+        overviews: {child id: daily overview, or None when presence has not
+            been retrieved for the child} for every child.
+        lesson_bounds: {child id: (first lesson start, last lesson end)} today.
+        base_interval: The configured presence interval.
+    """
+    if not overviews or now.weekday() >= 5:
+        return IDLE_INTERVAL
+    if all(overview is None for overview in overviews.values()):
+        # Nothing is known about the day yet, so keep polling as configured
+        return base_interval
+
+    active = False
+    changes = []
+    for childid, overview in overviews.items():
+        if overview is None:
+            # Unknown, so the child may still be checked in or out today
+            active = True
+            continue
+        if overview.get("status") in DONE_STATUSES:
+            continue
+        active = True
+        changes.extend(expected_changes(now, overview, lesson_bounds.get(childid)))
+
+    if not active:
+        # Every child is sick, on holiday or picked up already
+        return IDLE_INTERVAL
+
+    upcoming = []
+    for change in changes:
+        if change - FAST_WINDOW <= now <= change + FAST_WINDOW:
+            return FAST_INTERVAL
+        if change > now:
+            upcoming.append(change - FAST_WINDOW)
+
+    if DAY_START <= now.time() < DAY_END:
+        interval = base_interval
+    else:
+        interval = IDLE_INTERVAL
+    if upcoming:
+        # Wake up in time for the next fast window
+        interval = min(interval, min(upcoming) - now)
+    return max(interval, FAST_INTERVAL)
@@ -0,0 +1,251 @@
+"""Per-host request rate limiting and backoff.
+
+Every request to www.aula.dk, the login hosts and the widget providers takes
+a token from the bucket of its host first, so bursts (birthday paging, the
+api_call service, several accounts refreshing) are spread out instead of
+tripping upstream throttling. When a host answers 429, its bucket is held
+back for the Retry-After time, so the other requests to that host wait too.
+Failed requests are retried with jittered exponential backoff.
+
+The limiter is thread-safe: AulaApi waits for it on the event loop, the
+provider and login sessions (requests, in executor threads) through
+RateLimitedAdapter.
+"""
+import asyncio
+import datetime
+import email.utils
+import logging
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import port_by_scheme
+from urllib3.util.retry import Retry
+
+_LOGGER = logging.getLogger(__name__)
+
+# Sustained requests per second and burst size per host
+DEFAULT_RATE = 5.0
+DEFAULT_BURST = 10
+
+# Retries of a throttled or failed request, and their backoff
+MAX_RETRIES = 3
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 30.0
+
+# Statuses worth retrying. 429 means the request was not processed, so it is
+# retried for every method; the 5xx ones only for idempotent requests.
+THROTTLED_STATUSES = (429,)
+TRANSIENT_STATUSES = (500, 502, 503, 504)
+
+
+def parse_retry_after(value, now=None):
+    """Return the seconds a Retry-After header asks for, or None.
+
+    The header is either a number of seconds or an HTTP date.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when is None:
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=datetime.timezone.utc)
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    return max(0.0, (when - now).total_seconds())
+
+
+def backoff_delay(attempt, retry_after=None, base=BACKOFF_BASE, cap=BACKOFF_MAX):
+    """Return how long to wait before retry number attempt (0 based).
+
+    Retry-After wins when the server sent one; otherwise the delay doubles
+    with every attempt, with +-50% jitter so clients do not retry in step.
+    """
+    if retry_after is not None:
+        return min(cap, retry_after)
+    return min(cap, base * 2**attempt * (0.5 + random.random()))
+
+
+class TokenBucket:
+    """A token bucket refilled at rate tokens per second, holding at most burst."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = None
+        # Nothing is handed out before this time (see hold)
+        self._held_until = 0.0
+
+    def reserve(self, now):
+        """Take a token and return how many seconds to wait before using it."""
+        if self._updated is not None:
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._updated) * self.rate
+            )
+        self._updated = now
+        self._tokens -= 1
+        delay = 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+        return max(delay, self._held_until - now)
+
+    def hold(self, until):
+        """Hand out no tokens before until (e.g. after a 429 with Retry-After)."""
+        self._held_until = max(self._held_until, until)
+
+
+class RateLimiter:
+    """A token bucket per host, with statistics on the time spent waiting."""
+
+    def __init__(self, rate=DEFAULT_RATE, burst=DEFAULT_BURST):
+        self._rate = rate
+        self._burst = burst
+        self._buckets = {}
+        self._lock = threading.Lock()
+        # {host: {"requests", "waits", "wait_time", "throttled"}}
+        self._stats = {}
+
+    def _host_stats(self, host):
+        return self._stats.setdefault(
+            host, {"requests": 0, "waits": 0, "wait_time": 0.0, "throttled": 0}
+        )
+
+    def reserve(self, host, now=None):
+        """Take a token for host and return the seconds to wait before sending."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = self._buckets[host] = TokenBucket(self._rate, self._burst)
+            delay = bucket.reserve(now)
+            stats = self._host_stats(host)
+            stats["requests"] += 1
+            if delay > 0:
+                stats["waits"] += 1
+                stats["wait_time"] += delay
+        if delay > 1:
+            _LOGGER.debug(f"Rate limiting {host}: waiting {delay:.1f}s")
+        return delay
+
+    def throttle(self, host, seconds):
+        """Hold all requests to host back for seconds (the host answered 429)."""
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = self._buckets[host] = TokenBucket(self._rate, self._burst)
+            bucket.hold(time.monotonic() + seconds)
+            self._host_stats(host)["throttled"] += 1
+        _LOGGER.debug(f"{host} is throttling us, holding requests for {seconds:.1f}s")
+
+    def acquire(self, host):
+        """Wait (blocking) until a request to host may be sent."""
+        delay = self.reserve(host)
+        if delay > 0:
+            time.sleep(delay)
+
+    async def async_acquire(self, host):
+        """Wait until a request to host may be sent."""
+        delay = self.reserve(host)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def stats(self):
+        """Return a copy of the per-host request and wait statistics."""
+        with self._lock:
+            return {host: dict(stats) for host, stats in self._stats.items()}
+
+
+def _pool_host(pool):
+    # The host of a urllib3 connection pool as the netloc of the request URLs
+    # sent through it, which is what the limiter's buckets are keyed by
+    if pool.port is None or pool.port == port_by_scheme.get(pool.scheme):
+        return pool.host
+    return f"{pool.host}:{pool.port}"
+
+
+class JitteredRetry(Retry):
+    """urllib3 Retry whose exponential backoff is jittered by +-50%.
+
+    urllib3 retries inside a single RateLimitedAdapter.send, so a copy bound
+    to a limiter (see bind) takes a token from the bucket of the host before
+    every retry attempt, after the backoff.
+    """
+
+    def __init__(self, *args, limiter=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.limiter = limiter
+        self._host = None
+
+    def new(self, **kw):
+        retry = super().new(**kw)
+        retry.limiter = self.limiter
+        retry._host = self._host
+        return retry
+
+    def bind(self, limiter):
+        """Return a copy whose retry attempts wait for limiter."""
+        retry = self.new()
+        retry.limiter = limiter
+        return retry
+
+    def increment(self, *args, _pool=None, **kwargs):
+        retry = super().increment(*args, _pool=_pool, **kwargs)
+        if _pool is not None:
+            retry._host = _pool_host(_pool)
+        return retry
+
+    def sleep(self, response=None):
+        super().sleep(response)
+        if self.limiter is not None and self._host is not None:
+            self.limiter.acquire(self._host)
+
+    def get_backoff_time(self):
+        backoff = super().get_backoff_time()
+        return backoff * (0.5 + random.random()) if backoff > 0 else backoff
+
+
+class RateLimitedAdapter(HTTPAdapter):
+    """HTTPAdapter that takes a token from the limiter before every request.
+
+    With a JitteredRetry as max_retries, every retry attempt takes a token
+    too. A 429 answer that got through the retries holds the host back for its
+    Retry-After time. With metrics (a metrics.RequestMetrics), the latency,
+    size and status of every request are recorded.
+    """
+
+    def __init__(self, limiter, metrics=None, **kwargs):
+        self._limiter = limiter
+        self._metrics = metrics
+        super().__init__(**kwargs)
+        if isinstance(self.max_retries, JitteredRetry):
+            self.max_retries = self.max_retries.bind(limiter)
+
+    def send(self, request, **kwargs):
+        host = urlsplit(request.url).netloc
+        self._limiter.acquire(host)
+        started = time.monotonic()
+        try:
+            response = super().send(request, **kwargs)
+            # Read the body here, as the session would right after, so the
+            # latency includes the download and its size is known
+            size = 0 if kwargs.get("stream") else len(response.content or b"")
+        except Exception:
+            if self._metrics is not None:
+                self._metrics.record(host, time.monotonic() - started)
+            raise
+        if self._metrics is not None:
+            self._metrics.record(
+                host, time.monotonic() - started, size, response.status_code
+            )
+        if response.status_code in THROTTLED_STATUSES:
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            self._limiter.throttle(host, backoff_delay(0, retry_after))
+        return response
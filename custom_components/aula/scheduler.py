@@ -0,0 +1,151 @@
+"""Coordination between the clients of several config entries.
+
+Households with more than one guardian often add one config entry per
+guardian. All their clients share one AulaScheduler, which
+
+- spaces the refreshes of a data source out across entries, so the
+  coordinators of several entries do not all fire at the same moment,
+- holds the pooled provider sessions (Aula calls already share Home
+  Assistant's connection pool), the per-host rate limiter and the request
+  metrics,
+- caps the number of requests in flight across all entries, and
+- lets identical read-only Aula requests share one response, e.g. the
+  presence of a child both guardians see: a request identical to one in
+  flight waits for its response, and one sent shortly after by another
+  entry reuses it.
+"""
+import asyncio
+import logging
+import time
+
+from .metrics import RequestMetrics
+from .provider_sessions import ProviderSessions
+from .rate_limit import RateLimiter
+
+_LOGGER = logging.getLogger(__name__)
+
+# Requests in flight at once, across all entries
+GLOBAL_MAX_CONCURRENCY = 8
+
+# Seconds between the refreshes of the same source by different entries
+STAGGER_SPACING = 10
+
+# Seconds a successful response is reused for identical requests. Longer
+# than STAGGER_SPACING, so staggered refreshes of several entries still
+# share it.
+SHARE_MAX_AGE = 20
+
+
+class RequestDeduper:
+    """Share the response of identical requests sent close together."""
+
+    def __init__(self, max_age=SHARE_MAX_AGE):
+        self._max_age = max_age
+        self._in_flight = {}
+        # {key: (monotonic time received, owner, response)}
+        self._recent = {}
+        # Requests sent, and requests answered with another one's response
+        self.sent = 0
+        self.shared = 0
+
+    async def run(self, key, request, owner=None):
+        """Return await request(), or the response of an identical request.
+
+        The response of an identical request in flight is shared with any
+        caller; a recent one only with other owners (clients), so a client
+        refreshing again always gets fresh data. A shared response is only
+        used if it succeeded (HTTP 200); otherwise the caller sends its own
+        request, so e.g. a 401 for one guardian does not end up at another.
+        """
+        now = time.monotonic()
+        recent = self._recent.get(key)
+        if recent is not None and recent[1] is not owner and now - recent[0] < self._max_age:
+            self.shared += 1
+            return recent[2]
+
+        future = self._in_flight.get(key)
+        if future is not None:
+            try:
+                response = await asyncio.shield(future)
+            except Exception:
+                response = None
+            if response is not None and response.status_code == 200:
+                self.shared += 1
+                return response
+            self.sent += 1
+            return await request()
+
+        self.sent += 1
+        future = asyncio.ensure_future(request())
+        # Retrieve the exception even if every caller was cancelled
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._in_flight[key] = future
+        try:
+            response = await asyncio.shield(future)
+        finally:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+        if response.status_code == 200:
+            self._remember(key, owner, response)
+        return response
+
+    def _remember(self, key, owner, response):
+        now = time.monotonic()
+        self._recent = {
+            other: recent
+            for other, recent in self._recent.items()
+            if now - recent[0] < self._max_age
+        }
+        self._recent[key] = (now, owner, response)
+
+
+class AulaScheduler:
+    """State shared by the clients of all config entries."""
+
+    def __init__(
+        self,
+        max_concurrency=GLOBAL_MAX_CONCURRENCY,
+        stagger_spacing=STAGGER_SPACING,
+    ):
+        self.rate_limiter = RateLimiter()
+        self.metrics = RequestMetrics()
+        self.provider_sessions = ProviderSessions(
+            max_concurrency, self.rate_limiter, self.metrics
+        )
+        self.request_slots = asyncio.Semaphore(max(1, max_concurrency))
+        self.deduper = RequestDeduper()
+        self._stagger_spacing = stagger_spacing
+        # {source: (entry id, monotonic time its refresh started)}
+        self._last_start = {}
+        self._entries = set()
+
+    def register(self, entry_id):
+        self._entries.add(entry_id)
+
+    def unregister(self, entry_id):
+        """Forget an entry. Returns True when no entries are left."""
+        self._entries.discard(entry_id)
+        return not self._entries
+
+    def stagger_delay(self, source, entry_id, now):
+        """Return how long entry_id should wait before refreshing source.
+
+        Only a refresh of the same source by another entry causes a wait;
+        an entry is never held back by itself.
+        """
+        last = self._last_start.get(source)
+        if last is None or last[0] == entry_id:
+            return 0
+        return max(0, last[1] + self._stagger_spacing - now)
+
+    async def async_wait_turn(self, source, entry_id):
+        """Wait until entry_id may refresh source, then claim the slot."""
+        delay = self.stagger_delay(source, entry_id, time.monotonic())
+        # Claim the slot before sleeping, so the next entry queues behind us
+        self._last_start[source] = (entry_id, time.monotonic() + delay)
+        if delay > 0:
+            _LOGGER.debug(f"Delaying {source} refresh of {entry_id} by {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+    def close(self):
+        self.provider_sessions.close()
@@ -1,8 +1,11 @@
 from .const import DOMAIN
 import logging
+import re
 from datetime import datetime, timedelta
-from homeassistant.helpers.entity import Entity
-from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
+from types import MappingProxyType
+from homeassistant.helpers.entity import Entity, EntityCategory
+from homeassistant.components.sensor import SensorEntity, SensorStateClass
+from homeassistant.core import callback
 from homeassistant import config_entries, core
 from homeassistant.helpers import entity_platform
 
@@ -13,6 +16,7 @@ from homeassistant.core import (
     ServiceResponse,
     SupportsResponse,
 )
+from homeassistant.exceptions import HomeAssistantError
 import homeassistant.helpers.config_validation as cv
 
 _LOGGER = logging.getLogger(__name__)
@@ -27,18 +31,106 @@ from .const import (
     AUTH_METHOD_APP,
     CONF_MITID_IDENTITY,
     DOMAIN,
+    SOURCE_PRESENCE,
+    SOURCE_MU_OPGAVER,
+    SOURCE_UGEPLAN,
+    STAGES,
+    STAGE_PREPARE,
 )
+from .fingerprint import state_digest
+
+# Before several entries were supported a child's sensor was "aula<child id>"
+LEGACY_CHILD_UNIQUE_ID = re.compile(r"aula(\d+)")
+
+
+def child_unique_id(entry_id, childid):
+    """Return the unique id of a child's sensor in a config entry."""
+    return f"aula{childid}_{entry_id}"
+
 
 API_CALL_SERVICE_NAME = "api_call"
 API_CALL_SCHEMA = vol.Schema(
     {
         vol.Required("uri"): cv.string,
         vol.Optional("post_data"): cv.string,
+        vol.Optional("config_entry_id"): cv.string,
     }
 )
 
 PARALLEL_UPDATES = 1
 
+# presence.getDailyOverview status codes
+PRESENCE_STATES = [
+    "Ikke kommet",
+    "Syg",
+    "Ferie/Fri",
+    "Kommet/Til stede",
+    "På tur",
+    "Sover",
+    "6",
+    "7",
+    "Gået",
+    "9",
+    "10",
+    "11",
+    "12",
+    "13",
+    "14",
+    "15",
+]
+
+# Daily overview fields exposed as attributes, times shortened to HH:MM
+PRESENCE_FIELDS = [
+    "location",
+    "sleepIntervals",
+    "checkInTime",
+    "checkOutTime",
+    "activityType",
+    "entryTime",
+    "exitTime",
+    "exitWith",
+    "comment",
+    "spareTimeActivity",
+    "selfDeciderStartTime",
+    "selfDeciderEndTime",
+]
+
+
+def presence_attributes(daily_info):
+    """Return the sensor attributes taken from a child's daily overview."""
+    attributes = {}
+    for attribute in PRESENCE_FIELDS:
+        if attribute == "exitTime" and daily_info[attribute] == "23:59:00":
+            attributes[attribute] = None
+        else:
+            try:
+                attributes[attribute] = datetime.strptime(
+                    daily_info[attribute], "%H:%M:%S"
+                ).strftime("%H:%M")
+            except:
+                attributes[attribute] = daily_info[attribute]
+    try:
+        attributes["profilePicture"] = daily_info["institutionProfile"][
+            "profilePicture"
+        ]["url"]
+    except:
+        attributes["profilePicture"] = None
+    attributes["institutionProfileId"] = daily_info["institutionProfile"]["id"]
+    return attributes
+
+
+def _service_client(hass, entry_id=None):
+    """Return the client of entry_id, or of the first loaded entry if not given."""
+    if entry_id is not None:
+        entry_data = hass.data.get(DOMAIN, {}).get(entry_id)
+        if not isinstance(entry_data, dict) or "client" not in entry_data:
+            raise HomeAssistantError(f"No loaded Aula config entry with id {entry_id}")
+        return entry_data["client"]
+    for entry_data in hass.data.get(DOMAIN, {}).values():
+        if isinstance(entry_data, dict) and "client" in entry_data:
+            return entry_data["client"]
+    raise HomeAssistantError("No Aula config entry is loaded")
+
 
 async def async_setup_entry(
     hass: core.HomeAssistant,
@@ -58,27 +150,22 @@ async def async_setup_entry(
     mitid_identity = config.get(CONF_MITID_IDENTITY, 1)
     stored_tokens = config.get("stored_tokens")
 
-    client = hass.data[DOMAIN]["client"]
-
-    async def async_update_data():
-        await hass.async_add_executor_job(client.update_data)
+    client = config["client"]
 
-    coordinator = DataUpdateCoordinator(
-        hass,
-        _LOGGER,
-        name="sensor",
-        update_method=async_update_data,
-        update_interval=timedelta(minutes=5),
-    )
-
-    # Immediate refresh
-    await coordinator.async_request_refresh()
+    # The sensors render presence plus the enabled weekly plan sources, and
+    # only listen to those coordinators.
+    sources = [SOURCE_PRESENCE]
+    if config.get(CONF_MU_OPGAVER, True):
+        sources.append(SOURCE_MU_OPGAVER)
+    if config[CONF_UGEPLAN]:
+        sources.append(SOURCE_UGEPLAN)
+    coordinators = [config["coordinators"][source] for source in sources]
 
     entities = []
     # Ensure data is updated before creating entities
-    # (coordinator refresh above handles this, but we need data for entity creation loop)
+    # (async_setup_entry fetched everything, but we need data for entity creation loop)
     if not client.presence:
-        await hass.async_add_executor_job(client.update_data)
+        await client.async_update_data()
 
     for i, child in enumerate(client._children):
         # _LOGGER.debug("Presence data for child "+str(child["id"])+" : "+str(client.presence[str(child["id"])]))
@@ -89,32 +176,32 @@ async def async_setup_entry(
                     + str(child["id"])
                     + " adding sensor entity."
                 )
-                entities.append(AulaSensor(hass, coordinator, child))
+                entities.append(
+                    AulaSensor(hass, client, coordinators, child, config_entry.entry_id)
+                )
         else:
-            entities.append(AulaSensor(hass, coordinator, child))
+            entities.append(
+                AulaSensor(hass, client, coordinators, child, config_entry.entry_id)
+            )
     # We have data and can now set up the calendar platform:
     if config[CONF_SCHOOLSCHEDULE]:
         hass.async_create_task(
             hass.config_entries.async_forward_entry_setups(config_entry, ["calendar"])
         )
 
-    global ugeplan
-    global mu_opgaver
-    if config[CONF_UGEPLAN]:
-        ugeplan = True
-    else:
-        ugeplan = False
-    if config.get(CONF_MU_OPGAVER, True):
-        mu_opgaver = True
-    else:
-        mu_opgaver = False
+    entities.extend(
+        refresh_sensors(client, hass.data[DOMAIN]["scheduler"], config_entry.entry_id)
+    )
     async_add_entities(entities, update_before_add=True)
 
-    def custom_api_call_service(call: ServiceCall) -> ServiceResponse:
+    async def custom_api_call_service(call: ServiceCall) -> ServiceResponse:
+        client = _service_client(hass, call.data.get("config_entry_id"))
         if "post_data" in call.data and len(call.data["post_data"]) > 0:
-            data = client.custom_api_call(call.data["uri"], call.data["post_data"])
+            data = await client.async_custom_api_call(
+                call.data["uri"], call.data["post_data"]
+            )
         else:
-            data = client.custom_api_call(call.data["uri"], 0)
+            data = await client.async_custom_api_call(call.data["uri"], 0)
         return data
 
     hass.services.async_register(
@@ -127,11 +214,18 @@ async def async_setup_entry(
 
 
 class AulaSensor(Entity):
-    def __init__(self, hass, coordinator, child) -> None:
+    def __init__(self, hass, client, coordinators, child, entry_id) -> None:
         self._hass = hass
-        self._coordinator = coordinator
+        self._entry_id = entry_id
+        # The first coordinator is the presence one, which decides availability
+        self._coordinators = coordinators
         self._child = child
-        self._client = hass.data[DOMAIN]["client"]
+        self._client = client
+        self._first_name = child["name"].split()[0]
+        # (state, attributes), see _build_snapshot
+        self._snapshot = None
+        # Digest of the state last written, see _handle_coordinator_update
+        self._written_digest = None
 
     @property
     def name(self):
@@ -150,117 +244,71 @@ class AulaSensor(Entity):
         5 = SOVER
         8 = HENTET/GÅET
         """
-        if self._client.presence[str(self._child["id"])] == 1:
-            states = [
-                "Ikke kommet",
-                "Syg",
-                "Ferie/Fri",
-                "Kommet/Til stede",
-                "På tur",
-                "Sover",
-                "6",
-                "7",
-                "Gået",
-                "9",
-                "10",
-                "11",
-                "12",
-                "13",
-                "14",
-                "15",
-            ]
-            daily_info = self._client._daily_overview[str(self._child["id"])]
-            return states[daily_info["status"]]
-        else:
-            _LOGGER.debug("Setting state to n/a for child " + str(self._child["id"]))
-            return "n/a"
+        return self._get_snapshot()[0]
 
     @property
     def extra_state_attributes(self):
-        if self._client.presence[str(self._child["id"])] == 1:
-            daily_info = self._client._daily_overview[str(self._child["id"])]
-            try:
-                profilePicture = daily_info["institutionProfile"]["profilePicture"][
-                    "url"
-                ]
-            except:
-                profilePicture = None
-
-        fields = [
-            "location",
-            "sleepIntervals",
-            "checkInTime",
-            "checkOutTime",
-            "activityType",
-            "entryTime",
-            "exitTime",
-            "exitWith",
-            "comment",
-            "spareTimeActivity",
-            "selfDeciderStartTime",
-            "selfDeciderEndTime",
-        ]
+        return self._get_snapshot()[1]
+
+    def _get_snapshot(self):
+        if self._snapshot is None:
+            self._snapshot = self._build_snapshot()
+        return self._snapshot
+
+    def _build_snapshot(self):
+        """Return (state, attributes) from the client's current data.
+
+        Built once per coordinator update rather than on every read of state
+        or extra_state_attributes. The attributes are read-only.
+        """
+        childid = str(self._child["id"])
+        daily_info = None
+        if self._client.presence[childid] == 1:
+            daily_info = self._client._daily_overview[childid]
+            state = PRESENCE_STATES[daily_info["status"]]
+        else:
+            _LOGGER.debug("Setting state to n/a for child " + childid)
+            state = "n/a"
+
         attributes = {}
         # _LOGGER.debug("Dump of ugep_attr: "+str(self._client.ugep_attr))
         # _LOGGER.debug("Dump of ugepnext_attr: "+str(self._client.ugepnext_attr))
-        if mu_opgaver:
-            #
-            try:
-                attributes["mu_opgaver"] = self._client.mu_opgaver_attr[
-                    self._child["name"].split()[0]
-                ]
-            except:
-                attributes["mu_opgaver"] = "Min Uddannelse Opgaver not available"
-            try:
+        first_name = self._first_name
+        if self._client._mu_opgaver:
+            attributes["mu_opgaver"] = self._client.mu_opgaver_attr.get(
+                first_name, "Min Uddannelse Opgaver not available"
+            )
+            if first_name in self._client.mu_opgaver_next_attr:
                 attributes["mu_opgaver_next"] = self._client.mu_opgaver_next_attr[
-                    self._child["name"].split()[0]
+                    first_name
                 ]
-            except:
+            else:
                 attributes["mu_opgaver_next"] = "Not available"
                 _LOGGER.debug(
                     "Could not get Min Uddannelse Opgaver for next week for child "
-                    + str(self._child["name"].split()[0])
+                    + first_name
                     + ". Perhaps not available yet."
                 )
-        if ugeplan:
+        if self._client._ugeplan:
             if "0062" in self._client.widgets:
-                try:
-                    attributes["huskelisten"] = self._client.huskeliste[
-                        self._child["name"].split()[0]
-                    ]
-                except:
-                    attributes["huskelisten"] = "Not available"
-            try:
-                attributes["ugeplan"] = self._client.ugep_attr[
-                    self._child["name"].split()[0]
-                ]
-            except:
-                attributes["ugeplan"] = "Not available"
-            try:
-                attributes["ugeplan_next"] = self._client.ugepnext_attr[
-                    self._child["name"].split()[0]
-                ]
-            except:
+                attributes["huskelisten"] = self._client.huskeliste.get(
+                    first_name, "Not available"
+                )
+            attributes["ugeplan"] = self._client.ugep_attr.get(
+                first_name, "Not available"
+            )
+            if first_name in self._client.ugepnext_attr:
+                attributes["ugeplan_next"] = self._client.ugepnext_attr[first_name]
+            else:
                 attributes["ugeplan_next"] = "Not available"
                 _LOGGER.debug(
                     "Could not get ugeplan for next week for child "
-                    + str(self._child["name"].split()[0])
+                    + first_name
                     + ". Perhaps not available yet."
                 )
-        if self._client.presence[str(self._child["id"])] == 1:
-            for attribute in fields:
-                if attribute == "exitTime" and daily_info[attribute] == "23:59:00":
-                    attributes[attribute] = None
-                else:
-                    try:
-                        attributes[attribute] = datetime.strptime(
-                            daily_info[attribute], "%H:%M:%S"
-                        ).strftime("%H:%M")
-                    except:
-                        attributes[attribute] = daily_info[attribute]
-            attributes["profilePicture"] = profilePicture
-            attributes["institutionProfileId"] = daily_info["institutionProfile"]["id"]
-        return attributes
+        if daily_info is not None:
+            attributes.update(presence_attributes(daily_info))
+        return state, MappingProxyType(attributes)
 
     @property
     def should_poll(self):
@@ -270,11 +318,11 @@ class AulaSensor(Entity):
     @property
     def available(self):
         """Return if entity is available."""
-        return self._coordinator.last_update_success
+        return self._coordinators[0].last_update_success
 
     @property
     def unique_id(self):
-        unique_id = "aula" + str(self._child["id"])
+        unique_id = child_unique_id(self._entry_id, self._child["id"])
         _LOGGER.debug("Unique ID for child " + str(self._child["id"]) + " " + unique_id)
         return unique_id
 
@@ -284,10 +332,113 @@ class AulaSensor(Entity):
 
     async def async_update(self):
         """Update the entity. Only used by the generic entity update service."""
-        await self._coordinator.async_request_refresh()
+        for coordinator in self._coordinators:
+            await coordinator.async_request_refresh()
 
     async def async_added_to_hass(self):
         """When entity is added to hass."""
-        self.async_on_remove(
-            self._coordinator.async_add_listener(self.async_write_ha_state)
-        )
+        for coordinator in self._coordinators:
+            self.async_on_remove(
+                coordinator.async_add_listener(self._handle_coordinator_update)
+            )
+
+    @callback
+    def _handle_coordinator_update(self):
+        """Write the state, unless it is the same as the last one written.
+
+        The weekly plan attributes are several kilobytes of HTML, so writing
+        them again unchanged would only grow the recorder database.
+        """
+        self._snapshot = self._build_snapshot()
+        state, attributes = self._snapshot
+        digest = state_digest(state, dict(attributes), self.available)
+        if digest == self._written_digest:
+            return
+        self._written_digest = digest
+        self.async_write_ha_state()
+
+
+def refresh_sensors(client, scheduler, entry_id):
+    """Return the sensors showing the cost of refreshing (disabled by default)."""
+    sensors = [
+        AulaStageSensor(client, entry_id, stage)
+        for stage in (STAGE_PREPARE,) + STAGES
+    ]
+    sensors.append(AulaRequestsSensor(scheduler, entry_id))
+    sensors.append(AulaCacheSensor(client, entry_id))
+    return sensors
+
+
+class AulaRefreshSensor(SensorEntity):
+    """Base of the refresh sensors. Polled, as they read in-memory statistics."""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+    _attr_state_class = SensorStateClass.MEASUREMENT
+
+
+class AulaStageSensor(AulaRefreshSensor):
+    """Seconds the last run of a refresh stage took, with its statistics."""
+
+    _attr_native_unit_of_measurement = "s"
+    _attr_icon = "mdi:timer-outline"
+
+    def __init__(self, client, entry_id, stage):
+        self._client = client
+        self._stage = stage
+        self._attr_name = "Aula refresh " + stage.replace("_", " ")
+        self._attr_unique_id = f"aula_refresh_{stage}_{entry_id}"
+
+    async def async_update(self):
+        stats = self._client.stage_health.stats().get(self._stage)
+        if stats is None:
+            self._attr_native_value = None
+            self._attr_extra_state_attributes = {}
+            return
+        duration = stats.pop("last_duration")
+        self._attr_native_value = None if duration is None else round(duration, 3)
+        self._attr_extra_state_attributes = stats
+
+
+class AulaRequestsSensor(AulaRefreshSensor):
+    """Requests sent by all Aula config entries, with statistics per host."""
+
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+    _attr_icon = "mdi:swap-vertical"
+
+    def __init__(self, scheduler, entry_id):
+        self._scheduler = scheduler
+        self._attr_name = "Aula requests"
+        self._attr_unique_id = f"aula_requests_{entry_id}"
+
+    async def async_update(self):
+        hosts = self._scheduler.metrics.stats()
+        self._attr_native_value = sum(host["requests"] for host in hosts.values())
+        self._attr_extra_state_attributes = {
+            name: {
+                "requests": host["requests"],
+                "errors": host["errors"],
+                "bytes": host["bytes"],
+                "mean_latency": host["latency"]["mean"],
+                "max_latency": host["latency"]["max"],
+            }
+            for name, host in hosts.items()
+        }
+
+
+class AulaCacheSensor(AulaRefreshSensor):
+    """Share of responses that were unchanged, so not parsed again."""
+
+    _attr_native_unit_of_measurement = "%"
+    _attr_icon = "mdi:cached"
+
+    def __init__(self, client, entry_id):
+        self._client = client
+        self._attr_name = "Aula response cache hit ratio"
+        self._attr_unique_id = f"aula_response_cache_{entry_id}"
+
+    async def async_update(self):
+        stats = self._client.response_cache.stats()
+        ratio = stats.pop("hit_ratio")
+        self._attr_native_value = None if ratio is None else round(ratio * 100, 1)
+        self._attr_extra_state_attributes = stats
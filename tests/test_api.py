@@ -0,0 +1,181 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from custom_components.aula import api as api_module
+from custom_components.aula.api import USER_AGENT, AulaApi, iter_json_items
+from custom_components.aula.const import API, API_VERSION
+from custom_components.aula.fingerprint import body_digest
+from custom_components.aula.scheduler import RequestDeduper
+
+
+class FakeStream:
+    """The body of a fake aiohttp response, handed out in chunks."""
+
+    def __init__(self, body):
+        self._body = body
+
+    async def iter_chunked(self, size):
+        for start in range(0, len(self._body), size):
+            yield self._body[start : start + size]
+
+
+class FakeResponse:
+    def __init__(self, status, text):
+        self.status = status
+        self.headers = {"ETag": '"v1"'}
+        self.content = FakeStream(text.encode())
+
+    def get_encoding(self):
+        return "utf-8"
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class RecordingSession:
+    """Records every request and answers them all with one status and body."""
+
+    def __init__(self, status=200, text='{"status": {"message": "OK"}}', csrf=None):
+        self.requests = []
+        self._status = status
+        self._text = text
+        self.cookie_jar = []
+        if csrf is not None:
+            self.cookie_jar.append(SimpleNamespace(key="Csrfp-Token", value=csrf))
+
+    def request(self, method, url, **kwargs):
+        self.requests.append(dict(kwargs, method=method, url=url))
+        return FakeResponse(self._status, self._text)
+
+
+def test_get__sends_method_params_and_access_token():
+    session = RecordingSession()
+    api = AulaApi(session, lambda: "token123")
+    response = asyncio.run(
+        api.get_daily_overview([1, 2], headers={"If-None-Match": '"v0"'})
+    )
+    assert response.status_code == 200
+    assert response.json() == {"status": {"message": "OK"}}
+    assert response.headers["ETag"] == '"v1"'
+    (request,) = session.requests
+    assert request["method"] == "GET"
+    assert request["url"] == API + API_VERSION
+    assert request["params"] == [
+        ("method", "presence.getDailyOverview"),
+        ("childIds[]", "1"),
+        ("childIds[]", "2"),
+        ("access_token", "token123"),
+    ]
+    assert request["headers"] == {"User-Agent": USER_AGENT, "If-None-Match": '"v0"'}
+
+
+def test_request__reads_the_body_in_chunks(monkeypatch):
+    # Chunks of 7 bytes split the two-byte characters
+    monkeypatch.setattr(api_module, "READ_CHUNK_SIZE", 7)
+    text = json.dumps({"data": ["Frøken Ærlig på tur"] * 100}, ensure_ascii=False)
+    api = AulaApi(RecordingSession(text=text), lambda: "token123")
+    response = asyncio.run(api.get_threads())
+    assert response.text == text
+    assert response.digest == body_digest(text) == body_digest(text.encode())
+
+
+def test_get__without_access_token():
+    session = RecordingSession()
+    asyncio.run(AulaApi(session, lambda: None).get_profiles_by_login())
+    assert session.requests[0]["params"] == [("method", "profiles.getProfilesByLogin")]
+
+
+def test_post__sends_json_with_csrf_token():
+    session = RecordingSession(csrf="csrf456")
+    api = AulaApi(session, lambda: "token123")
+    asyncio.run(
+        api.get_events_by_profile_ids_and_resource_ids([1], "2025-02-17", "2025-02-24")
+    )
+    (request,) = session.requests
+    assert request["method"] == "POST"
+    assert request["params"] == [
+        ("method", "calendar.getEventsByProfileIdsAndResourceIds"),
+        ("access_token", "token123"),
+    ]
+    assert json.loads(request["data"]) == {
+        "instProfileIds": [1],
+        "resourceIds": [],
+        "start": "2025-02-17",
+        "end": "2025-02-24",
+    }
+    assert request["headers"] == {
+        "User-Agent": USER_AGENT,
+        "content-type": "application/json",
+        "csrfp-token": "csrf456",
+    }
+
+
+def test_request__reports_auth_failures():
+    failures = []
+    session = RecordingSession(status=403, text="{}")
+    api = AulaApi(session, lambda: "expired", on_auth_failure=lambda: failures.append(1))
+    response = asyncio.run(api.get_threads())
+    assert response.status_code == 403
+    assert failures == [1]
+
+
+def test_deduper__shares_presence_but_not_calendar_between_guardians():
+    session = RecordingSession(text='{"data": []}')
+    deduper = RequestDeduper(max_age=60)
+    guardian_a = AulaApi(session, lambda: "token-a", deduper=deduper)
+    guardian_b = AulaApi(session, lambda: "token-b", deduper=deduper)
+
+    async def main():
+        for api in (guardian_a, guardian_b):
+            await api.get_daily_overview([1])
+            await api.get_events_by_profile_ids_and_resource_ids([1], "s", "e")
+
+    asyncio.run(main())
+    sent = [(request["method"], request["params"][0][1]) for request in session.requests]
+    assert sent == [
+        ("GET", "presence.getDailyOverview"),
+        ("POST", "calendar.getEventsByProfileIdsAndResourceIds"),
+        ("POST", "calendar.getEventsByProfileIdsAndResourceIds"),
+    ]
+
+
+def test_iter_json_items__yields_array_items_in_order():
+    text = json.dumps({"status": {"message": "OK"}, "data": [{"id": 1}, [2], "three", None]})
+    assert list(iter_json_items(text)) == [{"id": 1}, [2], "three", None]
+
+
+def test_iter_json_items__matches_json_loads_with_whitespace_and_key_order():
+    data = [{"id": i, "title": "Dansk æøå", "nested": {"a": [1, 2]}} for i in range(5)]
+    text = json.dumps({"data": data, "status": {"message": "OK"}}, indent=4)
+    assert list(iter_json_items(text)) == json.loads(text)["data"]
+    assert list(iter_json_items(' { "data" : [ ] } ')) == []
+
+
+def test_iter_json_items__is_lazy():
+    # The item after the first is malformed, but is not decoded until asked for
+    items = iter_json_items('{"data": [{"id": 1}, {"id": }]}')
+    assert next(items) == {"id": 1}
+    with pytest.raises(ValueError):
+        next(items)
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "",
+        "[]",
+        '{"status": {"message": "OK"}}',
+        '{"data": null}',
+        '{"data": {"id": 1}}',
+        '{"data": [{"id": 1} {"id": 2}]}',
+    ],
+)
+def test_iter_json_items__rejects_responses_without_data_array(text):
+    with pytest.raises(ValueError):
+        list(iter_json_items(text))
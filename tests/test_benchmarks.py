@@ -0,0 +1,54 @@
+import datetime
+
+import pytest
+
+from benchmarks import bench_calendar
+from benchmarks.bench_refresh import run_household
+from benchmarks.stub_server import LESSONS_PER_DAY, Household
+
+
+def test_household__calendar_scales_with_children_and_weekdays():
+    household = Household(3)
+    # Monday to the Monday after: five school days
+    events = household.calendar_events(
+        [child["id"] for child in household.children],
+        datetime.date(2025, 2, 17),
+        datetime.date(2025, 2, 24),
+    )["data"]
+    assert len(events) == 3 * 5 * LESSONS_PER_DAY
+    assert {event["belongsToProfiles"][0] for event in events} == {1001, 1002, 1003}
+
+
+# Starts the stub server in a child process and waits for the rate limiter
+# to refill between the refreshes
+@pytest.mark.slow
+def test_run_household__refreshes_every_stage_against_the_stub():
+    result = run_household(2, latency=0)
+    for refresh in (result["cold"], result["warm"]):
+        assert refresh["failed_stages"] == []
+        assert refresh["requests_by_upstream"]["meebook"] > 0
+    # Widget tokens and the profile context are reused by the warm refresh
+    assert result["warm"]["requests"] < result["cold"]["requests"]
+
+
+def test_school_year__mixes_substitutes_and_unknown_subjects():
+    child_ids, lessons = bench_calendar.school_year(2, weeks=1)
+    assert child_ids == [1001, 1002]
+    assert len(lessons) == 2 * 5 * LESSONS_PER_DAY
+    assert sum(lesson["title"] == bench_calendar.UNKNOWN_SUBJECT for lesson in lessons) == 12
+    assert any(
+        participant["participantRole"] == "substituteTeacher"
+        for lesson in lessons
+        for participant in lesson["lesson"]["participants"]
+    )
+
+
+def test_calendar_run_household__measures_every_hot_path():
+    result = bench_calendar.run_household(
+        1, weeks=bench_calendar.MIN_WEEKS, contacts=30, repeat=1
+    )
+    assert result["decode"]["lessons"] == bench_calendar.MIN_WEEKS * 5 * LESSONS_PER_DAY
+    assert result["parse"]["lessons"] == result["decode"]["lessons"]
+    assert result["query"]["day"]["events"] == LESSONS_PER_DAY
+    assert result["query"]["week"]["events"] == 5 * LESSONS_PER_DAY
+    assert result["birthdays"]["year"]["events"] == 30
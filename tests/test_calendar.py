@@ -1,8 +1,13 @@
 import os
 import pytest
 import json
+from datetime import datetime, timedelta, timezone
+
+from homeassistant.components.calendar import CalendarEvent
 
 from custom_components.aula.calendar import (
+    EventIndex,
+    LessonParseCache,
     parseCalendarLesson,
 )
 from custom_components.aula.const import (
@@ -86,3 +91,68 @@ def test_parse__emoji_applies_to_substitute_teacher(sample__substitute_with_loca
     sample__substitute_with_location["title"] = "Matematik"
     event = parseCalendarLesson(sample__substitute_with_location, show_emoji=True)
     assert event.summary == "🔢 Matematik, VIKAR: Test Substitute"
+
+
+def _event(start_hour, end_hour, summary=""):
+    day = datetime(2025, 2, 17, tzinfo=timezone.utc)
+    return CalendarEvent(
+        summary=summary,
+        start=day + timedelta(hours=start_hour),
+        end=day + timedelta(hours=end_hour),
+    )
+
+
+def _range(start_hour, end_hour):
+    day = datetime(2025, 2, 17, tzinfo=timezone.utc)
+    return day + timedelta(hours=start_hour), day + timedelta(hours=end_hour)
+
+
+def test_event_index__returns_overlapping_events_sorted():
+    events = [_event(10, 11, "c"), _event(8, 9, "a"), _event(9, 10, "b"), _event(12, 13, "d")]
+    index = EventIndex(events)
+    assert [e.summary for e in index.between(*_range(9, 12))] == ["b", "c"]
+    assert [e.summary for e in index.between(*_range(0, 24))] == ["a", "b", "c", "d"]
+    assert index.between(*_range(14, 15)) == []
+
+
+def test_event_index__includes_long_event_started_before_range():
+    events = [_event(0, 20, "long"), _event(8, 9, "a"), _event(12, 13, "b")]
+    index = EventIndex(events)
+    assert [e.summary for e in index.between(*_range(10, 11))] == ["long"]
+
+
+def test_event_index__matches_linear_scan():
+    events = [_event(h % 7, h % 7 + 1 + h % 3, str(h)) for h in range(30)]
+    index = EventIndex(events)
+    for start_hour in range(0, 10):
+        for end_hour in range(start_hour + 1, 11):
+            start, end = _range(start_hour, end_hour)
+            expected = {e.summary for e in events if e.end > start and e.start < end}
+            assert {e.summary for e in index.between(start, end)} == expected
+
+
+def test_parse_cache__reuses_unchanged_lessons(sample__normal):
+    cache = LessonParseCache(TEACHER_NAME_FULL)
+    first = cache.parse([sample__normal])
+    second = cache.parse([sample__normal])
+    assert second[0] is first[0]
+    assert second[0].summary == "Test Subject, Jesper Balle"
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_parse_cache__reparses_changed_lessons(sample__normal):
+    cache = LessonParseCache()
+    first = cache.parse([sample__normal])
+    changed = dict(sample__normal, title="Changed Subject")
+    second = cache.parse([changed])
+    assert second[0] is not first[0]
+    assert second[0].summary == "Changed Subject, JB"
+    assert (cache.hits, cache.misses) == (0, 2)
+
+
+def test_parse_cache__drops_removed_lessons(sample__normal, sample__substitute_with_location):
+    cache = LessonParseCache()
+    cache.parse([sample__normal, sample__substitute_with_location])
+    assert len(cache) == 2
+    cache.parse([sample__normal])
+    assert len(cache) == 1
@@ -0,0 +1,195 @@
+import os
+import json
+from datetime import date, datetime, timedelta, timezone
+
+from custom_components.aula.calendar_store import (
+    CalendarStore,
+    horizon_weeks,
+    index_lessons,
+    index_lessons_by_week,
+    week_runs,
+    weeks_between,
+)
+
+
+def load_json_fixture(filename):
+    fixture_path = os.path.join(os.path.dirname(__file__), "fixtures", filename)
+    with open(fixture_path) as f:
+        return json.load(f)
+
+
+# Wednesday
+NOW = datetime(2025, 2, 19, 12, 0, tzinfo=timezone.utc)
+THIS_WEEK = date(2025, 2, 17)
+
+
+def lesson(childid, title="Dansk", start="2025-02-18T08:00:00+00:00"):
+    return {
+        "type": "lesson",
+        "title": title,
+        "startDateTime": start,
+        "belongsToProfiles": [childid],
+    }
+
+
+def test_index_lessons__groups_by_first_profile():
+    events = [lesson(1, "Dansk"), lesson(2, "Matematik"), lesson(1, "Engelsk")]
+    lessons = index_lessons(events)
+    assert [l["title"] for l in lessons[1]] == ["Dansk", "Engelsk"]
+    assert [l["title"] for l in lessons[2]] == ["Matematik"]
+
+
+def test_index_lessons__skips_other_event_types_and_bad_events():
+    events = [
+        {"type": "event", "belongsToProfiles": [1]},
+        {"type": "lesson", "belongsToProfiles": []},
+        {"type": "lesson"},
+        lesson(1),
+    ]
+    assert index_lessons(events) == {1: [lesson(1)]}
+
+
+def test_index_lessons__fixture():
+    event = load_json_fixture("calendar_lesson_normal.json")
+    childid = event["belongsToProfiles"][0]
+    assert index_lessons([event]) == {childid: [event]}
+
+
+def test_index_lessons_by_week__routes_by_week_and_child():
+    next_week = THIS_WEEK + timedelta(weeks=1)
+    events = iter(
+        [
+            lesson(1, "Dansk", "2025-02-18T08:00:00+00:00"),
+            {"type": "event", "belongsToProfiles": [1], "startDateTime": "2025-02-18T09:00:00+00:00"},
+            lesson(2, "Matematik", "2025-02-25T08:00:00+00:00"),
+            dict(lesson(1, "Bad"), startDateTime="not a date"),
+            lesson(1, "Engelsk", "2025-02-19T08:00:00+00:00"),
+        ]
+    )
+    weeks = index_lessons_by_week(events)
+    assert sorted(weeks) == [THIS_WEEK, next_week]
+    assert [l["title"] for l in weeks[THIS_WEEK][1]] == ["Dansk", "Engelsk"]
+    assert [l["title"] for l in weeks[next_week][2]] == ["Matematik"]
+    assert 2 not in weeks[THIS_WEEK]
+
+
+def test_horizon_weeks():
+    weeks = horizon_weeks(NOW.date(), 1, 2)
+    assert weeks == [
+        date(2025, 2, 10),
+        date(2025, 2, 17),
+        date(2025, 2, 24),
+        date(2025, 3, 3),
+    ]
+
+
+def test_weeks_between__end_is_exclusive():
+    assert weeks_between(date(2025, 2, 19), date(2025, 2, 24)) == [THIS_WEEK]
+    assert weeks_between(date(2025, 2, 19), date(2025, 2, 25)) == [
+        THIS_WEEK,
+        date(2025, 2, 24),
+    ]
+
+
+def test_week_runs__groups_consecutive_weeks():
+    weeks = [THIS_WEEK + timedelta(weeks=n) for n in (5, 0, 1, 2, 7, 6)]
+    runs = week_runs(weeks, max_length=2)
+    assert runs == [
+        [THIS_WEEK, THIS_WEEK + timedelta(weeks=1)],
+        [THIS_WEEK + timedelta(weeks=2)],
+        [THIS_WEEK + timedelta(weeks=5), THIS_WEEK + timedelta(weeks=6)],
+        [THIS_WEEK + timedelta(weeks=7)],
+    ]
+
+
+def test_store_update__splits_response_into_weeks():
+    store = CalendarStore()
+    next_week = THIS_WEEK + timedelta(weeks=1)
+    events = [
+        lesson(1, "Dansk", "2025-02-18T08:00:00+00:00"),
+        lesson(1, "Engelsk", "2025-02-25T08:00:00+00:00"),
+        lesson(1, "Outside", "2025-03-04T08:00:00+00:00"),
+    ]
+    version = store.version
+    store.update([THIS_WEEK, next_week], events, NOW)
+    assert store.version == version + 1
+    assert store.loaded_weeks() == [THIS_WEEK, next_week]
+    assert [l["title"] for l in store.lessons(1)] == ["Dansk", "Engelsk"]
+    assert store.lessons(2) == []
+
+    # Refetching a week replaces it, even when it is now empty
+    store.update([next_week], [], NOW)
+    assert [l["title"] for l in store.lessons(1)] == ["Dansk"]
+
+
+def test_store_stale_weeks():
+    store = CalendarStore()
+    past, far = THIS_WEEK - timedelta(weeks=1), THIS_WEEK + timedelta(weeks=4)
+    weeks = [past, THIS_WEEK, far]
+    assert store.stale_weeks(weeks, NOW) == weeks
+
+    store.update(weeks, [], NOW)
+    # The current week is refreshed every time, distant weeks are not
+    assert store.stale_weeks(weeks, NOW + timedelta(minutes=5)) == [THIS_WEEK]
+    assert store.stale_weeks(weeks, NOW + timedelta(hours=7)) == [THIS_WEEK, far]
+    assert store.stale_weeks(weeks, NOW + timedelta(hours=25)) == weeks
+
+
+def test_store_touch__marks_weeks_fresh_without_new_version():
+    store = CalendarStore()
+    far = THIS_WEEK + timedelta(weeks=4)
+    store.update([far], [], NOW)
+    version = store.version
+    later = NOW + timedelta(hours=7)
+    assert store.stale_weeks([far], later) == [far]
+    store.touch([far, far + timedelta(weeks=1)], later)
+    assert store.stale_weeks([far], later) == []
+    assert store.loaded_weeks() == [far]
+    assert store.version == version
+
+
+class _RecordingStore:
+    def __init__(self):
+        self.saved = []
+
+    def async_delay_save(self, data_func, delay):
+        self.saved.append(data_func())
+
+
+def test_store_touch__saves_the_fetched_at_times():
+    store = CalendarStore()
+    store._store = saves = _RecordingStore()
+    far = THIS_WEEK + timedelta(weeks=4)
+    store.update([far], [], NOW)
+    later = NOW + timedelta(hours=7)
+    store.touch([far], later)
+    assert saves.saved[-1]["weeks"][far.isoformat()]["fetched"] == later.isoformat()
+    # Nothing loaded to touch, nothing to save
+    store.touch([far + timedelta(weeks=1)], later)
+    assert len(saves.saved) == 2
+
+
+def test_store_prune__keeps_horizon_and_recent_weeks():
+    store = CalendarStore()
+    old = THIS_WEEK - timedelta(weeks=10)
+    store.update([old, THIS_WEEK], [], NOW)
+    store.prune([THIS_WEEK], NOW + timedelta(minutes=5))
+    assert store.loaded_weeks() == [old, THIS_WEEK]
+    store.prune([THIS_WEEK], NOW + timedelta(hours=7))
+    assert store.loaded_weeks() == [THIS_WEEK]
+    assert store.missing_weeks([old, THIS_WEEK]) == [old]
+
+
+def test_store_day_bounds():
+    store = CalendarStore()
+    events = [
+        dict(lesson(1, "Dansk", "2025-02-18T08:00:00+00:00"), endDateTime="2025-02-18T08:45:00+00:00"),
+        dict(lesson(1, "Idræt", "2025-02-18T12:00:00+00:00"), endDateTime="2025-02-18T13:30:00+00:00"),
+        dict(lesson(1, "Engelsk", "2025-02-19T09:00:00+00:00"), endDateTime="2025-02-19T10:00:00+00:00"),
+    ]
+    store.update([THIS_WEEK], events, NOW)
+    first, last = store.day_bounds(1, date(2025, 2, 18), timezone.utc)
+    assert first == datetime(2025, 2, 18, 8, 0, tzinfo=timezone.utc)
+    assert last == datetime(2025, 2, 18, 13, 30, tzinfo=timezone.utc)
+    assert store.day_bounds(1, date(2025, 2, 20), timezone.utc) is None
+    assert store.day_bounds(2, date(2025, 2, 18), timezone.utc) is None
@@ -0,0 +1,408 @@
+import asyncio
+import datetime
+import json
+import time
+
+from custom_components.aula.api import AulaResponse
+from custom_components.aula.client import Client
+from custom_components.aula.const import PROFILE_CONTEXT_TTL
+
+
+def test_clients_do_not_share_state():
+    first, second = Client("guardian1"), Client("guardian2")
+    try:
+        first.tokens["0004"] = "token"
+        first.ugep_attr["Emilie"] = "<h3>Mandag</h3>"
+        assert second.tokens == {}
+        assert second.ugep_attr == {}
+        assert first.response_cache is not second.response_cache
+        assert first.calendar_store is not second.calendar_store
+    finally:
+        first.close()
+        second.close()
+
+
+def test_fan_out__abandons_optional_stages_past_the_deadline():
+    client = Client("guardian")
+    merged = []
+
+    async def fetch(value, delay):
+        await asyncio.sleep(delay)
+        return value
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        await client._async_fan_out(
+            [("presence", fetch, ("presence", 0.05), merged.append)],
+            [
+                ("meebook", fetch, ("meebook", 0), merged.append),
+                ("easyiq", fetch, ("easyiq", 10), merged.append),
+            ],
+            loop.time() + 0.01,
+        )
+
+    try:
+        asyncio.run(main())
+        assert merged == ["presence", "meebook"]
+        assert client.stage_health.stats()["easyiq"]["abandoned"] == 1
+    finally:
+        client.close()
+
+
+def test_fan_out__stage_duration_is_its_own_fetch_and_merge():
+    client = Client("guardian")
+
+    async def fetch(delay):
+        await asyncio.sleep(delay)
+
+    async def main():
+        await client._async_fan_out(
+            [
+                ("presence", fetch, (0,), lambda result: None),
+                ("calendar", fetch, (0.3,), lambda result: None),
+            ]
+        )
+
+    try:
+        asyncio.run(main())
+        stats = client.stage_health.stats()
+        assert stats["presence"]["last_duration"] < 0.1
+        assert stats["calendar"]["last_duration"] >= 0.25
+    finally:
+        client.close()
+
+
+def test_fan_out__failing_stage_keeps_its_last_values():
+    client = Client("guardian")
+    client.ugep_attr["Emilie"] = "last week's plan"
+
+    async def fetch(value):
+        return value
+
+    async def fail():
+        raise ValueError("Meebook is down")
+
+    def broken_merge(result):
+        raise KeyError("personer")
+
+    async def main():
+        return await client._async_fan_out(
+            [("presence", fetch, ({"1": "present"},), client.presence.update)],
+            [
+                ("meebook", fail, (), client.ugep_attr.update),
+                ("mu_ugebrev", fetch, ({"Emilie": "new plan"},), broken_merge),
+            ],
+        )
+
+    try:
+        assert asyncio.run(main()) == ["meebook", "mu_ugebrev"]
+        assert client.presence == {"1": "present"}
+        assert client.ugep_attr == {"Emilie": "last week's plan"}
+        stats = client.stage_health.stats()
+        assert stats["presence"]["failures"] == 0
+        assert stats["presence"]["last_success"] is not None
+        assert stats["meebook"]["last_error"] == "ValueError: Meebook is down"
+        assert stats["mu_ugebrev"]["consecutive_failures"] == 1
+    finally:
+        client.close()
+
+
+def test_merge_calendar__stores_lessons_and_rejects_bad_responses():
+    client = Client("guardian")
+    week = datetime.date(2025, 2, 17)
+    lesson = {
+        "type": "lesson",
+        "title": "Dansk",
+        "startDateTime": "2025-02-18T08:00:00+00:00",
+        "belongsToProfiles": [1],
+    }
+    event = dict(lesson, type="event", title="Forældremøde")
+    try:
+        text = json.dumps({"status": {"message": "OK"}, "data": [event, lesson]})
+        client._merge_calendar(([week], AulaResponse(200, text)))
+        assert client.calendar_store.lessons(1) == [lesson]
+
+        # A response without events keeps the lessons we have
+        client._merge_calendar(([week], AulaResponse(200, '{"status": {"code": 500}}')))
+        assert client.calendar_store.lessons(1) == [lesson]
+    finally:
+        client.close()
+
+
+class _MessagesApi:
+    """Answers getThreads with one unread thread and counts thread fetches."""
+
+    def __init__(self):
+        self.thread_fetches = 0
+
+    async def get_threads(self, headers=None):
+        return AulaResponse(200, json.dumps({"data": {"threads": [{"id": 7, "read": False}]}}))
+
+    async def get_messages_for_thread(self, threadid):
+        self.thread_fetches += 1
+        message = {
+            "messageType": "Message",
+            "text": {"html": "Husk madpakke"},
+            "sender": {"fullName": "Lærer"},
+        }
+        return AulaResponse(200, json.dumps({"data": {"subject": "Tur", "messages": [message]}}))
+
+
+def test_fetch_messages__unchanged_threads_without_merge():
+    client = Client("guardian")
+    client._api = api = _MessagesApi()
+    expected = (1, {"text": "Husk madpakke", "sender": "Lærer", "subject": "Tur"})
+    try:
+        assert client.message == {}
+        # The first result is never merged, e.g. a sibling stage failed
+        assert asyncio.run(client._fetch_messages()) == expected
+        assert asyncio.run(client._fetch_messages()) == expected
+        assert api.thread_fetches == 1
+    finally:
+        client.close()
+
+
+class _FakeStream:
+    """The body of a fake aiohttp response, handed out in chunks."""
+
+    def __init__(self, body):
+        self._body = body
+
+    async def iter_chunked(self, size):
+        for start in range(0, len(self._body), size):
+            yield self._body[start : start + size]
+
+
+class _FakeAiohttpResponse:
+    def __init__(self, text, status=200):
+        self.status = status
+        self.headers = {}
+        self.content = _FakeStream(text.encode())
+
+    def get_encoding(self):
+        return "utf-8"
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class _ProfileContextSession:
+    """An aiohttp session answering every request with a profile context."""
+
+    def __init__(self):
+        self.requests = []
+        self.cookie_jar = []
+
+    def request(self, method, url, **kwargs):
+        self.requests.append((method, url, kwargs))
+        body = {
+            "status": {"message": "OK"},
+            "data": {
+                "pageConfiguration": {
+                    "widgetConfigurations": [
+                        {"widget": {"widgetId": "0004", "name": "Meebook Ugeplan"}}
+                    ]
+                }
+            },
+        }
+        return _FakeAiohttpResponse(json.dumps(body))
+
+
+def test_sync_wrappers__return_what_the_async_methods_return():
+    client = Client("guardian", stored_tokens={"access_token": "token123"})
+    client._api.session = session = _ProfileContextSession()
+    try:
+        result = client.custom_api_call("?method=profiles.getProfileContext", 0)
+        assert result["data"]["pageConfiguration"]["widgetConfigurations"][0]["widget"][
+            "widgetId"
+        ] == "0004"
+        method, url, _ = session.requests[-1]
+        assert method == "GET"
+        assert url.endswith("?method=profiles.getProfileContext&access_token=token123")
+
+        client.custom_api_call("?method=calendar.getEventsByProfileIdsAndResourceIds", '{"a": 1}')
+        method, _, kwargs = session.requests[-1]
+        assert (method, kwargs["data"]) == ("POST", '{"a": 1}')
+        assert client.custom_api_call("?method=x", "not json") == {
+            "result": "Fail - invalid json supplied as post_data"
+        }
+
+        client.get_widgets()
+        assert client.widgets == {"0004": "Meebook Ugeplan"}
+    finally:
+        client.close()
+
+
+def test_fan_out__merges_in_stage_order_not_completion_order():
+    client = Client("guardian")
+    merged = []
+    finished = []
+
+    async def fetch(value, delay):
+        await asyncio.sleep(delay)
+        finished.append(value)
+        return value
+
+    def fetch_in_thread(value, delay):
+        time.sleep(delay)
+        finished.append(value)
+        return value
+
+    # The first stages take the longest, so they finish last
+    stages = [
+        ("presence", fetch, ("presence", 0.06), merged.append),
+        ("messages", fetch_in_thread, ("messages", 0.04), merged.append),
+        ("calendar", fetch, ("calendar", 0.02), merged.append),
+    ]
+    optional = [
+        ("meebook", fetch_in_thread, ("meebook", 0.03), merged.append),
+        ("easyiq", fetch, ("easyiq", 0), merged.append),
+    ]
+    try:
+        assert asyncio.run(client._async_fan_out(stages, optional)) == []
+        assert finished.index("calendar") < finished.index("messages") < finished.index("presence")
+        assert merged == ["presence", "messages", "calendar", "meebook", "easyiq"]
+    finally:
+        client.close()
+
+
+class _ProfileApi:
+    """Answers the profile calls of a login check and counts the context requests."""
+
+    def __init__(self):
+        self.apiurl = None
+        self.profile_context_requests = 0
+        self.profiles_requests = 0
+
+    async def get_profiles_by_login(self):
+        self.profiles_requests += 1
+        return AulaResponse(200, json.dumps({"data": {"profiles": []}}))
+
+    async def get_profile_context(self):
+        self.profile_context_requests += 1
+        data = {
+            "userId": "guardian1",
+            "institutionProfile": {"relations": []},
+            "pageConfiguration": {
+                "widgetConfigurations": [{"widget": {"widgetId": "0004", "name": "Meebook"}}]
+            },
+        }
+        return AulaResponse(200, json.dumps({"data": data}))
+
+
+def test_profile_context__shared_within_ttl_and_refetched_after_login():
+    client = Client("guardian")
+    client._api = api = _ProfileApi()
+
+    async def refresh():
+        # The MU Opgaver and ugeplan guardian lookups, and widget discovery
+        assert await client._async_guardian() == "guardian1"
+        assert await client._async_guardian() == "guardian1"
+        await client.async_get_widgets()
+
+    async def main():
+        await client.async_verify_api_access()
+        await refresh()
+        assert api.profile_context_requests == 1
+        assert client.widgets == {"0004": "Meebook"}
+
+        # A fresh login always fetches the context again
+        await client.async_verify_api_access()
+        assert api.profile_context_requests == 2
+
+        # And so does the next refresh once the TTL has passed
+        client._profile_context_time -= datetime.timedelta(seconds=PROFILE_CONTEXT_TTL)
+        await refresh()
+        assert api.profile_context_requests == 3
+
+    try:
+        asyncio.run(main())
+    finally:
+        client.close()
+
+
+class _LoginCheckSession:
+    """Accepts the login check and rejects every other Aula request with 403."""
+
+    def __init__(self):
+        self.cookie_jar = []
+        self.login_checks = 0
+
+    def request(self, method, url, params=(), **kwargs):
+        if ("method", "profiles.getProfilesByLogin") not in params:
+            return _FakeAiohttpResponse("{}", status=403)
+        self.login_checks += 1
+        child = {
+            "id": 1001,
+            "userId": "barn1",
+            "name": "Barn Testesen",
+            "institutionProfile": {"institutionName": "Testskolen"},
+        }
+        body = {
+            "status": {"message": "OK"},
+            "data": {
+                "profiles": [
+                    {"children": [child], "institutionProfiles": [{"institutionCode": "123"}]}
+                ]
+            },
+        }
+        return _FakeAiohttpResponse(json.dumps(body))
+
+
+def _login_checks(verify_interval, between_refreshes=None):
+    """Return the login checks made by three refreshes."""
+    client = Client("guardian", verify_interval=verify_interval)
+    client._api.session = session = _LoginCheckSession()
+    client._ensure_valid_token = lambda: True
+
+    async def main():
+        for _ in range(3):
+            await client._async_prepare_update()
+            assert client._childids == ["1001"]
+            if between_refreshes is not None:
+                await between_refreshes(client)
+
+    try:
+        asyncio.run(main())
+    finally:
+        client.close()
+    return session.login_checks
+
+
+def test_prepare_update__skips_login_check_while_recently_verified():
+    assert _login_checks(verify_interval=60) == 1
+
+
+def test_prepare_update__checks_login_again_after_401_or_403():
+    async def rejected_request(client):
+        assert (await client._api.get_threads()).status_code == 403
+
+    assert _login_checks(verify_interval=60, between_refreshes=rejected_request) == 3
+
+
+def test_prepare_update__verify_interval_zero_checks_every_refresh():
+    assert _login_checks(verify_interval=0) == 3
+
+
+def test_prepare_update__replaces_the_child_lists_instead_of_refilling_them():
+    client = Client("guardian", verify_interval=0)
+    client._api.session = _LoginCheckSession()
+    client._ensure_valid_token = lambda: True
+
+    async def main():
+        await client._async_prepare_update()
+        # What a stage of another coordinator may be iterating meanwhile
+        childids, institutions = client._childids, client._institutionProfiles
+        await client._async_prepare_update()
+        return childids, institutions
+
+    try:
+        childids, institutions = asyncio.run(main())
+        assert childids == client._childids == ["1001"]
+        assert childids is not client._childids
+        assert institutions == client._institutionProfiles == ["123"]
+    finally:
+        client.close()
@@ -0,0 +1,57 @@
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from custom_components.aula.const import (
+    SOURCES,
+    SOURCE_PRESENCE,
+    SOURCE_MU_OPGAVER,
+    SOURCE_UGEPLAN,
+    CONF_ADAPTIVE_PRESENCE,
+    CONF_PRESENCE_INTERVAL,
+    CONF_WEEKPLAN_INTERVAL,
+    DEFAULT_PRESENCE_INTERVAL,
+)
+from custom_components.aula.coordinator import create_coordinators, source_intervals
+
+
+def test_source_intervals__defaults_cover_every_source():
+    intervals = source_intervals({})
+    assert set(intervals) == set(SOURCES)
+    assert intervals[SOURCE_PRESENCE] == timedelta(minutes=DEFAULT_PRESENCE_INTERVAL)
+
+
+def test_source_intervals__weekplan_interval_drives_mu_opgaver_and_ugeplan():
+    intervals = source_intervals(
+        {CONF_PRESENCE_INTERVAL: 1, CONF_WEEKPLAN_INTERVAL: 120}
+    )
+    assert intervals[SOURCE_PRESENCE] == timedelta(minutes=1)
+    assert intervals[SOURCE_MU_OPGAVER] == timedelta(minutes=120)
+    assert intervals[SOURCE_UGEPLAN] == timedelta(minutes=120)
+
+
+class _RecordingCoordinator:
+    def __init__(self, hass, logger, **kwargs):
+        self.kwargs = kwargs
+        self.update_interval = kwargs["update_interval"]
+
+
+@pytest.mark.parametrize("accepts_config_entry", [True, False])
+def test_create_coordinators__passes_the_config_entry_when_supported(
+    accepts_config_entry,
+):
+    entry = SimpleNamespace(entry_id="e1", data={CONF_ADAPTIVE_PRESENCE: False})
+    with patch(
+        "custom_components.aula.coordinator.DataUpdateCoordinator", _RecordingCoordinator
+    ), patch(
+        "custom_components.aula.coordinator._ACCEPTS_CONFIG_ENTRY", accepts_config_entry
+    ):
+        coordinators = create_coordinators(None, None, entry)
+    assert set(coordinators) == set(SOURCES)
+    for coordinator in coordinators.values():
+        if accepts_config_entry:
+            assert coordinator.kwargs["config_entry"] is entry
+        else:
+            assert "config_entry" not in coordinator.kwargs
@@ -0,0 +1,118 @@
+import threading
+
+from custom_components.aula.api import AulaResponse
+from custom_components.aula.fingerprint import ResponseCache, body_digest, state_digest
+
+
+def _parse_counting(calls):
+    def parse(response):
+        calls.append(response.text)
+        return response.json()
+
+    return parse
+
+
+def test_body_digest__str_and_bytes_agree():
+    assert body_digest('{"a": 1}') == body_digest(b'{"a": 1}')
+    assert body_digest("a") != body_digest("b")
+
+
+def test_parse__unchanged_body_reuses_result():
+    cache = ResponseCache()
+    calls = []
+    key = ("presence", "1")
+    first = cache.parse(key, AulaResponse(200, '{"a": 1}'), _parse_counting(calls))
+    second = cache.parse(key, AulaResponse(200, '{"a": 1}'), _parse_counting(calls))
+    assert first == {"a": 1}
+    assert second is first
+    assert len(calls) == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_parse__changed_body_is_parsed_again():
+    cache = ResponseCache()
+    calls = []
+    key = ("presence", "1")
+    cache.parse(key, AulaResponse(200, '{"a": 1}'), _parse_counting(calls))
+    assert cache.parse(key, AulaResponse(200, '{"a": 2}'), _parse_counting(calls)) == {"a": 2}
+    assert len(calls) == 2
+
+
+def test_parse__not_modified_reuses_result_and_calls_unchanged():
+    cache = ResponseCache()
+    key = ("messages", "threads")
+    cache.parse(key, AulaResponse(200, '{"a": 1}', {"etag": '"v1"'}), lambda r: r.json())
+    assert cache.conditional_headers(key, {"accept": "application/json"}) == {
+        "accept": "application/json",
+        "If-None-Match": '"v1"',
+    }
+    unchanged = []
+    assert cache.parse(key, AulaResponse(304, ""), lambda r: None, unchanged.append) == {"a": 1}
+    assert unchanged == [{"a": 1}]
+
+
+def test_conditional_headers__without_etag_adds_nothing():
+    cache = ResponseCache()
+    key = ("calendar", "2025-02-17", 2)
+    assert cache.conditional_headers(key) == {}
+    cache.parse(key, AulaResponse(200, "{}"), lambda r: r.json())
+    assert cache.conditional_headers(key) == {}
+
+
+def test_fingerprints__change_only_with_the_responses_of_the_source():
+    cache = ResponseCache()
+    cache.parse(("ugeplan", "meebook", "2025-W08"), AulaResponse(200, "[]"), lambda r: {})
+    cache.parse(("presence", "1"), AulaResponse(200, "{}"), lambda r: {})
+    before = cache.fingerprints("ugeplan")
+    assert len(before) == 1
+
+    cache.parse(("presence", "1"), AulaResponse(200, '{"b": 1}'), lambda r: {})
+    assert cache.fingerprints("ugeplan") == before
+    cache.parse(("ugeplan", "meebook", "2025-W08"), AulaResponse(200, "[1]"), lambda r: {})
+    assert cache.fingerprints("ugeplan") != before
+
+
+def test_forget_and_prune():
+    cache = ResponseCache()
+    for week in ("2025-W07", "2025-W08", "2025-W09"):
+        cache.parse(("mu_opgaver", week), AulaResponse(200, week), lambda r: {})
+    cache.prune("mu_opgaver", lambda key: key[1] != "2025-W07")
+    cache.forget(("mu_opgaver", "2025-W09"))
+    assert [key for key, _ in cache.fingerprints("mu_opgaver")] == [
+        ("mu_opgaver", "2025-W08")
+    ]
+
+
+def test_state_digest__ignores_attribute_order_only():
+    attributes = {"ugeplan": "<h3>Mandag</h3>", "checkInTime": "07:55"}
+    reordered = {"checkInTime": "07:55", "ugeplan": "<h3>Mandag</h3>"}
+    digest = state_digest("Kommet/Til stede", attributes)
+    assert state_digest("Kommet/Til stede", reordered) == digest
+    assert state_digest("Gået", attributes) != digest
+    assert state_digest("Kommet/Til stede", dict(attributes, checkInTime="08:00")) != digest
+    assert state_digest("Kommet/Til stede", attributes, available=False) != digest
+
+
+def test_cache__parse_in_threads_while_pruning_and_fingerprinting():
+    cache = ResponseCache()
+    errors = []
+
+    def fetcher(thread):
+        try:
+            for n in range(500):
+                key = ("ugeplan", thread, n)
+                cache.parse(key, AulaResponse(200, f'{{"n": {n}}}'), lambda r: r.json())
+        except Exception as e:  # pragma: no cover - the failure being tested
+            errors.append(e)
+
+    threads = [threading.Thread(target=fetcher, args=(t,)) for t in range(4)]
+    for thread in threads:
+        thread.start()
+    while any(thread.is_alive() for thread in threads):
+        cache.fingerprints("ugeplan")
+        cache.prune("ugeplan", lambda key: key[2] % 2 == 0)
+        cache.stats()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert cache.misses == 4 * 500
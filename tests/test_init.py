@@ -0,0 +1,15 @@
+from custom_components.aula import migrated_unique_id
+
+
+def test_migrated_unique_id__scopes_legacy_ids_by_entry():
+    assert migrated_unique_id("binary_sensor", "aulamessage", "e1") == "aulamessage_e1"
+    assert migrated_unique_id("sensor", "aula123", "e1") == "aula123_e1"
+    assert migrated_unique_id("calendar", "aulacalendar123", "e1") == "aulacalendar123_e1"
+    assert migrated_unique_id("calendar", "aulabirthdays123", "e1") == "aulabirthdays123_e1"
+
+
+def test_migrated_unique_id__leaves_current_ids_alone():
+    assert migrated_unique_id("sensor", "aula123_e1", "e1") is None
+    assert migrated_unique_id("sensor", "aula_requests_e1", "e1") is None
+    assert migrated_unique_id("calendar", "aula123", "e1") is None
+    assert migrated_unique_id("binary_sensor", "aulamessage_e1", "e1") is None
@@ -0,0 +1,50 @@
+from custom_components.aula.metrics import (
+    LatencyHistogram,
+    RequestMetrics,
+    hit_ratio,
+)
+from custom_components.aula.pipeline import StageHealth
+
+
+def test_latency_histogram__buckets_by_upper_bound():
+    histogram = LatencyHistogram(buckets=(0.1, 1))
+    for seconds in (0.05, 0.1, 0.5, 3):
+        histogram.observe(seconds)
+    stats = histogram.as_dict()
+    assert stats["buckets"] == {"<=0.1": 2, "<=1": 1, ">1": 1}
+    assert stats["count"] == 4
+    assert stats["max"] == 3
+    assert stats["mean"] == 0.9125
+
+
+def test_request_metrics__counts_per_host():
+    metrics = RequestMetrics()
+    metrics.record("www.aula.dk", 0.2, 1000, 200)
+    metrics.record("www.aula.dk", 0.4, 20, 500)
+    metrics.record("app.meebook.com", 5.0)
+    stats = metrics.stats()
+    assert stats["www.aula.dk"]["requests"] == 2
+    assert stats["www.aula.dk"]["errors"] == 1
+    assert stats["www.aula.dk"]["bytes"] == 1020
+    assert stats["www.aula.dk"]["latency"]["count"] == 2
+    assert stats["app.meebook.com"]["errors"] == 1
+    assert metrics.total_requests() == 3
+
+
+def test_hit_ratio():
+    assert hit_ratio(0, 0) is None
+    assert hit_ratio(3, 1) == 0.75
+
+
+def test_stage_health__latency_and_outcome():
+    health = StageHealth()
+    health.succeeded("presence", 0.3)
+    health.failed("presence", ValueError("boom"), 1.2)
+    health.abandoned("meebook", 60)
+    stats = health.stats()
+    assert stats["presence"]["runs"] == 2
+    assert stats["presence"]["failures"] == 1
+    assert stats["presence"]["last_error"] == "ValueError: boom"
+    assert stats["presence"]["latency"]["count"] == 2
+    assert stats["meebook"]["abandoned"] == 1
+    assert stats["meebook"]["latency"]["count"] == 0
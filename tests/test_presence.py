@@ -0,0 +1,130 @@
+import asyncio
+import json
+
+import pytest
+
+from custom_components.aula.api import AulaResponse
+from custom_components.aula.client import Client, map_daily_overview
+from custom_components.aula.sensor import PRESENCE_FIELDS, presence_attributes
+
+
+def overview(child_id, status=3):
+    return {"institutionProfile": {"id": child_id}, "status": status}
+
+
+def test_map_daily_overview__matches_on_institution_profile_id():
+    overviews = [overview(102, status=0), overview(101, status=3)]
+    result = map_daily_overview(overviews, ["101", "102"])
+    assert result == {"101": overviews[1], "102": overviews[0]}
+
+
+def test_map_daily_overview__missing_child_maps_to_none():
+    result = map_daily_overview([overview(101)], ["101", "102"])
+    assert result["101"]["status"] == 3
+    assert result["102"] is None
+
+
+def test_map_daily_overview__ignores_entries_without_profile():
+    result = map_daily_overview([{"status": 1}, None, overview(101)], ["101"])
+    assert result == {"101": overview(101)}
+
+
+def test_map_daily_overview__empty_response():
+    assert map_daily_overview(None, ["101"]) == {"101": None}
+    assert map_daily_overview([], []) == {}
+
+
+def test_presence_attributes__shortens_times_and_hides_placeholder_exit():
+    daily_info = {field: None for field in PRESENCE_FIELDS}
+    daily_info.update(
+        checkInTime="07:55:00",
+        exitTime="23:59:00",
+        comment="Hentes af mormor",
+        institutionProfile={"id": 101, "profilePicture": {"url": "https://x/p.jpg"}},
+    )
+    attributes = presence_attributes(daily_info)
+    assert attributes["checkInTime"] == "07:55"
+    assert attributes["exitTime"] is None
+    assert attributes["comment"] == "Hentes af mormor"
+    assert attributes["profilePicture"] == "https://x/p.jpg"
+    assert attributes["institutionProfileId"] == 101
+
+
+def test_presence_attributes__without_profile_picture():
+    daily_info = {field: None for field in PRESENCE_FIELDS}
+    daily_info["institutionProfile"] = {"id": 101}
+    assert presence_attributes(daily_info)["profilePicture"] is None
+
+
+class _PresenceApi:
+    """Answers batched getDailyOverview calls with batch(), single ones with data."""
+
+    def __init__(self, batch):
+        self._batch = batch
+        self.requests = []
+
+    async def get_daily_overview(self, child_ids, headers=None):
+        self.requests.append(list(child_ids))
+        if len(child_ids) > 1:
+            return self._batch()
+        data = [overview(int(child_ids[0]))]
+        return AulaResponse(200, json.dumps({"data": data}))
+
+
+def _raise():
+    raise ConnectionError("reset by peer")
+
+
+@pytest.mark.parametrize(
+    "batch",
+    [
+        lambda: AulaResponse(500, "{}"),
+        _raise,
+        lambda: AulaResponse(200, json.dumps({"data": None})),
+    ],
+    ids=["non-200", "error", "no data list"],
+)
+def test_fetch_presence__falls_back_to_one_request_per_child(batch):
+    client = Client("guardian")
+    client._api = api = _PresenceApi(batch)
+    client._childids = ["101", "102"]
+    try:
+        result = asyncio.run(client._fetch_presence())
+    finally:
+        client.close()
+    assert result == {"101": overview(101), "102": overview(102)}
+    assert api.requests == [["101", "102"], ["101"], ["102"]]
+
+
+def test_fetch_presence__batch_answer_needs_no_fallback():
+    def batch():
+        return AulaResponse(200, json.dumps({"data": [overview(102), overview(101)]}))
+
+    client = Client("guardian")
+    client._api = api = _PresenceApi(batch)
+    client._childids = ["101", "102"]
+    try:
+        result = asyncio.run(client._fetch_presence())
+    finally:
+        client.close()
+    assert result == {"101": overview(101), "102": overview(102)}
+    assert api.requests == [["101", "102"]]
+
+
+def test_fetch_presence__fails_when_no_child_lookup_succeeds():
+    class _RejectingApi:
+        async def get_daily_overview(self, child_ids, headers=None):
+            return AulaResponse(403, "{}")
+
+    client = Client("guardian")
+    client._api = _RejectingApi()
+    client._childids = ["101", "102"]
+    client.presence = {"101": 1, "102": 1}
+    client._daily_overview = {"101": overview(101), "102": overview(102)}
+    try:
+        failed = asyncio.run(client._async_fan_out(client._presence_stages()))
+    finally:
+        client.close()
+    assert failed == ["presence"]
+    assert client.presence == {"101": 1, "102": 1}
+    assert client._daily_overview == {"101": overview(101), "102": overview(102)}
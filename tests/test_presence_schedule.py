@@ -0,0 +1,82 @@
+from datetime import datetime, timedelta, timezone
+
+from custom_components.aula.presence_schedule import (
+    FAST_INTERVAL,
+    IDLE_INTERVAL,
+    expected_changes,
+    presence_poll_interval,
+)
+
+BASE = timedelta(minutes=5)
+TZ = timezone(timedelta(hours=1))
+
+
+def at(hour, minute=0, day=19):
+    # 19 February 2025 is a Wednesday
+    return datetime(2025, 2, day, hour, minute, tzinfo=TZ)
+
+
+def overview(status=0, entry="08:00:00", exit="15:00:00", check_in=None):
+    return {
+        "status": status,
+        "entryTime": entry,
+        "exitTime": exit,
+        "checkInTime": check_in,
+    }
+
+
+def test_fast_polling_around_expected_check_in():
+    assert presence_poll_interval(at(7, 45), {"1": overview()}, {}, BASE) == FAST_INTERVAL
+    assert presence_poll_interval(at(8, 20), {"1": overview()}, {}, BASE) == FAST_INTERVAL
+
+
+def test_fast_polling_around_expected_check_out():
+    present = overview(status=3, check_in="07:58:00")
+    assert presence_poll_interval(at(14, 40), {"1": present}, {}, BASE) == FAST_INTERVAL
+
+
+def test_base_interval_during_the_day():
+    present = overview(status=3, check_in="07:58:00")
+    assert presence_poll_interval(at(11), {"1": present}, {}, BASE) == BASE
+
+
+def test_wakes_up_in_time_for_the_next_fast_window():
+    # At 06:00 the fast window for an 08:00 check-in starts at 07:30
+    assert presence_poll_interval(at(5), {"1": overview()}, {}, BASE) == timedelta(hours=1)
+    assert presence_poll_interval(at(7), {"1": overview()}, {}, BASE) == BASE
+    assert presence_poll_interval(at(7, 28), {"1": overview()}, {}, BASE) == timedelta(minutes=2)
+
+
+def test_idle_when_every_child_is_done():
+    overviews = {"1": overview(status=8), "2": overview(status=1)}
+    assert presence_poll_interval(at(10), overviews, {}, BASE) == IDLE_INTERVAL
+
+
+def test_idle_at_weekends_and_without_data():
+    assert presence_poll_interval(at(8, day=22), {"1": overview()}, {}, BASE) == IDLE_INTERVAL
+    assert presence_poll_interval(at(8), {}, {}, BASE) == IDLE_INTERVAL
+
+
+def test_base_interval_while_presence_is_unknown():
+    unknown = {"1": None, "2": None}
+    assert presence_poll_interval(at(8), unknown, {}, BASE) == BASE
+    # A child whose presence is unknown keeps the others' interval from idling
+    overviews = {"1": overview(status=8), "2": None}
+    assert presence_poll_interval(at(10), overviews, {}, BASE) == BASE
+
+
+def test_idle_at_night():
+    present = overview(status=3, exit="23:59:00")
+    assert presence_poll_interval(at(20), {"1": present}, {}, BASE) == IDLE_INTERVAL
+
+
+def test_lessons_fill_in_missing_times():
+    bounds = (at(8, 10), at(13, 30))
+    no_times = overview(entry=None, exit="23:59:00")
+    assert expected_changes(at(7), no_times, bounds) == [at(8, 10), at(13, 30)]
+    assert presence_poll_interval(at(13, 15), {"1": overview(status=3, exit="23:59:00")}, {"1": bounds}, BASE) == FAST_INTERVAL
+
+
+def test_checked_in_child_only_expects_check_out():
+    checked_in = overview(status=3, check_in="07:58:00")
+    assert expected_changes(at(9), checked_in) == [at(15)]
@@ -0,0 +1,29 @@
+from custom_components.aula.provider_sessions import (
+    PROVIDER_RETRY,
+    ProviderSessions,
+    create_session,
+)
+
+
+def test_one_session_per_host():
+    sessions = ProviderSessions(4)
+    a = sessions.session_for("https://api.minuddannelse.net/aula/ugebrev?x=1")
+    b = sessions.session_for("https://api.minuddannelse.net/aula/opgaveliste")
+    c = sessions.session_for("https://app.meebook.com/aulaapi/relatedweekplan/all")
+    assert a is b
+    assert a is not c
+    sessions.close()
+
+
+def test_session_is_pooled_and_retries_gets():
+    session = create_session(6)
+    adapter = session.get_adapter("https://api.easyiqcloud.dk/api/aula")
+    assert adapter._pool_maxsize == 6
+    assert adapter.max_retries is PROVIDER_RETRY
+    assert "GET" in PROVIDER_RETRY.allowed_methods
+    assert "POST" not in PROVIDER_RETRY.allowed_methods
+
+
+def test_session_does_not_keep_cookies():
+    session = create_session(1)
+    assert session.cookies.get_policy().allowed_domains() == ()
@@ -0,0 +1,169 @@
+import asyncio
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from urllib3.response import HTTPResponse
+
+from custom_components.aula.api import AulaApi
+from custom_components.aula.rate_limit import (
+    BACKOFF_MAX,
+    JitteredRetry,
+    RateLimitedAdapter,
+    RateLimiter,
+    TokenBucket,
+    backoff_delay,
+    parse_retry_after,
+)
+
+
+def test_token_bucket__burst_then_rate():
+    bucket = TokenBucket(rate=2, burst=3)
+    assert [bucket.reserve(0) for _ in range(3)] == [0, 0, 0]
+    assert bucket.reserve(0) == 0.5
+    assert bucket.reserve(0) == 1.0
+    # Refilled after a quiet period, but never beyond the burst size
+    assert bucket.reserve(100) == 0
+    assert bucket._tokens == 2
+
+
+def test_token_bucket__hold():
+    bucket = TokenBucket(rate=10, burst=10)
+    bucket.hold(30)
+    assert bucket.reserve(10) == 20
+    assert bucket.reserve(31) == 0
+
+
+def test_parse_retry_after():
+    now = datetime(2025, 2, 19, 12, 0, 0, tzinfo=timezone.utc)
+    assert parse_retry_after("7") == 7
+    assert parse_retry_after("Wed, 19 Feb 2025 12:00:30 GMT", now) == 30
+    assert parse_retry_after("Wed, 19 Feb 2025 11:00:00 GMT", now) == 0
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
+
+
+def test_backoff_delay():
+    assert backoff_delay(3, retry_after=12) == 12
+    assert backoff_delay(0, retry_after=10_000) == BACKOFF_MAX
+    for attempt in range(4):
+        delay = backoff_delay(attempt, base=1)
+        assert 0.5 * 2**attempt <= delay <= 1.5 * 2**attempt
+
+
+def test_rate_limiter__stats_per_host():
+    limiter = RateLimiter(rate=1, burst=1)
+    assert limiter.reserve("www.aula.dk", now=0) == 0
+    assert limiter.reserve("www.aula.dk", now=0) == 1
+    assert limiter.reserve("app.meebook.com", now=0) == 0
+    limiter.throttle("app.meebook.com", 5)
+    stats = limiter.stats()
+    assert stats["www.aula.dk"] == {
+        "requests": 2,
+        "waits": 1,
+        "wait_time": 1,
+        "throttled": 0,
+    }
+    assert stats["app.meebook.com"]["throttled"] == 1
+
+
+class RecordingLimiter:
+    def __init__(self):
+        self.acquired = []
+
+    def acquire(self, host):
+        self.acquired.append(host)
+
+
+def test_jittered_retry__every_retry_attempt_takes_a_token():
+    limiter = RecordingLimiter()
+    retry = JitteredRetry(total=2, status_forcelist=(503,), backoff_factor=0)
+    adapter = RateLimitedAdapter(limiter, max_retries=retry)
+    # The shared retry configuration stays unbound
+    assert retry.limiter is None
+    retries = adapter.max_retries
+    for port, host in ((443, "app.meebook.com"), (8443, "app.meebook.com:8443")):
+        pool = SimpleNamespace(scheme="https", host="app.meebook.com", port=port)
+        retries = retries.increment(
+            "GET", "/", response=HTTPResponse(status=503), _pool=pool
+        )
+        retries.sleep()
+    assert limiter.acquired == ["app.meebook.com", "app.meebook.com:8443"]
+
+
+class FakeStream:
+    """The body of a fake aiohttp response, handed out in chunks."""
+
+    def __init__(self, body):
+        self._body = body
+
+    async def iter_chunked(self, size):
+        for start in range(0, len(self._body), size):
+            yield self._body[start : start + size]
+
+
+class FakeResponse:
+    def __init__(self, status, headers=None):
+        self.status = status
+        self.headers = headers or {}
+
+        self.content = FakeStream(b"{}")
+
+    def get_encoding(self):
+        return "utf-8"
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeSession:
+    def __init__(self, statuses):
+        self.statuses = list(statuses)
+        self.calls = 0
+        self.cookie_jar = []
+
+    def request(self, method, url, **kwargs):
+        self.calls += 1
+        status, headers = self.statuses.pop(0)
+        return FakeResponse(status, headers)
+
+
+async def _no_sleep(delay):
+    return None
+
+
+def _get(session, method="GET"):
+    api = AulaApi(session, lambda: None, limiter=RateLimiter())
+
+    async def main():
+        # asyncio.sleep is the same function everywhere, so this also skips
+        # the limiter's waits
+        with patch("custom_components.aula.api.asyncio.sleep", new=_no_sleep):
+            if method == "GET":
+                return await api.get("presence.getDailyOverview")
+            return await api.post("calendar.getEventsByProfileIdsAndResourceIds", {})
+
+    return asyncio.run(main()), api
+
+
+def test_aula_api__retries_throttled_requests():
+    session = FakeSession([(429, {"Retry-After": "2"}), (200, {})])
+    response, api = _get(session)
+    assert response.status_code == 200
+    assert session.calls == 2
+    assert api._limiter.stats()["www.aula.dk"]["throttled"] == 1
+
+
+def test_aula_api__retries_5xx_only_for_gets():
+    session = FakeSession([(503, {}), (503, {}), (200, {})])
+    response, _ = _get(session)
+    assert response.status_code == 200
+    assert session.calls == 3
+
+    session = FakeSession([(503, {}), (200, {})])
+    response, _ = _get(session, method="POST")
+    assert response.status_code == 503
+    assert session.calls == 1
@@ -0,0 +1,73 @@
+import asyncio
+
+from custom_components.aula.api import AulaResponse
+from custom_components.aula.scheduler import AulaScheduler, RequestDeduper
+
+
+def test_stagger_delay__only_other_entries_wait():
+    scheduler = AulaScheduler(stagger_spacing=10)
+    assert scheduler.stagger_delay("presence", "a", 100) == 0
+    scheduler._last_start["presence"] = ("a", 100)
+    assert scheduler.stagger_delay("presence", "a", 101) == 0
+    assert scheduler.stagger_delay("presence", "b", 104) == 6
+    assert scheduler.stagger_delay("presence", "b", 120) == 0
+    assert scheduler.stagger_delay("calendar", "b", 101) == 0
+    scheduler.close()
+
+
+def test_register_and_unregister():
+    scheduler = AulaScheduler()
+    scheduler.register("a")
+    scheduler.register("b")
+    assert scheduler.unregister("a") is False
+    assert scheduler.unregister("b") is True
+    scheduler.close()
+
+
+def _counting_request(calls, status=200, delay=0.01):
+    async def request():
+        calls.append(status)
+        await asyncio.sleep(delay)
+        return AulaResponse(status, "{}")
+
+    return request
+
+
+def test_deduper__shares_in_flight_and_recent_responses():
+    async def main():
+        deduper = RequestDeduper(max_age=60)
+        calls = []
+        key = ("GET", "presence.getDailyOverview", (("childIds[]", "1"),), None, ())
+        first, second = await asyncio.gather(
+            deduper.run(key, _counting_request(calls), owner="a"),
+            deduper.run(key, _counting_request(calls), owner="b"),
+        )
+        assert first is second
+        # Another owner reuses the recent response, the same owner does not
+        assert await deduper.run(key, _counting_request(calls), owner="b") is first
+        assert len(calls) == 1
+        assert deduper.shared == 2
+        await deduper.run(key, _counting_request(calls), owner="a")
+        assert len(calls) == 2
+
+        other = ("GET", "presence.getDailyOverview", (("childIds[]", "2"),), None, ())
+        await deduper.run(other, _counting_request(calls), owner="b")
+        assert len(calls) == 3
+
+    asyncio.run(main())
+
+
+def test_deduper__failed_responses_are_not_shared():
+    async def main():
+        deduper = RequestDeduper(max_age=60)
+        calls = []
+        key = ("GET", "presence.getDailyOverview", (), None, ())
+        first, second = await asyncio.gather(
+            deduper.run(key, _counting_request(calls, status=403)),
+            deduper.run(key, _counting_request(calls, status=200)),
+        )
+        assert first.status_code == 403
+        assert second.status_code == 200
+        assert calls == [403, 200]
+
+    asyncio.run(main())
@@ -0,0 +1,91 @@
+import asyncio
+import base64
+import json
+import time
+from datetime import datetime, timezone
+
+from custom_components.aula.api import AulaResponse
+from custom_components.aula.client import Client, jwt_expiry
+
+
+def make_jwt(claims):
+    def part(data):
+        raw = json.dumps(data).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    return part({"alg": "HS256", "typ": "JWT"}) + "." + part(claims) + ".signature"
+
+
+def test_jwt_expiry__reads_exp_claim():
+    token = make_jwt({"sub": "guardian", "exp": 1760000000})
+    assert jwt_expiry(token) == datetime.fromtimestamp(1760000000, timezone.utc)
+
+
+def test_jwt_expiry__handles_unpadded_payloads():
+    for sub in ("a", "ab", "abc", "abcd"):
+        token = make_jwt({"sub": sub, "exp": 1760000000})
+        assert jwt_expiry(token) is not None
+
+
+def test_jwt_expiry__none_without_exp():
+    assert jwt_expiry(make_jwt({"sub": "guardian"})) is None
+
+
+def test_jwt_expiry__none_for_opaque_tokens():
+    assert jwt_expiry("0123456789abcdef") is None
+    assert jwt_expiry("not.a.jwt") is None
+    assert jwt_expiry(None) is None
+
+
+class _TokenApi:
+    """Mints the widget tokens token() returns, counting the requests."""
+
+    def __init__(self, token):
+        self._token = token
+        self.requests = 0
+
+    async def get_aula_token(self, widget_id):
+        self.requests += 1
+        # Let concurrent callers find the request in flight
+        await asyncio.sleep(0.01)
+        return AulaResponse(200, json.dumps({"data": self._token()}))
+
+
+def _mint(token, calls, concurrent=False, **client_kwargs):
+    """Return the tokens of calls async_get_token calls, and the requests made."""
+    client = Client("guardian", **client_kwargs)
+    client._api = api = _TokenApi(token)
+
+    async def main():
+        if concurrent:
+            return await asyncio.gather(
+                *(client.async_get_token("0004") for _ in range(calls))
+            )
+        return [await client.async_get_token("0004") for _ in range(calls)]
+
+    try:
+        return asyncio.run(main()), api.requests
+    finally:
+        client.close()
+
+
+def test_async_get_token__concurrent_calls_share_one_request():
+    token = make_jwt({"exp": int(time.time()) + 3600})
+    tokens, requests = _mint(lambda: token, 3, concurrent=True)
+    assert tokens == ["Bearer " + token] * 3
+    assert requests == 1
+
+
+def test_async_get_token__reuses_a_jwt_until_it_is_about_to_expire():
+    _, requests = _mint(lambda: make_jwt({"exp": int(time.time()) + 3600}), 3)
+    assert requests == 1
+    # Within the renew margin of its expiry, a token is minted again
+    _, requests = _mint(lambda: make_jwt({"exp": int(time.time()) + 30}), 3)
+    assert requests == 3
+
+
+def test_async_get_token__reuses_opaque_tokens_for_the_ttl():
+    _, requests = _mint(lambda: "0123456789abcdef", 3, widget_token_ttl=60)
+    assert requests == 1
+    _, requests = _mint(lambda: "0123456789abcdef", 3, widget_token_ttl=0)
+    assert requests == 3